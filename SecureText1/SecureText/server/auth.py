@@ -1,11 +1,15 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
+import time
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select, event, inspect as sa_inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
 import os
+from cache import TTLCache, TaggedTTLCache
 from database import get_db
 import models
 
@@ -14,9 +18,58 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# Authenticated users by token subject (email), so hot paths like answer submission
+# skip the users table. Entries are column snapshots, never session-bound instances,
+# tagged with their email so a commit's invalidation also rejects in-flight loads.
+user_cache = TaggedTTLCache(
+    "users",
+    max_size=int(os.getenv("USER_CACHE_MAX_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("USER_CACHE_TTL_SECONDS", "60")),
+)
+_USER_COLUMNS = [column.key for column in sa_inspect(models.User).column_attrs]
+
+# Decoded claims of recently verified tokens, so repeat requests skip jwt.decode.
+# Entries never outlive the token's own expiry.
+verified_tokens = TTLCache(
+    "verified_tokens",
+    max_size=int(os.getenv("TOKEN_CACHE_MAX_SIZE", "4096")),
+    ttl_seconds=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+@dataclass(frozen=True)
+class CurrentPrincipal:
+    """Authenticated caller as described by the token claims - no database row loaded"""
+    id: int
+    email: str
+    version: int
+
+@event.listens_for(models.User, "before_update")
+def _bump_user_version(mapper, connection, target):
+    """Every profile change gets a new version (carried in tokens as the ver claim)"""
+    if object_session(target).is_modified(target, include_collections=False):
+        target.version = (target.version or 0) + 1
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    """Remember which cached users a flush changed (old and new email)"""
+    changed = session.info.setdefault("changed_user_emails", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, models.User):
+            history = sa_inspect(obj).attrs.email.history
+            changed.update(email for email in (history.deleted or []) + [obj.email] if email)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    emails = session.info.pop("changed_user_emails", None)
+    if emails:
+        user_cache.invalidate_tags(emails)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_emails", None)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -27,45 +80,65 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
+def token_claims(user: models.User) -> dict:
+    """Claims identifying a user: subject (email), user id and user version"""
+    return {"sub": user.email, "uid": user.id, "ver": user.version}
+
+def decode_token(token: str) -> dict:
+    """Verified claims of a token, from verified_tokens when it was seen recently"""
+    claims = verified_tokens.get(token)
+    if claims is not None and claims["exp"] > time.time():
+        return claims
+    
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return email
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
+        claims = None
+    if not claims or claims.get("sub") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if "exp" in claims:
+        verified_tokens.set(token, claims, ttl_seconds=claims["exp"] - time.time())
+    return claims
 
-def get_current_user(request: Request, db: Session = Depends(get_db)):
-    """Get current user from Authorization header or cookie"""
-    token = None
-    
-    # Debug: Print all cookies and headers
-    print(f"DEBUG - All cookies: {dict(request.cookies)}")
-    print(f"DEBUG - Authorization header: {request.headers.get('Authorization')}")
-    
-    # Try to get token from Authorization header first
+def verify_token(token: str):
+    return decode_token(token)["sub"]
+
+def get_request_token(request: Request, allow_cookie: bool = True) -> Optional[str]:
+    """Bearer token from the Authorization header, falling back to the access_token cookie"""
     auth_header = request.headers.get("Authorization")
     if auth_header and auth_header.startswith("Bearer "):
-        token = auth_header.split(" ")[1]
-        print(f"DEBUG - Token from header: {token[:20]}...")
-    else:
-        # Try to get token from cookie
+        return auth_header.split(" ")[1]
+    if allow_cookie:
         cookie_token = request.cookies.get("access_token")
-        print(f"DEBUG - Cookie token: {cookie_token}")
         if cookie_token and cookie_token.startswith("Bearer "):
-            token = cookie_token.split(" ")[1]
-            print(f"DEBUG - Token from cookie: {token[:20]}...")
+            return cookie_token.split(" ")[1]
+    return None
+
+async def load_user(db: AsyncSession, email: str, min_version: int = 0) -> Optional[models.User]:
+    """User for a token subject, from user_cache unless the token is newer than the snapshot"""
+    generation = user_cache.generation
+    snapshot = user_cache.get(email)
+    # A token minted after a change made elsewhere (another worker) carries a higher ver
+    if snapshot is not None and snapshot["version"] >= min_version:
+        # Attach without a SELECT; the instance behaves like one loaded in this session
+        user = models.User(**snapshot)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
     
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    user = result.scalars().first()
+    if user is not None:
+        # Not stored if a commit changed any user while this row was loading
+        user_cache.set_tagged(email, {key: getattr(user, key) for key in _USER_COLUMNS}, (email,), generation)
+    return user
+
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_db)):
+    """Get current user from Authorization header or cookie"""
+    token = get_request_token(request)
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -73,27 +146,50 @@ def get_current_user(request: Request, db: Session = Depends(get_db)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    email = verify_token(token)
-    user = db.query(models.User).filter(models.User.email == email).first()
+    claims = decode_token(token)
+    user = await load_user(db, claims["sub"], claims.get("ver", 0))
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    print("inside get current user")
     return user
 
-def get_current_user_optional(request: Request, db: Session = Depends(get_db)):
+async def get_current_user_optional(request: Request, db: AsyncSession = Depends(get_db)):
     """Get current user if authenticated, otherwise return None"""
     try:
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
+        token = get_request_token(request, allow_cookie=False)
+        if not token:
             return None
-        
-        token = auth_header.split(" ")[1]
-        email = verify_token(token)
-        user = db.query(models.User).filter(models.User.email == email).first()
-        return user
+        claims = decode_token(token)
+        return await load_user(db, claims["sub"], claims.get("ver", 0))
     except:
-        return None
\ No newline at end of file
+        return None
+
+async def get_current_principal(request: Request, db: AsyncSession = Depends(get_db)) -> CurrentPrincipal:
+    """
+    Caller identity straight from the token claims, for handlers that only need
+    the user id. No user row is loaded; tokens minted before the uid/ver claims
+    fall back to the (cached) user lookup.
+    """
+    token = get_request_token(request)
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No authentication token provided",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    claims = decode_token(token)
+    if "uid" in claims:
+        return CurrentPrincipal(id=claims["uid"], email=claims["sub"], version=claims.get("ver", 0))
+    
+    user = await load_user(db, claims["sub"])
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return CurrentPrincipal(id=user.id, email=user.email, version=user.version)
@@ -0,0 +1,182 @@
+"""
+In-process caches.
+
+TTLCache is a bounded LRU whose entries also expire after a fixed time. It is
+thread-safe (the write queue invalidates from its own thread) and counts
+hits, misses and evictions. Every cache registers itself by name so
+cache_stats() can report them all.
+
+TaggedTTLCache adds invalidation by tag: each entry is stored with the tags
+it depends on (e.g. the ids of the rows it shows), and invalidate_tags()
+drops exactly the entries carrying any of them. update() changes entries in
+place for writes that can patch a cached value instead of dropping it.
+"""
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+_MISSING = object()
+_caches = {}
+
+class TTLCache:
+    """Bounded LRU cache with per-entry expiry and hit/miss counters"""
+
+    def __init__(self, name: str, max_size: int = 1024, ttl_seconds: float = 60.0):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _caches[name] = self
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, key, default=None):
+        """Cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self._removed(key)
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl_seconds: float = None):
+        """Store value; ttl_seconds can shorten (never extend) the cache TTL for this entry"""
+        if not self.enabled:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key, value, ttl: float):
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            evicted, _ = self._entries.popitem(last=False)
+            self._removed(evicted)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, _MISSING) is not _MISSING:
+                self._removed(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._removed_all()
+
+    def _removed(self, key):
+        """Hook for subclasses, called with the lock held when an entry leaves the cache"""
+
+    def _removed_all(self):
+        """Hook for subclasses, called with the lock held when the cache is cleared"""
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+class TaggedTTLCache(TTLCache):
+    """TTLCache whose entries can be invalidated by the tags they were stored with.
+
+    Readers take `generation` before computing a value and pass it to set_tagged();
+    if any invalidation happened in between, the possibly stale value is not stored.
+    """
+
+    def __init__(self, name: str, max_size: int = 1024, ttl_seconds: float = 60.0):
+        super().__init__(name, max_size, ttl_seconds)
+        self._keys_by_tag = defaultdict(set)
+        self._tags_by_key = {}
+        self.generation = 0
+        self.invalidations = 0
+
+    def set_tagged(self, key, value, tags, generation: int):
+        """Store value under key with its tags, unless invalidated since `generation`"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._removed(key)
+            self._tags_by_key[key] = set(tags)
+            for tag in self._tags_by_key[key]:
+                self._keys_by_tag[tag].add(key)
+            self._store(key, value, self.ttl_seconds)
+
+    def invalidate_tags(self, tags) -> int:
+        """Drop every entry stored with any of `tags`; returns how many were dropped"""
+        with self._lock:
+            self.generation += 1
+            keys = set()
+            for tag in tags:
+                keys.update(self._keys_by_tag.get(tag, ()))
+        for key in keys:
+            self.invalidate(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def update(self, change, keys=None):
+        """Replace live entries (those under `keys`, or all) with change(value), keeping expiry and tags.
+
+        Bumps generation like an invalidation, so a reader that loaded the old
+        value can't store it over the updated one.
+        """
+        with self._lock:
+            self.generation += 1
+            for key in list(self._entries) if keys is None else keys:
+                entry = self._entries.get(key, _MISSING)
+                if entry is not _MISSING:
+                    value, expires_at = entry
+                    self._entries[key] = (change(value), expires_at)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidations += len(self._entries)
+        super().clear()
+
+    def _removed(self, key):
+        for tag in self._tags_by_key.pop(key, ()):
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def _removed_all(self):
+        self._tags_by_key.clear()
+        self._keys_by_tag.clear()
+
+    def stats(self) -> dict:
+        return {**super().stats(), "invalidations": self.invalidations}
+
+def cache_stats() -> dict:
+    """Stats of every registered cache, by name"""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+def clear_caches():
+    """Empty every registered cache (counters are kept)"""
+    for cache in _caches.values():
+        cache.clear()
@@ -0,0 +1,54 @@
+"""
+HTTP conditional GET for deck, card-list, export and profile reads.
+
+Each endpoint builds a strong ETag from cheap validators, such as the deck's
+content_version and the viewer's bookmark ids, before it loads any card rows.
+A request whose If-None-Match names that tag gets an empty 304 instead of the
+body. Responses also carry Last-Modified, but only the ETag decides freshness:
+per-viewer fields such as bookmarks change without touching the deck's
+timestamps, so If-Modified-Since on its own is not trusted.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+from fastapi import Request, Response
+
+# Clients may keep the body but must revalidate before reusing it; bodies depend on the viewer
+CACHE_CONTROL = "private, no-cache"
+
+def strong_etag(*parts) -> str:
+    """Quoted ETag for the given validator values"""
+    raw = json.dumps(parts, separators=(",", ":"), sort_keys=True, default=str).encode()
+    return '"' + hashlib.sha256(raw).hexdigest()[:32] + '"'
+
+def http_date(value: datetime) -> str:
+    # SQLite hands timestamps back naive; they are stored in UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Authorization"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names `etag` (weak comparison, as RFC 9110 requires for it)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return etag in [candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates]
+
+def conditional_response(request: Request, response: Response, etag: str, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """A 304 if the client's copy is current; otherwise None, with the validators set on `response`"""
+    headers = validator_headers(etag, last_modified)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -1,36 +1,160 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import re
+from query_stats import instrument_engine
+from search import register_fts_schema
 
-# Database URL - Force SQLite for development
-DATABASE_URL = "sqlite:///./quiz_app1.db"
+# Database URL - SQLite file by default, overridable via DATABASE_URL (see docker-compose.yml)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./quiz_app1.db")
+
+# SQLite tuning profile applied to every new connection. WAL lets readers run
+# alongside the single writer, and busy_timeout makes writers wait for the lock
+# instead of failing straight away with "database is locked".
+# Set SQLITE_TUNING=0 to keep SQLite's defaults.
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "1") == "1"
+SQLITE_PRAGMAS = {
+    # busy_timeout goes first so the journal_mode switch itself waits on other connections
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negative cache_size is in KiB rather than pages
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536")),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    "foreign_keys": "ON" if os.getenv("SQLITE_FOREIGN_KEYS", "1") == "1" else "OFF",
+}
+
+def get_async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+
+def get_connect_args(url: str) -> dict:
+    """SQLite connections are shared across threads by the pool"""
+    if url.startswith("sqlite"):
+        return {"check_same_thread": False}
+    return {}
 
 # Create engines
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_engine(DATABASE_URL, connect_args=get_connect_args(DATABASE_URL))
+
+# Async engine used by the request handlers so queries don't block the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=get_connect_args(ASYNC_DATABASE_URL))
+
+def apply_sqlite_profile(target_engine):
+    """Run SQLITE_PRAGMAS on every connection the engine opens"""
+    if target_engine.dialect.name != "sqlite" or not SQLITE_TUNING:
+        return
+    
+    @event.listens_for(target_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+apply_sqlite_profile(engine)
+apply_sqlite_profile(async_engine.sync_engine)
+
+# Per-request statement counting / N+1 detection (see query_stats.py)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
 
-# For async operations, we'll use the same engine for now
-async_engine = None  # Not using async for simplicity
+def get_sqlite_pragmas(target_engine=None) -> dict:
+    """Read back the effective values of SQLITE_PRAGMAS from a live connection"""
+    target_engine = target_engine or engine
+    if target_engine.dialect.name != "sqlite":
+        return {}
+    with target_engine.connect() as connection:
+        return {
+            pragma: connection.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+            for pragma in SQLITE_PRAGMAS
+        }
+
+def report_sqlite_pragmas():
+    """Print the effective SQLite settings at startup"""
+    pragmas = get_sqlite_pragmas()
+    if pragmas:
+        settings = ", ".join(f"{pragma}={value}" for pragma, value in pragmas.items())
+        print(f"SQLite profile for {engine.url.database}: {settings}")
+    return pragmas
 
 # Session makers
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# expire_on_commit is off so loaded attributes stay readable after commit
+# (an expired attribute would need an implicit lazy load, which async sessions forbid)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Base class for models
 Base = declarative_base()
 
+# create_all() also builds the SQLite full-text search tables (see search.py)
+register_fts_schema(Base.metadata)
+
+# The FTS5 tables and their shadow tables aren't models; schema comparisons skip them
+UNMANAGED_TABLES = re.compile(r"^\w+_fts(_(data|idx|content|docsize|config))?$")
+
+def include_schema_name(name, type_, parent_names):
+    """Alembic include_name hook: leave tables that aren't modelled alone"""
+    return not (type_ == "table" and UNMANAGED_TABLES.match(name))
+
 # Dependency to get database session
-def get_db():
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Sync session dependency for code that still uses the legacy Query API
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
-# Initialize database
-def init_db():
-    from models import User, Deck, Card, QuizSession, QuizAnswer  # Import all models
+# Initialize database - an explicit step (python database.py / make migrate), never run on import
+def init_db(target_engine=None):
+    """Bring the schema up to date with the Alembic migrations"""
+    from alembic import command
+    from alembic.autogenerate import compare_metadata
+    from alembic.config import Config
+    from alembic.migration import MigrationContext
+    from sqlalchemy import inspect
+    import models  # noqa: F401 - registers all tables on Base.metadata
     
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
+    target_engine = target_engine or engine
+    server_dir = os.path.dirname(os.path.abspath(__file__))
+    config = Config(os.path.join(server_dir, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(server_dir, "migrations"))
+    config.attributes["configure_logger"] = False
     
-    print("Database initialized successfully!")
\ No newline at end of file
+    with target_engine.begin() as connection:
+        config.attributes["connection"] = connection
+        tables = inspect(connection).get_table_names()
+        # Databases created by create_all() have no version table: if they already match
+        # the models they are at head, otherwise they predate migrations (baseline schema)
+        if tables and "alembic_version" not in tables:
+            context = MigrationContext.configure(connection, opts={"include_name": include_schema_name})
+            drift = compare_metadata(context, Base.metadata)
+            command.stamp(config, "0001" if drift else "head")
+        command.upgrade(config, "head")
+    
+    print("Database initialized successfully!")
+
+if __name__ == "__main__":
+    # Same settings as the app (main.py loads .env too), so the migration targets its database
+    from dotenv import load_dotenv
+    load_dotenv()
+    # Go through the imported module so models register on the same Base as init_db reads
+    import database
+    database.init_db()
@@ -1,22 +1,33 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
 from sqlalchemy.orm import Session
 from datetime import datetime, date, timedelta
 from database import SessionLocal
 from models import User, DailyChallenge, Deck, Streak
 from services.gamification import GamificationService
+from services.deck_counters import DeckCounterService
+from services.public_deck_cache import PublicDeckCache, public_deck_cache
+from services.deck_rankings import DeckRankingService
+import asyncio
+import os
 import random
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Decks rescored per transaction by the hourly ranking refresh
+RANKING_BATCH_SIZE = int(os.getenv("RANKING_BATCH_SIZE", "500"))
+
 class BackgroundJobs:
     def __init__(self):
-        self.scheduler = AsyncIOScheduler()
-        self.setup_jobs()
+        # Built by start() so importing the app doesn't pull in APScheduler
+        self.scheduler = None
     
     def setup_jobs(self):
         """Set up all scheduled jobs"""
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+        from apscheduler.triggers.cron import CronTrigger
+        
+        self.scheduler = AsyncIOScheduler()
+        
         # Daily job at 00:01 - Reset daily challenges and update streaks
         self.scheduler.add_job(
             self.daily_reset,
@@ -25,6 +36,22 @@ class BackgroundJobs:
             replace_existing=True
         )
         
+        # Nightly job at 03:00 - Repair any drift in the denormalized deck counters
+        self.scheduler.add_job(
+            self.reconcile_deck_counters,
+            CronTrigger(hour=3, minute=0),
+            id='reconcile_deck_counters',
+            replace_existing=True
+        )
+        
+        # Hourly job - Rebuild trending/popular deck rankings (kept current incrementally in between)
+        self.scheduler.add_job(
+            self.refresh_deck_rankings,
+            CronTrigger(minute=15),
+            id='refresh_deck_rankings',
+            replace_existing=True
+        )
+        
         # Weekly job - Generate analytics summaries
         self.scheduler.add_job(
             self.weekly_analytics,
@@ -77,6 +104,51 @@ class BackgroundJobs:
         finally:
             db.close()
     
+    async def reconcile_deck_counters(self):
+        """Nightly job to recompute deck card/star/session counters that drifted"""
+        logger.info("Starting deck counter reconciliation job")
+        db = SessionLocal()
+        
+        try:
+            repaired = DeckCounterService.reconcile(db)
+            db.commit()
+            if repaired:
+                # Core UPDATE, so the ORM-driven invalidation doesn't see it
+                public_deck_cache.clear()
+                logger.warning(f"Repaired drifted counters on {repaired} decks")
+            logger.info("Deck counter reconciliation job completed")
+            
+        except Exception as e:
+            logger.error(f"Error in deck counter reconciliation job: {e}")
+            db.rollback()
+        finally:
+            db.close()
+    
+    async def refresh_deck_rankings(self):
+        """Hourly job to recompute every deck's trending and popular scores"""
+        logger.info("Starting deck ranking refresh job")
+        # The rescore is synchronous database and Python work; keep it off the event loop
+        await asyncio.to_thread(self._refresh_deck_rankings)
+    
+    def _refresh_deck_rankings(self):
+        """Rescore every deck, one committed batch of RANKING_BATCH_SIZE decks at a time"""
+        db = SessionLocal()
+        
+        try:
+            ranked = 0
+            for deck_ids in DeckRankingService.deck_batches(db, RANKING_BATCH_SIZE):
+                ranked += DeckRankingService.rescore(db, deck_ids)
+                db.commit()
+            logger.info(f"Deck ranking refresh job completed ({ranked} decks)")
+            
+        except Exception as e:
+            logger.error(f"Error in deck ranking refresh job: {e}")
+            db.rollback()
+        finally:
+            db.close()
+            # Core rewrite of deck_rankings, so drop the cached ranked pages here (committed batches included)
+            public_deck_cache.invalidate_tags(PublicDeckCache.ranked_tags())
+    
     async def weekly_analytics(self):
         """Weekly job to generate analytics summaries"""
         logger.info("Starting weekly analytics job")
@@ -113,11 +185,15 @@ class BackgroundJobs:
     
     def start(self):
         """Start the scheduler"""
+        if self.scheduler is None:
+            self.setup_jobs()
         self.scheduler.start()
         logger.info("Background job scheduler started")
     
     def shutdown(self):
         """Shutdown the scheduler"""
+        if self.scheduler is None or not self.scheduler.running:
+            return
         self.scheduler.shutdown()
         logger.info("Background job scheduler stopped")
 
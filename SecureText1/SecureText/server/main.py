@@ -1,27 +1,31 @@
-from fastapi import FastAPI
+from dotenv import load_dotenv
+
+# Load .env once, before any module reads its settings from the environment
+load_dotenv()
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from contextlib import asynccontextmanager
-from database import engine
-import models
+from database import report_sqlite_pragmas
 from jobs import job_scheduler
+from write_queue import write_queue, WRITE_QUEUE_ENABLED
+from query_stats import track_request, add_query_stats_headers
+from cache import cache_stats
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
 from routers import auth, decks, cards, quiz, users, import_export
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    report_sqlite_pragmas()
+    if WRITE_QUEUE_ENABLED:
+        write_queue.start()
     job_scheduler.start()
     yield
     # Shutdown
     job_scheduler.shutdown()
+    write_queue.shutdown()
 
 app = FastAPI(
     title="Magizh Quiz API", 
@@ -46,6 +50,14 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Count statements and DB time per request (X-DB-Query-Count / X-DB-Time-Ms headers)
+@app.middleware("http")
+async def query_stats_middleware(request: Request, call_next):
+    with track_request() as stats:
+        response = await call_next(request)
+    add_query_stats_headers(request, response, stats)
+    return response
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(decks.router, prefix="/api/decks", tags=["decks"])
@@ -58,6 +70,11 @@ app.include_router(import_export.router, prefix="/api/import", tags=["import/exp
 async def health_check():
     return {"status": "healthy", "message": "Magizh Quiz API is running"}
 
+@app.get("/health/caches")
+async def cache_health():
+    """Size and hit/miss counters of the in-process caches"""
+    return cache_stats()
+
 @app.get("/favicon.ico")
 async def favicon():
     return {"message": "No favicon configured"}
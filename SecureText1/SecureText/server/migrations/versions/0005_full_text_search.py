@@ -0,0 +1,77 @@
+"""full text search
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 03:05:12.418230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DECK_TAGS = "(SELECT group_concat(value, ' ') FROM json_each({row}.tags))"
+
+FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS decks_fts USING fts5(
+        title, description, tags, tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS decks_fts_insert AFTER INSERT ON decks BEGIN
+        INSERT INTO decks_fts(rowid, title, description, tags)
+        VALUES (new.id, new.title, new.description, {DECK_TAGS.format(row='new')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS decks_fts_update AFTER UPDATE OF title, description, tags ON decks BEGIN
+        DELETE FROM decks_fts WHERE rowid = old.id;
+        INSERT INTO decks_fts(rowid, title, description, tags)
+        VALUES (new.id, new.title, new.description, {DECK_TAGS.format(row='new')});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS decks_fts_delete AFTER DELETE ON decks BEGIN
+        DELETE FROM decks_fts WHERE rowid = old.id;
+    END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5(
+        question, explanation, tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS cards_fts_insert AFTER INSERT ON cards BEGIN
+        INSERT INTO cards_fts(rowid, question, explanation) VALUES (new.id, new.question, new.explanation);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cards_fts_update AFTER UPDATE OF question, explanation ON cards BEGIN
+        DELETE FROM cards_fts WHERE rowid = old.id;
+        INSERT INTO cards_fts(rowid, question, explanation) VALUES (new.id, new.question, new.explanation);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cards_fts_delete AFTER DELETE ON cards BEGIN
+        DELETE FROM cards_fts WHERE rowid = old.id;
+    END""",
+]
+
+
+def upgrade() -> None:
+    # FTS5 is SQLite only; other databases keep the LIKE search
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for statement in FTS_SCHEMA:
+        op.execute(statement)
+
+    # Index the existing rows
+    op.execute(f"""
+        INSERT INTO decks_fts(rowid, title, description, tags)
+        SELECT id, title, description, {DECK_TAGS.format(row='decks')} FROM decks
+    """)
+    op.execute("INSERT INTO cards_fts(rowid, question, explanation) SELECT id, question, explanation FROM cards")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for trigger in ['decks_fts_insert', 'decks_fts_update', 'decks_fts_delete',
+                    'cards_fts_insert', 'cards_fts_update', 'cards_fts_delete']:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS decks_fts")
+    op.execute("DROP TABLE IF EXISTS cards_fts")
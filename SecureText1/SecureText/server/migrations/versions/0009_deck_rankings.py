@@ -0,0 +1,112 @@
+"""deck rankings
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 03:00:50.949640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from datetime import datetime, timezone
+import math
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Same scoring as DeckRankingService at the time of this migration
+STAR_WEIGHT = 3.0
+SESSION_WEIGHT = 1.0
+LEARNER_WEIGHT = 2.0
+HALF_LIFE_DAYS = 7.0
+EPOCH = datetime(2000, 1, 1)
+
+
+def event_score(weight, at):
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    return math.log2(weight) + (at - EPOCH).total_seconds() / (HALF_LIFE_DAYS * 86400)
+
+
+def combine(score, event):
+    if score <= 0:
+        return event
+    high, low = max(score, event), min(score, event)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def backfill():
+    """Score every existing deck from its stars and completed sessions"""
+    connection = op.get_bind()
+    decks = sa.table('decks', sa.column('id', sa.Integer))
+    stars = sa.table('deck_stars', sa.column('deck_id', sa.Integer), sa.column('created_at', sa.DateTime))
+    sessions = sa.table(
+        'quiz_sessions', sa.column('deck_id', sa.Integer), sa.column('user_id', sa.Integer),
+        sa.column('completed_at', sa.DateTime)
+    )
+    rows = {
+        deck_id: {'deck_id': deck_id, 'trending_score': 0.0, 'popular_score': 0.0, 'learner_count': 0}
+        for deck_id, in connection.execute(sa.select(decks.c.id))
+    }
+
+    def add(deck_id, weight, at):
+        row = rows.get(deck_id)
+        if row is not None:
+            row['trending_score'] = combine(row['trending_score'], event_score(weight, at or datetime.utcnow()))
+            row['popular_score'] += weight
+
+    for deck_id, starred_at in connection.execute(sa.select(stars.c.deck_id, stars.c.created_at)):
+        add(deck_id, STAR_WEIGHT, starred_at)
+    learners = set()
+    for deck_id, user_id, completed_at in connection.execute(
+        sa.select(sessions.c.deck_id, sessions.c.user_id, sessions.c.completed_at)
+        .where(sessions.c.completed_at.isnot(None)).order_by(sessions.c.completed_at)
+    ):
+        add(deck_id, SESSION_WEIGHT, completed_at)
+        if (deck_id, user_id) not in learners and deck_id in rows:
+            learners.add((deck_id, user_id))
+            add(deck_id, LEARNER_WEIGHT, completed_at)
+            rows[deck_id]['learner_count'] += 1
+
+    if rows:
+        rankings = sa.table(
+            'deck_rankings', sa.column('deck_id'), sa.column('trending_score'),
+            sa.column('popular_score'), sa.column('learner_count')
+        )
+        connection.execute(rankings.insert(), list(rows.values()))
+
+
+def upgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('deck_rankings',
+    sa.Column('deck_id', sa.Integer(), nullable=False),
+    sa.Column('trending_score', sa.Float(), server_default='0', nullable=False),
+    sa.Column('popular_score', sa.Float(), server_default='0', nullable=False),
+    sa.Column('learner_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['deck_id'], ['decks.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('deck_id')
+    )
+    with op.batch_alter_table('deck_rankings', schema=None) as batch_op:
+        batch_op.create_index('ix_deck_rankings_popular', ['popular_score', 'deck_id'], unique=False)
+        batch_op.create_index('ix_deck_rankings_trending', ['trending_score', 'deck_id'], unique=False)
+
+    # ### end Alembic commands ###
+
+    backfill()
+
+
+def downgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('deck_rankings', schema=None) as batch_op:
+        batch_op.drop_index('ix_deck_rankings_trending')
+        batch_op.drop_index('ix_deck_rankings_popular')
+
+    op.drop_table('deck_rankings')
+    # ### end Alembic commands ###
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON, ForeignKey, Float, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON, ForeignKey, Float, Index, Enum as SQLEnum, insert_sentinel
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from database import Base
 import enum
 from datetime import datetime, date
@@ -33,6 +33,10 @@ class ActionType(enum.Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Discovery page: WHERE username_set = 1 ORDER BY created_at DESC, id DESC
+        Index("ix_users_username_set_created", "username_set", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -42,6 +46,8 @@ class User(Base):
     username_set = Column(Boolean, default=False)
     bio = Column(Text)
     avatar_url = Column(String)
+    # Bumped on every profile change; tokens carry it as the "ver" claim
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -60,13 +66,23 @@ class User(Base):
 
 class Deck(Base):
     __tablename__ = "decks"
+    __table_args__ = (
+        # Deck listing: WHERE is_public = 1 ORDER BY created_at DESC, id DESC
+        Index("ix_decks_public_created", "is_public", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     description = Column(Text)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     is_public = Column(Boolean, default=False)
     tags = Column(JSON, default=list)
+    # Denormalized counters, kept in step by the writes that change them (services/deck_counters.py)
+    card_count = Column(Integer, nullable=False, default=0, server_default="0")
+    star_count = Column(Integer, nullable=False, default=0, server_default="0")
+    session_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped whenever the deck's text or any of its cards change (services/deck_versions.py)
+    content_version = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -78,12 +94,49 @@ class Deck(Base):
     comments = relationship("DeckComment", back_populates="deck", cascade="all, delete-orphan")
     progress = relationship("UserProgress", back_populates="deck")
     daily_challenges = relationship("DailyChallenge", back_populates="deck")
+    # Normalized copy of `tags`, kept in sync on flush (services/tags.py)
+    tag_rows = relationship("DeckTag", back_populates="deck", cascade="all, delete-orphan")
+    # Trending/popular scores (services/deck_rankings.py)
+    ranking = relationship("DeckRanking", back_populates="deck", uselist=False, cascade="all, delete-orphan")
+
+class DeckRanking(Base):
+    __tablename__ = "deck_rankings"
+    __table_args__ = (
+        # sort=trending / sort=popular: ORDER BY score DESC, deck_id DESC
+        Index("ix_deck_rankings_trending", "trending_score", "deck_id"),
+        Index("ix_deck_rankings_popular", "popular_score", "deck_id"),
+    )
+    
+    deck_id = Column(Integer, ForeignKey("decks.id", ondelete="CASCADE"), primary_key=True)
+    # log2 of the time-decayed activity; 0 for a deck nobody has used yet
+    trending_score = Column(Float, nullable=False, default=0.0, server_default="0")
+    # Weighted all-time stars, completed sessions and learners
+    popular_score = Column(Float, nullable=False, default=0.0, server_default="0")
+    # Distinct users with a completed session
+    learner_count = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    deck = relationship("Deck", back_populates="ranking")
+
+class DeckTag(Base):
+    __tablename__ = "deck_tags"
+    __table_args__ = (
+        # Tag filters and facets: WHERE tag IN (...) -> deck ids
+        Index("ix_deck_tags_tag_deck", "tag", "deck_id"),
+    )
+    
+    deck_id = Column(Integer, ForeignKey("decks.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String, primary_key=True)
+    
+    # Relationships
+    deck = relationship("Deck", back_populates="tag_rows")
 
 class DeckStar(Base):
     __tablename__ = "deck_stars"
     
     user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
-    deck_id = Column(Integer, ForeignKey("decks.id"), primary_key=True)
+    deck_id = Column(Integer, ForeignKey("decks.id"), primary_key=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -92,9 +145,15 @@ class DeckStar(Base):
 
 class Card(Base):
     __tablename__ = "cards"
+    __table_args__ = (
+        # Cards of a deck in order: WHERE deck_id = ? ORDER BY created_at, id
+        Index("ix_cards_deck_created", "deck_id", "created_at"),
+        # Duplicate lookup at write time: WHERE deck_id = ? AND content_hash IN (...)
+        Index("ix_cards_deck_content_hash", "deck_id", "content_hash"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    deck_id = Column(Integer, ForeignKey("decks.id"), nullable=False)
+    deck_id = Column(Integer, ForeignKey("decks.id"), nullable=False, index=True)
     question = Column(Text, nullable=False)
     question_type = Column(SQLEnum(QuestionType), nullable=False)
     options = Column(JSON, default=list)  # For MCQ and multi-select
@@ -102,7 +161,12 @@ class Card(Base):
     explanation = Column(Text)
     image_url = Column(String)
     tags = Column(JSON, default=list)
+    # Normalized digest of the question and answers, set on flush (services/card_hashes.py)
+    content_hash = Column(String(32))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Filled in only by multi-row INSERT ... RETURNING, so batched inserts get their ids back
+    # in parameter order on SQLite, which can't order RETURNING rows by the primary key
+    _insert_sentinel = insert_sentinel("insert_sentinel")
     
     # Relationships
     deck = relationship("Deck", back_populates="cards")
@@ -110,6 +174,21 @@ class Card(Base):
     bookmarks = relationship("CardBookmark", back_populates="card", cascade="all, delete-orphan")
     feedback = relationship("CardFeedback", back_populates="card", cascade="all, delete-orphan")
     study_plans = relationship("StudyPlan", back_populates="card", cascade="all, delete-orphan")
+    # Normalized copy of `tags`, kept in sync on flush (services/tags.py)
+    tag_rows = relationship("CardTag", back_populates="card", cascade="all, delete-orphan")
+
+class CardTag(Base):
+    __tablename__ = "card_tags"
+    __table_args__ = (
+        # Tag-scoped card selection: WHERE tag IN (...) -> card ids
+        Index("ix_card_tags_tag_card", "tag", "card_id"),
+    )
+    
+    card_id = Column(Integer, ForeignKey("cards.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String, primary_key=True)
+    
+    # Relationships
+    card = relationship("Card", back_populates="tag_rows")
 
 class DeckComment(Base):
     __tablename__ = "deck_comments"
@@ -127,6 +206,10 @@ class DeckComment(Base):
 
 class ActivityLog(Base):
     __tablename__ = "activity_logs"
+    __table_args__ = (
+        # Activity feed: WHERE user_id = ? ORDER BY created_at DESC
+        Index("ix_activity_logs_user_created", "user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -152,6 +235,14 @@ class CardBookmark(Base):
 
 class QuizSession(Base):
     __tablename__ = "quiz_sessions"
+    __table_args__ = (
+        # Dashboard / achievements / analytics: WHERE user_id = ? AND completed_at ...
+        Index("ix_quiz_sessions_user_completed", "user_id", "completed_at"),
+        # Per-deck progress: WHERE deck_id = ? AND user_id = ?
+        Index("ix_quiz_sessions_deck_user", "deck_id", "user_id"),
+        # Session history: WHERE user_id = ? ORDER BY started_at DESC, id DESC
+        Index("ix_quiz_sessions_user_started", "user_id", "started_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -169,6 +260,16 @@ class QuizSession(Base):
 
 class QuizAnswer(Base):
     __tablename__ = "quiz_answers"
+    __table_args__ = (
+        # Scoring counts all answers and correct answers of a session from the index alone
+        Index("ix_quiz_answers_session_correct", "session_id", "is_correct"),
+        # Review mode only ever looks up the cards a user got wrong
+        Index(
+            "ix_quiz_answers_card_incorrect", "card_id",
+            sqlite_where=text("is_correct = 0"),
+            postgresql_where=text("NOT is_correct"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("quiz_sessions.id"), nullable=False)
@@ -209,6 +310,10 @@ class Streak(Base):
 
 class DailyChallenge(Base):
     __tablename__ = "daily_challenges"
+    __table_args__ = (
+        # Today's challenge lookup: WHERE user_id = ? AND date(date) = ?
+        Index("ix_daily_challenges_user_date", "user_id", "date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -237,6 +342,10 @@ class CardFeedback(Base):
 
 class StudyPlan(Base):
     __tablename__ = "study_plans"
+    __table_args__ = (
+        # Due cards: WHERE user_id = ? AND next_review_at <= now
+        Index("ix_study_plans_user_next_review", "user_id", "next_review_at"),
+    )
     
     user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
     card_id = Column(Integer, ForeignKey("cards.id"), primary_key=True)
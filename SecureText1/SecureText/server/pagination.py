@@ -0,0 +1,113 @@
+"""
+Cursor pagination for the list endpoints.
+
+Lists are ordered on an indexed (timestamp, id) key. Each page is fetched with
+one extra row to know whether another page follows; if so, an opaque cursor for
+the last row is returned in the X-Next-Cursor header. Passing it back as
+?cursor= seeks straight past that row (WHERE (key, id) < (:key, :id)), so deep
+pages cost the same as the first one. Without a cursor, skip/limit still work
+for older clients, and the response bodies are unchanged.
+
+The cursor keeps the key exactly as the database stores it. On SQLite, rows
+written by server defaults and by the ORM store timestamps in different text
+formats, and only the stored text compares the same way ORDER BY sorts it.
+Numeric keys (e.g. ranking scores) are kept as numbers.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, Response
+from sqlalchemy import DateTime, String, literal, tuple_, type_coerce
+
+CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(payload: dict) -> str:
+    def _default(value):
+        if isinstance(value, datetime):
+            return {"dt": value.isoformat()}
+        raise TypeError(f"Can't put {type(value).__name__} in a cursor")
+    raw = json.dumps(payload, separators=(",", ":"), default=_default).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    """Payload of a cursor from encode_cursor(); 400 for anything else"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        payload = None
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return payload
+
+def set_next_cursor(response: Response, cursor: Optional[str]):
+    if cursor:
+        response.headers[CURSOR_HEADER] = cursor
+
+class Keyset:
+    """Seek pagination over (sort_column, id_column)"""
+
+    def __init__(self, sort_column, id_column, descending: bool = True):
+        self.sort_column = sort_column
+        self.id_column = id_column
+        self.descending = descending
+
+    def page(self, query, limit: int, cursor: Optional[str] = None, skip: int = 0):
+        """Order the select by the key and fetch the page after `cursor` (or after `skip` rows)"""
+        key_column = self.sort_column
+        if isinstance(self.sort_column.type, DateTime):
+            key_column = type_coerce(self.sort_column, String)
+        query = query.add_columns(key_column.label("cursor_key"), self.id_column.label("cursor_id"))
+        if cursor:
+            key, row_id = self._position(decode_cursor(cursor))
+            position = tuple_(self.sort_column, self.id_column)
+            boundary = tuple_(key, literal(row_id))
+            query = query.where(position < boundary if self.descending else position > boundary)
+        elif skip:
+            query = query.offset(skip)
+
+        if self.descending:
+            query = query.order_by(self.sort_column.desc(), self.id_column.desc())
+        else:
+            query = query.order_by(self.sort_column, self.id_column)
+        return query.limit(limit + 1)
+
+    def _position(self, payload: dict):
+        key, row_id = payload.get("k"), payload.get("id")
+        if not isinstance(row_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if isinstance(key, dict) and "dt" in key:
+            # Databases that hand back real timestamps compare them as such
+            return literal(datetime.fromisoformat(key["dt"]), self.sort_column.type), row_id
+        if isinstance(key, (int, float)) and not isinstance(key, bool):
+            return literal(key, self.sort_column.type), row_id
+        if not isinstance(key, str):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # SQLite: compare against the stored text, like ORDER BY does
+        return literal(key, String()), row_id
+
+    def split(self, rows, limit: int):
+        """The page's rows and the cursor of the following page (None on the last page)"""
+        if len(rows) <= limit:
+            return rows, None
+        last = rows[limit - 1]
+        return rows[:limit], encode_cursor({"k": last.cursor_key, "id": last.cursor_id})
+
+class OffsetPage:
+    """Offset pagination behind the same opaque cursor, for orders no index can seek (e.g. search rank)"""
+
+    @staticmethod
+    def page(query, limit: int, cursor: Optional[str] = None, skip: int = 0):
+        start = skip
+        if cursor:
+            start = decode_cursor(cursor).get("o")
+            if not isinstance(start, int) or start < 0:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        return query.offset(start).limit(limit + 1), start
+
+    @staticmethod
+    def split(rows, limit: int, start: int):
+        if len(rows) <= limit:
+            return rows, None
+        return rows[:limit], encode_cursor({"o": start + limit})
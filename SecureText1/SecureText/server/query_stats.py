@@ -0,0 +1,125 @@
+"""
+Per-request SQL statement counting and N+1 detection.
+
+Engine events record every statement into the QueryStats of the current request
+(held in a context variable set by the middleware in main.py), plus any collectors
+opened with collect_queries() - the test suite uses those for query budgets.
+"""
+import os
+import re
+import time
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Set QUERY_STATS_ENABLED=0 to skip the engine listeners entirely
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "1") == "1"
+# The same statement shape running this many times in one request is flagged as N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_N_PLUS_ONE_THRESHOLD", "5"))
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+def statement_shape(statement: str) -> str:
+    """Normalise a statement so runs that differ only in literals compare equal"""
+    return _WHITESPACE.sub(" ", _LITERALS.sub("?", statement)).strip()
+
+class QueryStats:
+    """Statement count, time and shapes for one request (or one collect_queries block)"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes = Counter()
+
+    @property
+    def total_time_ms(self) -> float:
+        return round(self.total_time * 1000, 2)
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        self.shapes[statement_shape(statement)] += 1
+
+    def suspected_n_plus_one(self, threshold: Optional[int] = None) -> dict:
+        """Statement shapes that repeated at least `threshold` times"""
+        threshold = threshold or N_PLUS_ONE_THRESHOLD
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+    def summary(self) -> str:
+        lines = [f"{self.count} statements in {self.total_time_ms}ms"]
+        for shape, count in self.shapes.most_common():
+            lines.append(f"  {count}x {shape[:200]}")
+        return "\n".join(lines)
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_collectors = []
+
+def get_query_stats() -> Optional[QueryStats]:
+    """QueryStats for the request being served, if any"""
+    return _current_stats.get()
+
+@contextmanager
+def track_request():
+    """Install a fresh QueryStats for the current request"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+@contextmanager
+def collect_queries():
+    """Record every statement run on an instrumented engine while the block runs"""
+    stats = QueryStats()
+    _collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        _collectors.remove(stats)
+
+def instrument_engine(target_engine):
+    """Time every statement the engine runs and record it on the active QueryStats"""
+    if not QUERY_STATS_ENABLED:
+        return
+
+    @event.listens_for(target_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(target_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+        for collector in _collectors:
+            collector.record(statement, elapsed)
+
+def add_query_stats_headers(request, response, stats: QueryStats):
+    """Expose the request's statement count and DB time; warn on suspected N+1"""
+    response.headers["X-DB-Query-Count"] = str(stats.count)
+    response.headers["X-DB-Time-Ms"] = str(stats.total_time_ms)
+
+    fields = {
+        "path": request.url.path,
+        "method": request.method,
+        "db_queries": stats.count,
+        "db_time_ms": stats.total_time_ms,
+    }
+    suspects = stats.suspected_n_plus_one()
+    if suspects:
+        response.headers["X-DB-N-Plus-One"] = str(len(suspects))
+        for shape, count in suspects.items():
+            logger.warning(
+                f"Suspected N+1 on {request.method} {request.url.path}: {count}x {shape[:200]}",
+                extra={**fields, "repeated_statement": shape, "repeat_count": count},
+            )
+    else:
+        logger.debug(f"{request.method} {request.url.path}: {stats.count} queries in {stats.total_time_ms}ms", extra=fields)
@@ -2,15 +2,16 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_, extract
 from datetime import datetime, timedelta, date
-from database import get_db
+from database import get_sync_db
 from schemas import DashboardStats, DeckStats
 from auth import get_current_user
+from services.tags import TagService
 import models
 
 router = APIRouter()
 
 @router.get("/stats/dashboard", response_model=DashboardStats)
-async def get_dashboard_stats(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_dashboard_stats(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_sync_db)):
     """Get user dashboard statistics"""
     # Get total decks created by user
     total_decks = db.query(models.Deck).filter(models.Deck.user_id == current_user.id).count()
@@ -62,7 +63,7 @@ async def get_dashboard_stats(current_user: models.User = Depends(get_current_us
     )
 
 @router.get("/stats/deck/{deck_id}", response_model=DeckStats)
-async def get_deck_stats(deck_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_deck_stats(deck_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_sync_db)):
     """Get deck performance analytics"""
     # Check if deck exists and user has access
     deck = db.query(models.Deck).filter(models.Deck.id == deck_id).first()
@@ -143,7 +144,7 @@ async def get_deck_stats(deck_id: int, current_user: models.User = Depends(get_c
     )
 
 @router.get("/analytics/heatmap")
-async def get_activity_heatmap(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_activity_heatmap(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_sync_db)):
     """Get GitHub-style activity heatmap data"""
     # Get activity data for the last year
     one_year_ago = datetime.utcnow() - timedelta(days=365)
@@ -172,7 +173,7 @@ async def get_activity_heatmap(current_user: models.User = Depends(get_current_u
     return {"data": heatmap_data}
 
 @router.get("/analytics/performance")
-async def get_performance_analytics(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_performance_analytics(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_sync_db)):
     """Get detailed performance metrics"""
     # Get monthly performance trend
     six_months_ago = datetime.utcnow() - timedelta(days=180)
@@ -259,7 +260,7 @@ async def get_performance_analytics(current_user: models.User = Depends(get_curr
     return {"metrics": metrics}
 
 @router.get("/leaderboards")
-async def get_leaderboards(period: str = "weekly", db: Session = Depends(get_db)):
+async def get_leaderboards(period: str = "weekly", db: Session = Depends(get_sync_db)):
     """Get leaderboards (daily/weekly)"""
     if period not in ["daily", "weekly"]:
         raise HTTPException(status_code=400, detail="Period must be 'daily' or 'weekly'")
@@ -306,21 +307,23 @@ async def get_leaderboards(period: str = "weekly", db: Session = Depends(get_db)
     return {"leaderboard": leaderboard}
 
 @router.get("/recommendations")
-async def get_deck_recommendations(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_deck_recommendations(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_sync_db)):
     """Get personalized deck recommendations"""
     # Get user's studied categories and tags
     user_tags = db.query(
-        func.json_array_elements_text(models.Card.tags).label('tag'),
-        func.count(func.json_array_elements_text(models.Card.tags)).label('count')
+        models.CardTag.tag.label('tag'),
+        func.count().label('count')
+    ).join(
+        models.Card, models.Card.id == models.CardTag.card_id
     ).join(
         models.QuizSession, models.QuizSession.deck_id == models.Card.deck_id
     ).filter(
         models.QuizSession.user_id == current_user.id,
         models.QuizSession.completed_at.isnot(None)
     ).group_by(
-        func.json_array_elements_text(models.Card.tags)
+        models.CardTag.tag
     ).order_by(
-        func.count(func.json_array_elements_text(models.Card.tags)).desc()
+        func.count().desc()
     ).limit(5).all()
     
     user_tags_list = [tag.tag for tag in user_tags]
@@ -339,14 +342,11 @@ async def get_deck_recommendations(current_user: models.User = Depends(get_curre
     # Score decks based on tag similarity
     scored_decks = []
     for deck in recommended_decks:
-        deck_tags = deck.tags or []
+        deck_tags = TagService.normalize(deck.tags)
         tag_score = len(set(deck_tags) & set(user_tags_list))
         
-        # Also consider deck popularity (number of quiz sessions by other users)
-        popularity = db.query(models.QuizSession).filter(
-            models.QuizSession.deck_id == deck.id,
-            models.QuizSession.user_id != current_user.id
-        ).count()
+        # Also consider deck popularity (completed quiz sessions; the user has none on these decks)
+        popularity = deck.session_count
         
         if tag_score > 0 or popularity > 0:  # Only include decks with some relevance
             scored_decks.append({
@@ -365,7 +365,7 @@ async def get_deck_recommendations(current_user: models.User = Depends(get_curre
             "title": item['deck'].title,
             "description": item['deck'].description,
             "tags": item['deck'].tags,
-            "card_count": len(item['deck'].cards),
+            "card_count": item['deck'].card_count,
             "popularity": item['popularity'],
             "relevance_score": item['score']
         }
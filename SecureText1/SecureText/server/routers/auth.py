@@ -1,42 +1,44 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
-from authlib.integrations.starlette_client import OAuth
-from authlib.integrations.starlette_client import OAuthError
-from starlette.config import Config
-import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from schemas import UserResponse, UserCreate, MessageResponse
-from auth import create_access_token, get_current_user, get_current_user_optional
+from auth import create_access_token, token_claims, get_current_user, get_current_user_optional
 import models
 import os
-from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from functools import lru_cache
 
-load_dotenv('../.env')
-
-# OAuth configuration with SSL handling
-config = Config()
-oauth = OAuth(config)
-
-# Create HTTP client with proper SSL configuration
-http_client = httpx.AsyncClient(
-    verify=True,  # Enable SSL verification
-    timeout=30.0,
-    limits=httpx.Limits(max_keepalive_connections=5, max_connections=10)
-)
-
-oauth.register(
-    name='google',
-    client_id=os.getenv('GOOGLE_CLIENT_ID'),
-    client_secret=os.getenv('GOOGLE_CLIENT_SECRET'),
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={
-        'scope': 'openid email profile'
-    },
-    # Use custom HTTP client
-    client=http_client
-)
+@lru_cache(maxsize=None)
+def get_oauth():
+    """Google OAuth client, built on first use (authlib and httpx are slow to import)"""
+    from authlib.integrations.starlette_client import OAuth
+    from starlette.config import Config
+    import httpx
+    
+    # OAuth configuration with SSL handling
+    oauth = OAuth(Config())
+    
+    # Create HTTP client with proper SSL configuration
+    http_client = httpx.AsyncClient(
+        verify=True,  # Enable SSL verification
+        timeout=30.0,
+        limits=httpx.Limits(max_keepalive_connections=5, max_connections=10)
+    )
+    
+    oauth.register(
+        name='google',
+        client_id=os.getenv('GOOGLE_CLIENT_ID'),
+        client_secret=os.getenv('GOOGLE_CLIENT_SECRET'),
+        server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+        client_kwargs={
+            'scope': 'openid email profile'
+        },
+        # Use custom HTTP client
+        client=http_client
+    )
+    return oauth
 
 router = APIRouter()
 
@@ -44,22 +46,22 @@ router = APIRouter()
 async def google_auth(request: Request):
     """Initiate Google OAuth flow"""
     redirect_uri = request.url_for('google_callback')
-    return await oauth.google.authorize_redirect(request, redirect_uri)
+    return await get_oauth().google.authorize_redirect(request, redirect_uri)
 
 @router.get("/google/callback")
-async def google_callback(request: Request, response: Response, db: Session = Depends(get_db)):
+async def google_callback(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """Handle Google OAuth callback"""
     try:
-        token = await oauth.google.authorize_access_token(request)
+        token = await get_oauth().google.authorize_access_token(request)
         user_info = token.get('userinfo')
         
         if not user_info:
             raise HTTPException(status_code=400, detail="Failed to get user info from Google")
         
         # Check if user exists
-        existing_user = db.query(models.User).filter(
-            models.User.google_id == user_info['sub']
-        ).first()
+        existing_user = await db.scalar(
+            select(models.User).where(models.User.google_id == user_info['sub'])
+        )
         
         if existing_user:
             user = existing_user
@@ -73,13 +75,13 @@ async def google_callback(request: Request, response: Response, db: Session = De
                 username_set=False
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
         
         # Create access token
         access_token_expires = timedelta(minutes=30)
         access_token = create_access_token(
-            data={"sub": user.email}, expires_delta=access_token_expires
+            data=token_claims(user), expires_delta=access_token_expires
         )
         
         # Create redirect response first
@@ -106,10 +108,10 @@ async def google_callback(request: Request, response: Response, db: Session = De
         raise HTTPException(status_code=400, detail=f"OAuth error: {str(e)}")
 
 @router.post("/demo-login", response_model=dict)
-async def demo_login(response: Response, db: Session = Depends(get_db)):
+async def demo_login(response: Response, db: AsyncSession = Depends(get_db)):
     """Demo login for testing - creates/gets demo user"""
     # Check if demo user exists
-    demo_user = db.query(models.User).filter(models.User.email == "demo@magizh.app").first()
+    demo_user = await db.scalar(select(models.User).where(models.User.email == "demo@magizh.app"))
     
     if not demo_user:
         # Create demo user
@@ -123,13 +125,13 @@ async def demo_login(response: Response, db: Session = Depends(get_db)):
             avatar_url="https://images.unsplash.com/photo-1472099645785-5658abf4ff4e?w=150&h=150&fit=crop&crop=face"
         )
         db.add(demo_user)
-        db.commit()
-        db.refresh(demo_user)
+        await db.commit()
+        await db.refresh(demo_user)
     
     # Create access token
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(
-        data={"sub": demo_user.email}, expires_delta=access_token_expires
+        data=token_claims(demo_user), expires_delta=access_token_expires
     )
     
     # Set HTTP-only cookie
@@ -156,10 +158,10 @@ async def demo_login(response: Response, db: Session = Depends(get_db)):
     }
 
 @router.post("/complete-signup", response_model=UserResponse)
-async def complete_signup(user_data: UserCreate, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def complete_signup(user_data: UserCreate, current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Complete user signup with username selection"""
     # Check if username is already taken
-    existing_user = db.query(models.User).filter(models.User.username == user_data.username).first()
+    existing_user = await db.scalar(select(models.User).where(models.User.username == user_data.username))
     if existing_user and existing_user.id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -171,8 +173,8 @@ async def complete_signup(user_data: UserCreate, current_user: models.User = Dep
     current_user.username_set = True
     current_user.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
     
     return current_user
 
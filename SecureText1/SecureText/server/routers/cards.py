@@ -1,29 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import insert, select, or_
 from typing import List, Optional
 from datetime import datetime
-from database import get_db
-from schemas import CardResponse, CardCreate, CardUpdate, MessageResponse
-from auth import get_current_user
+from database import AsyncSessionLocal, get_db
+from write_queue import run_write
+from pydantic import ValidationError
+from schemas import (
+    CardBase, CardResponse, CardSearchResult, CardCreate, CardUpdate, CardListFormat, DuplicatePolicy, BatchStatus,
+    CardBatchCreate, CardBatchUpdate, CardBatchUpdateItem, CardBatchDelete, CardBatchResult, CardBatchResponse
+)
+from auth import CurrentPrincipal, get_current_principal
+from services.card_hashes import CardHashService
+from services.deck_counters import DeckCounterService
+from services.bookmark_cache import BookmarkCache
+from services.deck_versions import DeckVersionService
+from services.public_deck_cache import PublicDeckCache, public_deck_cache
+from services.tags import TagService
+from pagination import Keyset, set_next_cursor
+from conditional import conditional_response, strong_etag
+import search as search_index
+import serialization
 import models
 
 router = APIRouter()
 
+# Cards in the order they were added
+CARD_KEYSET = Keyset(models.Card.created_at, models.Card.id, descending=False)
+DECK_CARD_ORDER = (models.Card.created_at, models.Card.id)
+# Cards fetched and written per chunk when a deck is streamed as NDJSON
+CARD_STREAM_BATCH_SIZE = 500
+
 @router.get("/", response_model=List[CardResponse])
 async def get_cards(
+    response: Response,
     deck_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 50,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,question,options"),
+    current_user: CurrentPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get cards for a deck"""
-    query = db.query(models.Card)
+    serializer = serialization.cards.only(fields)
+    query = select(models.Card).options(*serializer.load_only(models.Card))
     
     if deck_id:
         # Check if deck exists and user has access
-        deck = db.query(models.Deck).filter(models.Deck.id == deck_id).first()
+        deck = await db.get(models.Deck, deck_id)
         if not deck:
             raise HTTPException(status_code=404, detail="Deck not found")
         
@@ -31,64 +57,282 @@ async def get_cards(
         if not deck.is_public and deck.user_id != current_user.id:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        query = query.filter(models.Card.deck_id == deck_id)
+        query = query.where(models.Card.deck_id == deck_id)
     
     # Get cards with bookmark status for current user
-    cards = query.offset(skip).limit(limit).all()
+    rows, next_cursor = CARD_KEYSET.split((await db.execute(CARD_KEYSET.page(query, limit, cursor, skip))).all(), limit)
+    set_next_cursor(response, next_cursor)
+    cards = [row[0] for row in rows]
     
-    # Add bookmark status for each card
-    result = []
-    for card in cards:
-        is_bookmarked = db.query(models.CardBookmark).filter(
-            and_(
-                models.CardBookmark.user_id == current_user.id,
-                models.CardBookmark.card_id == card.id
+    result = serializer.many(cards)
+    if serializer.writes("is_bookmarked"):
+        # Bookmark status for the whole page from the caller's cached set
+        bookmarked_ids = await BookmarkCache.card_ids(db, current_user.id)
+        for card in result:
+            card.is_bookmarked = card.id in bookmarked_ids
+    
+    return serializer.response(result, response)
+
+@router.get("/search", response_model=List[CardSearchResult])
+async def search_cards(
+    q: str = Query(..., min_length=1),
+    deck_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 20,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,question,options"),
+    current_user: CurrentPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Search card questions and explanations in public decks and the user's own decks"""
+    serializer = serialization.card_search_results.only(fields)
+    query = select(models.Card).options(*serializer.load_only(models.Card)).join(models.Deck, models.Deck.id == models.Card.deck_id).where(
+        or_(
+            models.Deck.is_public == True,
+            models.Deck.user_id == current_user.id
+        )
+    )
+    
+    if deck_id:
+        query = query.where(models.Card.deck_id == deck_id)
+    
+    # Ranked full-text match where available, LIKE otherwise
+    match = search_index.match_expression(q)
+    ranked = match is not None and search_index.fts_enabled(db)
+    if ranked:
+        query = search_index.card_index.apply(query, models.Card.id, match)
+    else:
+        query = query.where(
+            or_(
+                models.Card.question.contains(q),
+                models.Card.explanation.contains(q)
             )
-        ).first() is not None
-        
-        card_response = CardResponse.from_orm(card)
-        card_response.is_bookmarked = is_bookmarked
-        result.append(card_response)
+        )
     
-    return result
+    rows = (await db.execute(query.offset(skip).limit(limit))).all()
+    bookmarked_ids = await BookmarkCache.card_ids(db, current_user.id)
+    
+    result = serializer.many(row[0] for row in rows)
+    for card, row in zip(result, rows):
+        card.is_bookmarked = card.id in bookmarked_ids
+        if ranked:
+            card.search_snippet = row.search_snippet
+    
+    return serializer.response(result)
 
 @router.post("/", response_model=CardResponse)
-async def create_card(card: CardCreate, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_card(
+    card: CardCreate,
+    on_duplicate: DuplicatePolicy = Query(DuplicatePolicy.ALLOW, description="skip or merge return the card already asking this question"),
+    current_user: CurrentPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
     """Create a new card"""
     # Check if deck exists and is owned by current user
-    deck = db.query(models.Deck).filter(models.Deck.id == card.deck_id).first()
+    deck = await db.get(models.Deck, card.deck_id)
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
     
     if deck.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
+    card_row = {
+        "deck_id": card.deck_id,
+        "question": card.question,
+        "question_type": models.QuestionType(card.question_type.value),
+        "options": card.options,
+        "correct_answers": card.correct_answers,
+        "explanation": card.explanation,
+        "image_url": card.image_url,
+        "tags": card.tags
+    }
+    
+    if on_duplicate != DuplicatePolicy.ALLOW:
+        duplicate = (await db.scalars(CardHashService.duplicates(card.deck_id, [CardHashService.of(card_row)]).limit(1))).first()
+        if duplicate:
+            if on_duplicate == DuplicatePolicy.MERGE and CardHashService.merge(duplicate, card_row):
+                await db.commit()
+            card_response = serialization.cards.one(duplicate)
+            card_response.is_bookmarked = duplicate.id in await BookmarkCache.card_ids(db, current_user.id)
+            return card_response
+    
     # Create new card
-    db_card = models.Card(
-        deck_id=card.deck_id,
-        question=card.question,
-        question_type=models.QuestionType(card.question_type.value),
-        options=card.options,
-        correct_answers=card.correct_answers,
-        explanation=card.explanation,
-        image_url=card.image_url,
-        tags=card.tags
-    )
+    db_card = models.Card(**card_row)
     
     db.add(db_card)
-    db.commit()
-    db.refresh(db_card)
+    await db.execute(DeckCounterService.adjust(card.deck_id, card_count=1))
+    await db.commit()
+    await db.refresh(db_card)
     
     # Create response with bookmark status (new cards are not bookmarked)
-    card_response = CardResponse.from_orm(db_card)
+    card_response = serialization.cards.one(db_card)
     card_response.is_bookmarked = False
     
     return card_response
 
+# Collections deleting a card cascades to (or detaches), loaded per batch instead of per card
+_CARD_DELETE_LOADS = [
+    selectinload(models.Card.tag_rows), selectinload(models.Card.bookmarks), selectinload(models.Card.feedback),
+    selectinload(models.Card.study_plans), selectinload(models.Card.quiz_answers),
+]
+
+# Columns a batch update may change but not clear
+_REQUIRED_CARD_FIELDS = ("question", "question_type", "correct_answers")
+
+def _validation_error(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors())
+
+def _batch_response(results: List[CardBatchResult]) -> CardBatchResponse:
+    results.sort(key=lambda result: result.index)
+    succeeded = sum(result.status not in (BatchStatus.INVALID, BatchStatus.NOT_FOUND) for result in results)
+    return CardBatchResponse(results=results, succeeded=succeeded, failed=len(results) - succeeded)
+
+async def _owned_deck(db: AsyncSession, deck_id: int, current_user: CurrentPrincipal) -> models.Deck:
+    """The deck a batch writes to, checked once for the whole batch"""
+    deck = await db.get(models.Deck, deck_id)
+    if not deck:
+        raise HTTPException(status_code=404, detail="Deck not found")
+    if deck.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return deck
+
+def _create_cards(db: Session, deck_id: int, card_rows: List[dict]) -> List[int]:
+    """Write unit: insert cards into the deck with one executemany; returns their ids in row order.
+
+    A bulk INSERT skips building and flushing a Card per row, so this does the
+    flush listeners' work itself: content hashes, tag rows, counters and the
+    deck's content version.
+    """
+    # RETURNING in parameter order pairs each row with its id, whatever else is writing to the table
+    card_ids = db.scalars(insert(models.Card).returning(models.Card.id, sort_by_parameter_order=True), [
+        {**card_row, "deck_id": deck_id, "content_hash": CardHashService.of(card_row)} for card_row in card_rows
+    ]).all()
+    tag_rows = [
+        {"card_id": card_id, "tag": tag}
+        for card_id, card_row in zip(card_ids, card_rows) for tag in TagService.normalize(card_row["tags"])
+    ]
+    if tag_rows:
+        db.execute(insert(models.CardTag), tag_rows)
+    db.execute(DeckCounterService.adjust(deck_id, card_count=len(card_rows)))
+    db.execute(DeckVersionService.bump([deck_id]))
+    return card_ids
+
+def _update_cards(db: Session, deck_id: int, changes: dict) -> List[int]:
+    """Write unit: apply {card_id: fields} to the deck's cards; returns the ids found"""
+    cards = db.scalars(
+        select(models.Card).options(selectinload(models.Card.tag_rows)).where(
+            models.Card.deck_id == deck_id, models.Card.id.in_(changes)
+        )
+    ).all()
+    for card in cards:
+        for field, value in changes[card.id].items():
+            setattr(card, field, value)
+    return [card.id for card in cards]
+
+def _delete_cards(db: Session, deck_id: int, card_ids: List[int]) -> List[int]:
+    """Write unit: delete the deck's cards among card_ids; returns the ids found"""
+    cards = db.scalars(
+        select(models.Card).options(*_CARD_DELETE_LOADS).where(
+            models.Card.deck_id == deck_id, models.Card.id.in_(card_ids)
+        )
+    ).all()
+    for card in cards:
+        db.delete(card)
+    if cards:
+        db.execute(DeckCounterService.adjust(deck_id, card_count=-len(cards)))
+    return [card.id for card in cards]
+
+def _card_ids(items, results: List[CardBatchResult]) -> dict:
+    """{card_id: index} for items naming a card once; repeats are reported as invalid"""
+    ids = {}
+    for index, card_id in items:
+        if card_id in ids:
+            results.append(CardBatchResult(index=index, id=card_id, status=BatchStatus.INVALID, error="Card appears more than once in the batch"))
+        else:
+            ids[card_id] = index
+    return ids
+
+@router.post("/batch", response_model=CardBatchResponse)
+async def create_cards_batch(batch: CardBatchCreate, current_user: CurrentPrincipal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
+    """Create many cards in one deck in a single transaction"""
+    await _owned_deck(db, batch.deck_id, current_user)
+    
+    results, card_rows, indexes = [], [], []
+    for index, item in enumerate(batch.cards):
+        try:
+            card = CardBase.model_validate(item)
+        except ValidationError as error:
+            results.append(CardBatchResult(index=index, status=BatchStatus.INVALID, error=_validation_error(error)))
+            continue
+        card_rows.append({**card.model_dump(), "question_type": models.QuestionType(card.question_type.value)})
+        indexes.append(index)
+    
+    if card_rows:
+        card_ids = await run_write(db, _create_cards, batch.deck_id, card_rows)
+        # Core inserts bypass the listing cache's flush bookkeeping
+        public_deck_cache.invalidate_tags({PublicDeckCache.deck_tag(batch.deck_id)})
+        results.extend(
+            CardBatchResult(index=index, id=card_id, status=BatchStatus.CREATED) for index, card_id in zip(indexes, card_ids)
+        )
+    return _batch_response(results)
+
+@router.patch("/batch", response_model=CardBatchResponse)
+async def update_cards_batch(batch: CardBatchUpdate, current_user: CurrentPrincipal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
+    """Update many cards of one deck in a single transaction"""
+    await _owned_deck(db, batch.deck_id, current_user)
+    
+    results, items = [], []
+    for index, item in enumerate(batch.cards):
+        try:
+            items.append((index, CardBatchUpdateItem.model_validate(item)))
+        except ValidationError as error:
+            card_id = item.get("id")
+            results.append(CardBatchResult(
+                index=index, id=card_id if isinstance(card_id, int) else None, status=BatchStatus.INVALID, error=_validation_error(error)
+            ))
+    indexes = _card_ids(((index, item.id) for index, item in items), results)
+    
+    changes = {}
+    for index, item in items:
+        if indexes.get(item.id) != index:
+            continue
+        fields = item.model_dump(exclude_unset=True, exclude={"id"})
+        cleared = [field for field in _REQUIRED_CARD_FIELDS if field in fields and fields[field] is None]
+        if cleared:
+            results.append(CardBatchResult(index=index, id=item.id, status=BatchStatus.INVALID, error=f"{', '.join(cleared)}: may not be null"))
+            continue
+        if "question_type" in fields:
+            fields["question_type"] = models.QuestionType(fields["question_type"].value)
+        changes[item.id] = fields
+    
+    updated = set(await run_write(db, _update_cards, batch.deck_id, changes)) if changes else set()
+    for card_id in changes:
+        if card_id in updated:
+            results.append(CardBatchResult(index=indexes[card_id], id=card_id, status=BatchStatus.UPDATED))
+        else:
+            results.append(CardBatchResult(index=indexes[card_id], id=card_id, status=BatchStatus.NOT_FOUND, error="Card not found in deck"))
+    return _batch_response(results)
+
+@router.delete("/batch", response_model=CardBatchResponse)
+async def delete_cards_batch(batch: CardBatchDelete, current_user: CurrentPrincipal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
+    """Delete many cards of one deck in a single transaction"""
+    await _owned_deck(db, batch.deck_id, current_user)
+    
+    results = []
+    indexes = _card_ids(enumerate(batch.card_ids), results)
+    deleted = set(await run_write(db, _delete_cards, batch.deck_id, list(indexes)))
+    for card_id, index in indexes.items():
+        if card_id in deleted:
+            results.append(CardBatchResult(index=index, id=card_id, status=BatchStatus.DELETED))
+        else:
+            results.append(CardBatchResult(index=index, id=card_id, status=BatchStatus.NOT_FOUND, error="Card not found in deck"))
+    return _batch_response(results)
+
 @router.get("/{card_id}", response_model=CardResponse)
-async def get_card(card_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_card(card_id: int, current_user: CurrentPrincipal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
     """Get a specific card"""
-    card = db.query(models.Card).filter(models.Card.id == card_id).first()
+    card = await db.scalar(
+        select(models.Card).options(selectinload(models.Card.deck)).where(models.Card.id == card_id)
+    )
     if not card:
         raise HTTPException(status_code=404, detail="Card not found")
     
@@ -98,22 +342,17 @@ async def get_card(card_id: int, current_user: models.User = Depends(get_current
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Check bookmark status
-    is_bookmarked = db.query(models.CardBookmark).filter(
-        and_(
-            models.CardBookmark.user_id == current_user.id,
-            models.CardBookmark.card_id == card.id
-        )
-    ).first() is not None
-    
-    card_response = CardResponse.from_orm(card)
-    card_response.is_bookmarked = is_bookmarked
+    card_response = serialization.cards.one(card)
+    card_response.is_bookmarked = card.id in await BookmarkCache.card_ids(db, current_user.id)
     
     return card_response
 
 @router.put("/{card_id}", response_model=CardResponse)
-async def update_card(card_id: int, card_update: CardUpdate, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def update_card(card_id: int, card_update: CardUpdate, current_user: CurrentPrincipal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
     """Update a card"""
-    card = db.query(models.Card).filter(models.Card.id == card_id).first()
+    card = await db.scalar(
+        select(models.Card).options(selectinload(models.Card.deck)).where(models.Card.id == card_id)
+    )
     if not card:
         raise HTTPException(status_code=404, detail="Card not found")
     
@@ -123,7 +362,7 @@ async def update_card(card_id: int, card_update: CardUpdate, current_user: model
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Update card fields
-    update_data = card_update.dict(exclude_unset=True)
+    update_data = card_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         if field == 'question_type':
             setattr(card, field, models.QuestionType(value))
@@ -131,26 +370,21 @@ async def update_card(card_id: int, card_update: CardUpdate, current_user: model
             setattr(card, field, value)
     
     card.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(card)
+    await db.commit()
+    await db.refresh(card)
     
     # Check bookmark status
-    is_bookmarked = db.query(models.CardBookmark).filter(
-        and_(
-            models.CardBookmark.user_id == current_user.id,
-            models.CardBookmark.card_id == card.id
-        )
-    ).first() is not None
-    
-    card_response = CardResponse.from_orm(card)
-    card_response.is_bookmarked = is_bookmarked
+    card_response = serialization.cards.one(card)
+    card_response.is_bookmarked = card.id in await BookmarkCache.card_ids(db, current_user.id)
     
     return card_response
 
 @router.delete("/{card_id}")
-async def delete_card(card_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_card(card_id: int, current_user: CurrentPrincipal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
     """Delete a card"""
-    card = db.query(models.Card).filter(models.Card.id == card_id).first()
+    card = await db.scalar(
+        select(models.Card).options(selectinload(models.Card.deck)).where(models.Card.id == card_id)
+    )
     if not card:
         raise HTTPException(status_code=404, detail="Card not found")
     
@@ -159,15 +393,31 @@ async def delete_card(card_id: int, current_user: models.User = Depends(get_curr
     if deck.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    db.delete(card)
-    db.commit()
+    await db.delete(card)
+    await db.execute(DeckCounterService.adjust(deck.id, card_count=-1))
+    await db.commit()
     
     return {"message": "Card deleted"}
 
+def _toggle_bookmark(db: Session, card_id: int, user_id: int) -> bool:
+    """Write unit: bookmark the card, or remove the bookmark if already set"""
+    existing_bookmark = db.get(models.CardBookmark, (user_id, card_id))
+    
+    if existing_bookmark:
+        # Remove bookmark
+        db.delete(existing_bookmark)
+        return False
+    
+    # Add bookmark
+    db.add(models.CardBookmark(user_id=user_id, card_id=card_id))
+    return True
+
 @router.post("/{card_id}/bookmark", response_model=dict)
-async def bookmark_card(card_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def bookmark_card(card_id: int, current_user: CurrentPrincipal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
     """Bookmark/unbookmark a card"""
-    card = db.query(models.Card).filter(models.Card.id == card_id).first()
+    card = await db.scalar(
+        select(models.Card).options(selectinload(models.Card.deck)).where(models.Card.id == card_id)
+    )
     if not card:
         raise HTTPException(status_code=404, detail="Card not found")
     
@@ -176,33 +426,46 @@ async def bookmark_card(card_id: int, current_user: models.User = Depends(get_cu
     if not deck.is_public and deck.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Check if already bookmarked
-    existing_bookmark = db.query(models.CardBookmark).filter(
-        and_(
-            models.CardBookmark.user_id == current_user.id,
-            models.CardBookmark.card_id == card_id
-        )
-    ).first()
-    
-    if existing_bookmark:
-        # Remove bookmark
-        db.delete(existing_bookmark)
-        db.commit()
-        return {"message": "Card unbookmarked", "is_bookmarked": False}
-    else:
-        # Add bookmark
-        bookmark = models.CardBookmark(
-            user_id=current_user.id,
-            card_id=card_id
-        )
-        db.add(bookmark)
-        db.commit()
+    is_bookmarked = await run_write(db, _toggle_bookmark, card_id, current_user.id)
+    if is_bookmarked:
         return {"message": "Card bookmarked", "is_bookmarked": True}
+    return {"message": "Card unbookmarked", "is_bookmarked": False}
+
+async def _stream_deck_cards(bind, serializer: serialization.Serializer, deck_id: int, bookmarked_ids: set):
+    """Chunks of a deck's cards read through a server-side cursor, so memory stays flat however big the deck is.
+
+    The body is sent after the handler returns, when the request's session has
+    already been torn down, so the cursor runs on a session of its own.
+    """
+    db = AsyncSessionLocal(bind=bind)
+    try:
+        # Plain rows rather than ORM instances: nothing is added to the session's identity map
+        columns = serializer.columns(models.Card) or [models.Card.__table__]
+        result = await db.stream(
+            select(*columns).where(models.Card.deck_id == deck_id).order_by(*DECK_CARD_ORDER)
+            .execution_options(yield_per=CARD_STREAM_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            items = serializer.many(rows)
+            for card in items:
+                card.is_bookmarked = card.id in bookmarked_ids
+            yield items
+    finally:
+        await db.close()
 
 @router.get("/decks/{deck_id}/cards", response_model=List[CardResponse])
-async def get_deck_cards(deck_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get cards for a specific deck"""
-    deck = db.query(models.Deck).filter(models.Deck.id == deck_id).first()
+async def get_deck_cards(
+    deck_id: int,
+    request: Request,
+    response: Response,
+    format: CardListFormat = CardListFormat.JSON,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,question,options"),
+    current_user: CurrentPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get cards for a specific deck; format=ndjson streams them one per line"""
+    serializer = serialization.cards.only(fields)
+    deck = await db.get(models.Deck, deck_id)
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
     
@@ -210,21 +473,32 @@ async def get_deck_cards(deck_id: int, current_user: models.User = Depends(get_c
     if not deck.is_public and deck.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
+    # The body only changes with the deck's content or the caller's bookmarks in it
+    bookmarked_ids = set()
+    if serializer.writes("is_bookmarked"):
+        bookmarked_ids = set((await db.execute(
+            select(models.CardBookmark.card_id).join(models.Card).where(
+                models.CardBookmark.user_id == current_user.id,
+                models.Card.deck_id == deck_id
+            )
+        )).scalars())
+    etag = strong_etag("deck-cards", deck.id, deck.content_version, sorted(bookmarked_ids), format.value, serializer.key)
+    not_modified = conditional_response(request, response, etag, deck.updated_at or deck.created_at)
+    if not_modified:
+        return not_modified
+    
+    if format == CardListFormat.NDJSON:
+        return serializer.stream(_stream_deck_cards(db.bind, serializer, deck_id, bookmarked_ids), response)
+    
     # Get all cards for this deck
-    cards = db.query(models.Card).filter(models.Card.deck_id == deck_id).all()
+    cards = (await db.execute(
+        select(models.Card).options(*serializer.load_only(models.Card)).where(models.Card.deck_id == deck_id).order_by(*DECK_CARD_ORDER)
+    )).scalars().all()
     
     # Add bookmark status for each card
-    result = []
-    for card in cards:
-        is_bookmarked = db.query(models.CardBookmark).filter(
-            and_(
-                models.CardBookmark.user_id == current_user.id,
-                models.CardBookmark.card_id == card.id
-            )
-        ).first() is not None
-        
-        card_response = CardResponse.from_orm(card)
-        card_response.is_bookmarked = is_bookmarked
-        result.append(card_response)
+    result = serializer.many(cards)
+    for card in result:
+        card.is_bookmarked = card.id in bookmarked_ids
     
-    return result
\ No newline at end of file
+    # Keeps the ETag and Last-Modified set above
+    return serializer.response(result, response)
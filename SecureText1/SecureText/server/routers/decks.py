@@ -1,105 +1,174 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy import select, func, literal_column, or_
 from typing import List, Optional
+from datetime import datetime
 from database import get_db
-from schemas import DeckResponse, DeckCreate, DeckUpdate, PaginatedResponse
+from write_queue import run_write
+from schemas import DeckResponse, DeckCreate, DeckUpdate, DeckSort, TagFacet, TagMatch
 from auth import get_current_user, get_current_user_optional
+from services.deck_counters import DeckCounterService
+from services.tags import TagService
+from services.public_deck_cache import PublicDeckCache, public_deck_cache
+from services.deck_rankings import DeckRankingService
+from pagination import Keyset, OffsetPage, set_next_cursor
+import search as search_index
+import serialization
 import models
 
 router = APIRouter()
 
+# Listing orders; trending and popular read the deck_rankings score indexes
+DECK_KEYSETS = {
+    DeckSort.NEWEST: Keyset(models.Deck.created_at, models.Deck.id),
+    DeckSort.TRENDING: Keyset(models.DeckRanking.trending_score, models.DeckRanking.deck_id),
+    DeckSort.POPULAR: Keyset(models.DeckRanking.popular_score, models.DeckRanking.deck_id),
+}
+
+def _listing_filters(current_user: Optional[models.User], public_only: bool, tags: Optional[str], tag_mode: TagMatch) -> list:
+    """Visibility and tag conditions shared by the deck listing and its tag facets"""
+    if public_only or not current_user:
+        filters = [models.Deck.is_public == True]
+    else:
+        # Show user's own decks and public decks
+        filters = [
+            or_(
+                models.Deck.is_public == True,
+                models.Deck.user_id == current_user.id
+            )
+        ]
+    
+    # Tags filter, answered from the deck_tags index
+    tag_list = TagService.parse(tags)
+    if tag_list:
+        filters.append(TagService.deck_filter(tag_list, match_all=tag_mode == TagMatch.ALL))
+    
+    return filters
+
+def _search_like(search: str):
+    """Substring search for databases without the full-text index"""
+    return or_(
+        models.Deck.title.contains(search),
+        models.Deck.description.contains(search)
+    )
+
+async def _mark_starred(db: AsyncSession, current_user: Optional[models.User], decks: List[DeckResponse], serializer: serialization.Serializer) -> List[DeckResponse]:
+    """Listing items with is_starred set for the caller, without touching the (possibly cached) input"""
+    if not decks or not current_user or not serializer.writes("is_starred"):
+        return decks
+    
+    # The caller's stars for the whole page in one query (counts are stored on the deck)
+    starred_ids = set((await db.scalars(
+        select(models.DeckStar.deck_id).where(
+            models.DeckStar.user_id == current_user.id,
+            models.DeckStar.deck_id.in_([deck.id for deck in decks])
+        )
+    )).all())
+    return [deck.model_copy(update={"is_starred": True}) if deck.id in starred_ids else deck for deck in decks]
+
 @router.get("/", response_model=List[DeckResponse])
 async def get_decks(
+    response: Response,
     skip: int = 0,
     limit: int = 20,
+    cursor: Optional[str] = None,
     public_only: bool = False,
     search: Optional[str] = None,
     tags: Optional[str] = Query(None),
+    tag_mode: TagMatch = TagMatch.ALL,
+    sort: Optional[DeckSort] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,owner.username"),
     current_user: Optional[models.User] = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get decks with pagination and filtering"""
-    query = db.query(models.Deck)
+    """Get decks with pagination and filtering (newest first, or by relevance when searching)"""
+    serializer = serialization.decks.only(fields)
     
-    # Filter by visibility
+    # Public listings are the same for every caller; only is_starred is added per caller
+    cache_key = None
     if public_only or not current_user:
-        query = query.filter(models.Deck.is_public == True)
-    elif current_user:
-        # Show user's own decks and public decks
-        query = query.filter(
-            or_(
-                models.Deck.is_public == True,
-                models.Deck.user_id == current_user.id
-            )
-        )
+        cache_key = (search, tuple(TagService.parse(tags)), tag_mode.value, sort, skip, limit, cursor, serializer.key)
+        cached = public_deck_cache.get(cache_key)
+        if cached is not None:
+            result, next_cursor = cached
+            set_next_cursor(response, next_cursor)
+            return serializer.response(await _mark_starred(db, current_user, result, serializer), response)
+        generation = public_deck_cache.generation
     
-    # Search filter
-    if search:
-        query = query.filter(
-            or_(
-                models.Deck.title.contains(search),
-                models.Deck.description.contains(search)
-            )
-        )
+    filters = _listing_filters(current_user, public_only, tags, tag_mode)
+    ranked_sort = sort in (DeckSort.TRENDING, DeckSort.POPULAR)
+    if ranked_sort and db.get_bind().dialect.name == "sqlite":
+        # Most decks pass the visibility filter. Without planner statistics SQLite would seek
+        # on it and sort every match; this makes it walk the score index and stop at the page.
+        filters[0] = func.likelihood(filters[0], literal_column("0.9"))
+    query = select(models.Deck).where(*filters)
+    
+    # Search filter: full-text match where available, LIKE otherwise. Results are in
+    # relevance order unless another order was asked for.
+    match = search_index.match_expression(search) if search else None
+    full_text = match is not None and search_index.fts_enabled(db)
+    ranked = full_text and sort is None
+    if ranked:
+        query = search_index.deck_index.apply(query, models.Deck.id, match)
+    elif full_text:
+        query = query.where(models.Deck.id.in_(search_index.deck_index.matching_ids(match)))
+    elif search:
+        query = query.where(_search_like(search))
+    
+    # Join with owner and populate deck.owner from the same row; fetch only the requested columns
+    query = query.join(models.User, models.User.id == models.Deck.user_id).options(
+        *serializer.load_only(models.Deck),
+        *serializer.load_only(models.User, "owner", contains_eager(models.Deck.owner))
+    )
+    
+    # Search results are in rank order, which only offsets can page through
+    if ranked:
+        query, start = OffsetPage.page(query, limit, cursor, skip)
+        rows, next_cursor = OffsetPage.split((await db.execute(query)).all(), limit, start)
+    else:
+        keyset = DECK_KEYSETS[sort or DeckSort.NEWEST]
+        if ranked_sort:
+            query = query.join(models.DeckRanking, models.DeckRanking.deck_id == models.Deck.id)
+        query = keyset.page(query, limit, cursor, skip)
+        rows, next_cursor = keyset.split((await db.execute(query)).all(), limit)
+    set_next_cursor(response, next_cursor)
     
-    # Tags filter
-    if tags:
-        tag_list = [tag.strip() for tag in tags.split(",")]
-        for tag in tag_list:
-            query = query.filter(models.Deck.tags.contains([tag]))
+    # Owners were loaded by the join, so this reads no further rows
+    result = serializer.many(row[0] for row in rows)
+    if ranked:
+        for deck, row in zip(result, rows):
+            deck.search_snippet = row.search_snippet
     
-    # Join with owner (but don't use add_columns)
-    query = query.join(models.User, models.User.id == models.Deck.user_id)
+    if cache_key is not None:
+        public_deck_cache.set_tagged(cache_key, (result, next_cursor), PublicDeckCache.page_tags(result, sort and sort.value), generation)
     
-    decks = query.offset(skip).limit(limit).all()
+    return serializer.response(await _mark_starred(db, current_user, result, serializer), response)
+
+@router.get("/facets", response_model=List[TagFacet])
+async def get_deck_tag_facets(
+    public_only: bool = False,
+    search: Optional[str] = None,
+    tags: Optional[str] = Query(None),
+    tag_mode: TagMatch = TagMatch.ALL,
+    limit: int = Query(TagService.FACET_LIMIT, ge=1, le=200),
+    current_user: Optional[models.User] = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_db)
+):
+    """Tag counts across all decks the listing returns for the same filters"""
+    filters = _listing_filters(current_user, public_only, tags, tag_mode)
     
-    # Format response
-    result = []
-    for deck in decks:
-        # Count cards
-        card_count = db.query(models.Card).filter(models.Card.deck_id == deck.id).count()
-        
-        # Check if starred by current user
-        is_starred = False
-        if current_user:
-            star = db.query(models.DeckStar).filter(
-                and_(models.DeckStar.deck_id == deck.id, models.DeckStar.user_id == current_user.id)
-            ).first()
-            is_starred = star is not None
-        
-        # Get owner details from user model
-        owner = deck.owner  # Since we joined with User
-        
-        deck_response = {
-            "id": deck.id,
-            "title": deck.title,
-            "description": deck.description,
-            "user_id": deck.user_id,
-            "is_public": deck.is_public,
-            "tags": deck.tags or [],
-            "created_at": deck.created_at,
-            "updated_at": deck.updated_at,
-            "owner": {
-                "id": owner.id,
-                "email": owner.email,
-                "name": owner.name,
-                "username": owner.username,
-                "username_set": owner.username_set,
-                "created_at": owner.created_at,
-                "bio": owner.bio,
-                "avatar_url": owner.avatar_url,
-                "updated_at": owner.updated_at
-            },
-            "card_count": card_count,
-            "is_starred": is_starred
-        }
-        result.append(deck_response)
+    match = search_index.match_expression(search) if search else None
+    if match is not None and search_index.fts_enabled(db):
+        filters.append(models.Deck.id.in_(search_index.deck_index.matching_ids(match)))
+    elif search:
+        filters.append(_search_like(search))
     
-    return result
+    rows = (await db.execute(TagService.deck_facets(filters, limit))).all()
+    return [{"tag": tag, "count": count} for tag, count in rows]
 
 @router.post("/", response_model=DeckResponse)
-async def create_deck(deck: DeckCreate, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_deck(deck: DeckCreate, current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Create a new deck"""
     db_deck = models.Deck(
         title=deck.title,
@@ -110,8 +179,8 @@ async def create_deck(deck: DeckCreate, current_user: models.User = Depends(get_
     )
     
     db.add(db_deck)
-    db.commit()
-    db.refresh(db_deck)
+    await db.commit()
+    await db.refresh(db_deck)
     
     # Return formatted response
     return {
@@ -123,23 +192,13 @@ async def create_deck(deck: DeckCreate, current_user: models.User = Depends(get_
         "tags": db_deck.tags or [],
         "created_at": db_deck.created_at,
         "updated_at": db_deck.updated_at,
-        "owner": {
-            "id": current_user.id,
-            "email": current_user.email,
-            "name": current_user.name,
-            "username": current_user.username,
-            "bio": current_user.bio,
-            "avatar_url": current_user.avatar_url,
-            "username_set": current_user.username_set,
-            "created_at": current_user.created_at,
-            "updated_at": current_user.updated_at
-        },
+        "owner": serialization.users.one(current_user),
         "card_count": 0,
         "is_starred": False
     }
 
 @router.get("/{deck_id}", response_model=DeckResponse)
-async def get_deck(deck_id: int, current_user: Optional[models.User] = Depends(get_current_user_optional), db: Session = Depends(get_db)):
+async def get_deck(deck_id: int, current_user: Optional[models.User] = Depends(get_current_user_optional), db: AsyncSession = Depends(get_db)):
     """Get a specific deck"""
     # Mock response for testing - return a sample deck
     from datetime import datetime
@@ -152,7 +211,7 @@ async def get_deck(deck_id: int, current_user: Optional[models.User] = Depends(g
         "tags": ["sample", "test"],
         "created_at": datetime.utcnow(),
         "updated_at": None,
-        "owner": {
+        "owner": serialization.users.one({
             "id": 1,
             "email": "test@example.com",
             "name": "Test User",
@@ -161,14 +220,13 @@ async def get_deck(deck_id: int, current_user: Optional[models.User] = Depends(g
             "avatar_url": None,
             "username_set": True,
             "created_at": datetime.utcnow(),
-            "updated_at": None
-        },
+        }),
         "card_count": 5,
         "is_starred": False
     }
 
 @router.put("/{deck_id}", response_model=DeckResponse)
-async def update_deck(deck_id: int, deck_update: DeckUpdate, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def update_deck(deck_id: int, deck_update: DeckUpdate, current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Update a deck"""
     # Mock response for testing - return updated deck data
     from datetime import datetime
@@ -181,57 +239,51 @@ async def update_deck(deck_id: int, deck_update: DeckUpdate, current_user: model
         "tags": deck_update.tags or ["updated"],
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
-        "owner": {
-            "id": current_user.id,
-            "email": current_user.email,
-            "name": current_user.name,
-            "username": current_user.username,
-            "bio": current_user.bio,
-            "avatar_url": current_user.avatar_url,
-            "username_set": current_user.username_set,
-            "created_at": current_user.created_at,
-            "updated_at": current_user.updated_at
-        },
+        "owner": serialization.users.one(current_user),
         "card_count": 5,
         "is_starred": False
     }
 
 @router.delete("/{deck_id}")
-async def delete_deck(deck_id: int, db: Session = Depends(get_db)):
+async def delete_deck(deck_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a deck"""
     # TODO: Implement deck deletion
     return {"message": "Deck deleted"}
 
+def _toggle_star(db: Session, deck_id: int, user_id: int) -> bool:
+    """Write unit: star the deck, or unstar it if already starred"""
+    existing_star = db.get(models.DeckStar, (user_id, deck_id))
+    
+    if existing_star:
+        # Unstar
+        db.delete(existing_star)
+        db.execute(DeckCounterService.adjust(deck_id, star_count=-1))
+        # The star's weight was scaled by the time it was made, which the row keeps
+        DeckRankingService.retract_star(db, deck_id, existing_star.created_at)
+        return False
+    
+    # Star, scored at the same moment the row records so an unstar can take it back exactly
+    starred_at = datetime.utcnow()
+    db.add(models.DeckStar(deck_id=deck_id, user_id=user_id, created_at=starred_at))
+    db.execute(DeckCounterService.adjust(deck_id, star_count=1))
+    DeckRankingService.record(db, deck_id, at=starred_at, stars=1)
+    return True
+
 @router.post("/{deck_id}/star")
-async def star_deck(deck_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def star_deck(deck_id: int, current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Star/unstar a deck"""
     # Check if deck exists
-    deck = db.query(models.Deck).filter(models.Deck.id == deck_id).first()
+    deck = await db.get(models.Deck, deck_id)
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
     
-    # Check if already starred
-    existing_star = db.query(models.DeckStar).filter(
-        and_(models.DeckStar.deck_id == deck_id, models.DeckStar.user_id == current_user.id)
-    ).first()
-    
-    if existing_star:
-        # Unstar
-        db.delete(existing_star)
-        message = "Deck unstarred"
-        is_starred = False
-    else:
-        # Star
-        new_star = models.DeckStar(deck_id=deck_id, user_id=current_user.id)
-        db.add(new_star)
-        message = "Deck starred"
-        is_starred = True
+    is_starred = await run_write(db, _toggle_star, deck_id, current_user.id)
+    message = "Deck starred" if is_starred else "Deck unstarred"
     
-    db.commit()
     return {"message": message, "is_starred": is_starred}
 
 @router.post("/{deck_id}/duplicate", response_model=DeckResponse)
-async def duplicate_deck(deck_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def duplicate_deck(deck_id: int, current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Duplicate a deck"""
     # Mock response for testing - return duplicated deck data
     from datetime import datetime
@@ -244,23 +296,13 @@ async def duplicate_deck(deck_id: int, current_user: models.User = Depends(get_c
         "tags": ["copy", "duplicated"],
         "created_at": datetime.utcnow(),
         "updated_at": None,
-        "owner": {
-            "id": current_user.id,
-            "email": current_user.email,
-            "name": current_user.name,
-            "username": current_user.username,
-            "bio": current_user.bio,
-            "avatar_url": current_user.avatar_url,
-            "username_set": current_user.username_set,
-            "created_at": current_user.created_at,
-            "updated_at": current_user.updated_at
-        },
+        "owner": serialization.users.one(current_user),
         "card_count": 5,
         "is_starred": False
     }
 
 @router.get("/{deck_id}/cards", response_model=List[dict])
-async def get_deck_cards(deck_id: int, current_user: Optional[models.User] = Depends(get_current_user_optional), db: Session = Depends(get_db)):
+async def get_deck_cards(deck_id: int, current_user: Optional[models.User] = Depends(get_current_user_optional), db: AsyncSession = Depends(get_db)):
     """Get cards for a specific deck"""
     # Mock validation - return 404 for non-existent decks
     if deck_id == 99999:
@@ -1,30 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Response
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Tuple
 import csv
 import json
 import io
 from database import get_db
-from schemas import DeckResponse, CardResponse, MessageResponse
+from write_queue import run_write
+from schemas import DeckResponse, CardResponse, MessageResponse, DuplicatePolicy
 from auth import get_current_user
+from services.card_hashes import CardHashService
+from services.deck_counters import DeckCounterService
+from conditional import conditional_response, strong_etag
 import models
 
 router = APIRouter()
 
+def _insert_cards(db: Session, deck_id: int, card_rows: List[dict], on_duplicate: DuplicatePolicy) -> Tuple[int, dict]:
+    """Write unit: insert parsed card rows into the deck; returns the number inserted and the duplicate counts"""
+    duplicates = {}
+    if on_duplicate != DuplicatePolicy.ALLOW:
+        card_rows, duplicates = CardHashService.dedupe(db, deck_id, card_rows, merge=on_duplicate == DuplicatePolicy.MERGE)
+    db.add_all([models.Card(**card_row) for card_row in card_rows])
+    if card_rows:
+        db.execute(DeckCounterService.adjust(deck_id, card_count=len(card_rows)))
+    return len(card_rows), duplicates
+
+def _duplicates_message(duplicates: dict) -> str:
+    return "".join(f". {count} duplicates {action}" for action, count in duplicates.items() if count)
+
 @router.post("/csv", response_model=MessageResponse)
 async def import_cards_from_csv(
     deck_id: int = Form(...),
     file: UploadFile = File(...),
+    on_duplicate: DuplicatePolicy = Form(DuplicatePolicy.SKIP),
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Import cards from CSV file"""
     # Verify deck ownership
-    deck = db.query(models.Deck).filter(
-        models.Deck.id == deck_id,
-        models.Deck.user_id == current_user.id
-    ).first()
+    deck = await db.scalar(
+        select(models.Deck).where(
+            models.Deck.id == deck_id,
+            models.Deck.user_id == current_user.id
+        )
+    )
     
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found or access denied")
@@ -38,7 +60,7 @@ async def import_cards_from_csv(
         csv_data = content.decode('utf-8')
         csv_reader = csv.DictReader(io.StringIO(csv_data))
         
-        cards_created = 0
+        card_rows = []
         errors = []
         
         for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 for header
@@ -66,26 +88,24 @@ async def import_cards_from_csv(
                 if row.get('tags'):
                     tags = [tag.strip() for tag in row['tags'].split(',')]
                 
-                # Create card
-                card = models.Card(
-                    deck_id=deck_id,
-                    question=row['question'].strip(),
-                    question_type=getattr(models.QuestionType, question_type.upper()),
-                    options=options,
-                    correct_answers=correct_answers,
-                    explanation=row.get('explanation', '').strip() or None,
-                    tags=tags
-                )
-                
-                db.add(card)
-                cards_created += 1
+                # Queue card for insert
+                card_rows.append({
+                    "deck_id": deck_id,
+                    "question": row['question'].strip(),
+                    "question_type": getattr(models.QuestionType, question_type.upper()),
+                    "options": options,
+                    "correct_answers": correct_answers,
+                    "explanation": row.get('explanation', '').strip() or None,
+                    "tags": tags
+                })
                 
             except Exception as e:
                 errors.append(f"Row {row_num}: {str(e)}")
         
-        db.commit()
+        # All parsed rows are written in a single write unit
+        cards_created, duplicates = await run_write(db, _insert_cards, deck_id, card_rows, on_duplicate)
         
-        message = f"Successfully imported {cards_created} cards"
+        message = f"Successfully imported {cards_created} cards" + _duplicates_message(duplicates)
         if errors:
             message += f". {len(errors)} errors occurred"
         
@@ -97,20 +117,30 @@ async def import_cards_from_csv(
 @router.get("/deck/{deck_id}", response_model=dict)
 async def export_deck(
     deck_id: int,
+    request: Request,
+    response: Response,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Export deck as JSON"""
     # Check deck access
-    deck = db.query(models.Deck).filter(models.Deck.id == deck_id).first()
+    deck = await db.get(models.Deck, deck_id)
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
     
     if not deck.is_public and deck.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
+    # A client holding this version of the export (exported_at aside) can keep it
+    etag = strong_etag("deck-export", deck.id, deck.content_version, current_user.username)
+    not_modified = conditional_response(request, response, etag, deck.updated_at or deck.created_at)
+    if not_modified:
+        return not_modified
+    
     # Get all cards for this deck
-    cards = db.query(models.Card).filter(models.Card.deck_id == deck_id).all()
+    cards = (await db.execute(
+        select(models.Card).where(models.Card.deck_id == deck_id).order_by(models.Card.created_at, models.Card.id)
+    )).scalars().all()
     
     # Format export data
     export_data = {
@@ -145,8 +175,9 @@ async def export_deck(
 @router.post("/deck", response_model=DeckResponse)
 async def import_deck(
     file: UploadFile = File(...),
+    on_duplicate: DuplicatePolicy = Form(DuplicatePolicy.SKIP),
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Import deck from JSON file"""
     if not file.filename.endswith('.json'):
@@ -173,28 +204,28 @@ async def import_deck(
         )
         
         db.add(new_deck)
-        db.commit()
-        db.refresh(new_deck)
+        await db.commit()
+        await db.refresh(new_deck)
         
         # Create cards
-        cards_created = 0
+        card_rows = []
         for card_data in cards_data:
             try:
-                card = models.Card(
-                    deck_id=new_deck.id,
-                    question=card_data['question'],
-                    question_type=getattr(models.QuestionType, card_data['question_type'].upper()),
-                    options=card_data.get('options', []),
-                    correct_answers=card_data['correct_answers'],
-                    explanation=card_data.get('explanation'),
-                    tags=card_data.get('tags', [])
-                )
-                db.add(card)
-                cards_created += 1
+                card_rows.append({
+                    "deck_id": new_deck.id,
+                    "question": card_data['question'],
+                    "question_type": getattr(models.QuestionType, card_data['question_type'].upper()),
+                    "options": card_data.get('options', []),
+                    "correct_answers": card_data['correct_answers'],
+                    "explanation": card_data.get('explanation'),
+                    "tags": card_data.get('tags', [])
+                })
             except Exception as e:
                 continue  # Skip invalid cards
         
-        db.commit()
+        # The deck is new, so duplicates can only repeat other cards in the file
+        cards_created, duplicates = await db.run_sync(_insert_cards, new_deck.id, card_rows, on_duplicate)
+        await db.commit()
         
         # Log activity
         activity = models.ActivityLog(
@@ -202,12 +233,15 @@ async def import_deck(
             action_type=models.ActionType.CREATE_DECK,
             resource_type="deck",
             resource_id=new_deck.id,
-            extra_data={"imported": True, "cards_count": cards_created}
+            extra_data={"imported": True, "cards_count": cards_created, "duplicates": duplicates}
         )
         db.add(activity)
-        db.commit()
+        await db.commit()
         
-        return DeckResponse.from_orm(new_deck)
+        new_deck = await db.scalar(
+            select(models.Deck).options(selectinload(models.Deck.owner)).where(models.Deck.id == new_deck.id)
+        )
+        return DeckResponse.model_validate(new_deck)
         
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON file")
@@ -1,53 +1,82 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import select, func
+from typing import List, Optional
 from datetime import datetime, timedelta
 from database import get_db
+from write_queue import run_write
 from schemas import (
     QuizSessionCreate, QuizSessionResponse, QuizAnswerSubmit, 
-    MessageResponse, DashboardStats
+    MessageResponse, DashboardStats, TagMatch
 )
-from auth import get_current_user
+from auth import CurrentPrincipal, get_current_principal
 from services.spaced_repetition import SpacedRepetitionService
+from services.answer_keys import AnswerKeyCache
 from services.gamification import GamificationService
+from services.deck_counters import DeckCounterService
+from services.tags import TagService
+from services.deck_rankings import DeckRankingService
+from pagination import Keyset, set_next_cursor
 import models
 
 router = APIRouter()
 
+# Most recent sessions first
+SESSION_KEYSET = Keyset(models.QuizSession.started_at, models.QuizSession.id)
+
+def _session_with_deck():
+    """Select quiz sessions with the nested deck/owner QuizSessionResponse renders"""
+    return select(models.QuizSession).options(
+        selectinload(models.QuizSession.deck).selectinload(models.Deck.owner)
+    )
+
 @router.post("/sessions", response_model=QuizSessionResponse)
 async def start_quiz_session(
     session_data: QuizSessionCreate,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Start a new quiz session"""
+    mode = models.QuizMode(session_data.mode.value)
+    
     # Verify deck exists and user has access
-    deck = db.query(models.Deck).filter(models.Deck.id == session_data.deck_id).first()
+    deck = await db.get(models.Deck, session_data.deck_id)
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
     
     if not deck.is_public and deck.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied to private deck")
     
+    # Optionally only quiz on cards carrying the requested tags
+    tag_list = TagService.normalize(session_data.tags)
+    tag_filter = None
+    if tag_list:
+        tag_filter = TagService.card_filter(tag_list, match_all=session_data.tag_mode == TagMatch.ALL)
+    card_filters = [models.Card.deck_id == session_data.deck_id]
+    if tag_filter is not None:
+        card_filters.append(tag_filter)
+    
     # Get cards for this session
-    if session_data.mode == models.QuizMode.REVIEW:
+    if mode == models.QuizMode.REVIEW:
         # Review mode: get cards that were answered incorrectly
-        cards = db.query(models.Card).join(models.QuizAnswer).join(models.QuizSession).filter(
-            models.Card.deck_id == session_data.deck_id,
-            models.QuizSession.user_id == current_user.id,
-            models.QuizAnswer.is_correct == False
-        ).distinct().limit(20).all()
-    elif session_data.mode == models.QuizMode.STUDY:
+        cards = (await db.execute(
+            select(models.Card).join(models.QuizAnswer).join(models.QuizSession).where(
+                *card_filters,
+                models.QuizSession.user_id == current_user.id,
+                models.QuizAnswer.is_correct == False
+            ).distinct().limit(20)
+        )).scalars().all()
+    elif mode == models.QuizMode.STUDY:
         # Study mode: use spaced repetition
-        cards = SpacedRepetitionService.get_adaptive_deck_cards(
-            db, current_user.id, session_data.deck_id
-        )[:20]
+        cards = (await db.run_sync(
+            SpacedRepetitionService.get_adaptive_deck_cards, current_user.id, session_data.deck_id, tag_filter
+        ))[:20]
     else:
         # Exam mode: all cards in random order
-        cards = db.query(models.Card).filter(
-            models.Card.deck_id == session_data.deck_id
-        ).order_by(func.random()).limit(20).all()
+        cards = (await db.execute(
+            select(models.Card).where(*card_filters).order_by(func.random()).limit(20)
+        )).scalars().all()
     
     if not cards:
         raise HTTPException(status_code=400, detail="No cards available for this quiz")
@@ -56,29 +85,49 @@ async def start_quiz_session(
     quiz_session = models.QuizSession(
         user_id=current_user.id,
         deck_id=session_data.deck_id,
-        mode=session_data.mode,
+        mode=mode,
         total_questions=len(cards)
     )
     
     db.add(quiz_session)
-    db.commit()
-    db.refresh(quiz_session)
+    await db.commit()
+    
+    quiz_session = await db.scalar(_session_with_deck().where(models.QuizSession.id == quiz_session.id))
+    response = QuizSessionResponse.model_validate(quiz_session)
+    response.card_ids = [card.id for card in cards]
+    return response
+
+def _record_answer(db: Session, session_id: int, user_id: int, card_id: int, user_answers: List[str],
+                   is_correct: bool, difficulty_rating, time_taken, study_mode: bool):
+    """Write unit: store an answer and advance the card's study plan"""
+    db.add(models.QuizAnswer(
+        session_id=session_id,
+        card_id=card_id,
+        user_answers=user_answers,
+        is_correct=is_correct,
+        difficulty_rating=difficulty_rating,
+        time_taken=time_taken
+    ))
     
-    return quiz_session
+    # Update spaced repetition plan if in study mode
+    if study_mode and difficulty_rating:
+        SpacedRepetitionService.update_study_plan(db, user_id, card_id, is_correct, difficulty_rating)
 
 @router.post("/sessions/{session_id}/answers", response_model=MessageResponse)
 async def submit_quiz_answer(
     session_id: int,
     answer_data: QuizAnswerSubmit,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Submit an answer for a quiz question"""
     # Verify session belongs to user
-    session = db.query(models.QuizSession).filter(
-        models.QuizSession.id == session_id,
-        models.QuizSession.user_id == current_user.id
-    ).first()
+    session = await db.scalar(
+        select(models.QuizSession).where(
+            models.QuizSession.id == session_id,
+            models.QuizSession.user_id == current_user.id
+        )
+    )
     
     if not session:
         raise HTTPException(status_code=404, detail="Quiz session not found")
@@ -86,79 +135,72 @@ async def submit_quiz_answer(
     if session.completed_at:
         raise HTTPException(status_code=400, detail="Quiz session already completed")
     
-    # Get the card
-    card = db.query(models.Card).filter(models.Card.id == answer_data.card_id).first()
-    if not card:
+    # Grade against the card's compiled answer key
+    answer_key = await AnswerKeyCache.get(db, answer_data.card_id)
+    if not answer_key:
         raise HTTPException(status_code=404, detail="Card not found")
     
-    # Check if answer is correct
-    is_correct = set(answer_data.user_answers) == set(card.correct_answers)
-    
-    # Create quiz answer
-    quiz_answer = models.QuizAnswer(
-        session_id=session_id,
-        card_id=answer_data.card_id,
-        user_answers=answer_data.user_answers,
-        is_correct=is_correct,
-        difficulty_rating=answer_data.difficulty_rating,
-        time_taken=answer_data.time_taken
+    is_correct = answer_key.grade(answer_data.user_answers)
+    difficulty_rating = (
+        models.Difficulty(answer_data.difficulty_rating.value) if answer_data.difficulty_rating else None
     )
     
-    db.add(quiz_answer)
-    
-    # Update spaced repetition plan if in study mode
-    if session.mode == models.QuizMode.STUDY and answer_data.difficulty_rating:
-        SpacedRepetitionService.update_study_plan(
-            db, current_user.id, answer_data.card_id, 
-            is_correct, answer_data.difficulty_rating
-        )
-    
-    db.commit()
+    await run_write(
+        db, _record_answer, session_id, current_user.id, answer_data.card_id, answer_data.user_answers,
+        is_correct, difficulty_rating, answer_data.time_taken, session.mode == models.QuizMode.STUDY
+    )
     
     return {"message": "Answer submitted successfully"}
 
-@router.post("/sessions/{session_id}/complete", response_model=QuizSessionResponse)
-async def complete_quiz_session(
-    session_id: int,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Complete a quiz session and calculate score"""
-    # Get session with answers
-    session = db.query(models.QuizSession).filter(
-        models.QuizSession.id == session_id,
-        models.QuizSession.user_id == current_user.id
-    ).first()
-    
-    if not session:
-        raise HTTPException(status_code=404, detail="Quiz session not found")
+def _complete_session(db: Session, session_id: int, user_id: int):
+    """Write unit: score a session and update progress, activity and daily challenge"""
+    session = db.get(models.QuizSession, session_id)
     
+    # Re-checked here since another request may have completed it since validation
     if session.completed_at:
         raise HTTPException(status_code=400, detail="Quiz session already completed")
     
     # Calculate score
-    correct_answers = db.query(models.QuizAnswer).filter(
-        models.QuizAnswer.session_id == session_id,
-        models.QuizAnswer.is_correct == True
-    ).count()
+    correct_answers = db.scalar(
+        select(func.count()).select_from(models.QuizAnswer).where(
+            models.QuizAnswer.session_id == session_id,
+            models.QuizAnswer.is_correct == True
+        )
+    )
     
-    total_answers = db.query(models.QuizAnswer).filter(
-        models.QuizAnswer.session_id == session_id
-    ).count()
+    total_answers = db.scalar(
+        select(func.count()).select_from(models.QuizAnswer).where(
+            models.QuizAnswer.session_id == session_id
+        )
+    )
     
     session.score = correct_answers
     session.completed_at = datetime.utcnow()
+    db.execute(DeckCounterService.adjust(session.deck_id, session_count=1))
+    
+    # The user's first completed session on the deck also makes them a learner of it
+    returning_learner = db.scalar(
+        select(models.QuizSession.id).where(
+            models.QuizSession.deck_id == session.deck_id,
+            models.QuizSession.user_id == user_id,
+            models.QuizSession.completed_at.isnot(None),
+            models.QuizSession.id != session_id
+        ).limit(1)
+    )
+    DeckRankingService.record(
+        db, session.deck_id, at=session.completed_at, sessions=1, learners=0 if returning_learner else 1
+    )
     
     # Update user progress
-    progress = db.query(models.UserProgress).filter(
-        models.UserProgress.user_id == current_user.id,
-        models.UserProgress.deck_id == session.deck_id
-    ).first()
+    progress = db.get(models.UserProgress, (user_id, session.deck_id))
     
     if not progress:
         progress = models.UserProgress(
-            user_id=current_user.id,
-            deck_id=session.deck_id
+            user_id=user_id,
+            deck_id=session.deck_id,
+            total_attempts=0,
+            best_score=0.0,
+            mastery_level=0.0
         )
         db.add(progress)
     
@@ -174,7 +216,7 @@ async def complete_quiz_session(
     
     # Log activity
     activity = models.ActivityLog(
-        user_id=current_user.id,
+        user_id=user_id,
         action_type=models.ActionType.COMPLETE_QUIZ,
         resource_type="quiz",
         resource_id=session_id,
@@ -189,65 +231,100 @@ async def complete_quiz_session(
     
     # Update daily challenge if applicable
     if session.mode == models.QuizMode.EXAM:
-        today_challenge = db.query(models.DailyChallenge).filter(
-            models.DailyChallenge.user_id == current_user.id,
-            func.date(models.DailyChallenge.date) == datetime.utcnow().date(),
-            models.DailyChallenge.deck_id == session.deck_id,
-            models.DailyChallenge.completed == False
-        ).first()
+        today_challenge = db.scalar(
+            select(models.DailyChallenge).where(
+                models.DailyChallenge.user_id == user_id,
+                func.date(models.DailyChallenge.date) == datetime.utcnow().date(),
+                models.DailyChallenge.deck_id == session.deck_id,
+                models.DailyChallenge.completed == False
+            )
+        )
         
         if today_challenge:
             GamificationService.complete_daily_challenge(
                 db, today_challenge.id, correct_answers, total_answers
             )
+
+@router.post("/sessions/{session_id}/complete", response_model=QuizSessionResponse)
+async def complete_quiz_session(
+    session_id: int,
+    current_user: CurrentPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Complete a quiz session and calculate score"""
+    # Get session with answers
+    session = await db.scalar(
+        select(models.QuizSession).where(
+            models.QuizSession.id == session_id,
+            models.QuizSession.user_id == current_user.id
+        )
+    )
     
-    db.commit()
-    db.refresh(session)
+    if not session:
+        raise HTTPException(status_code=404, detail="Quiz session not found")
     
-    return session
+    if session.completed_at:
+        raise HTTPException(status_code=400, detail="Quiz session already completed")
+    
+    await run_write(db, _complete_session, session_id, current_user.id)
+    
+    # Reload - the write may have gone through the writer thread's session
+    return await db.scalar(
+        _session_with_deck().where(models.QuizSession.id == session_id).execution_options(populate_existing=True)
+    )
 
 @router.get("/dashboard", response_model=DashboardStats)
 async def get_dashboard_stats(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get dashboard statistics for the user"""
     # Total decks created
-    total_decks = db.query(models.Deck).filter(models.Deck.user_id == current_user.id).count()
+    total_decks = await db.scalar(
+        select(func.count()).select_from(models.Deck).where(models.Deck.user_id == current_user.id)
+    )
     
     # Total quiz sessions completed
-    total_sessions = db.query(models.QuizSession).filter(
-        models.QuizSession.user_id == current_user.id,
-        models.QuizSession.completed_at.isnot(None)
-    ).count()
+    total_sessions = await db.scalar(
+        select(func.count()).select_from(models.QuizSession).where(
+            models.QuizSession.user_id == current_user.id,
+            models.QuizSession.completed_at.isnot(None)
+        )
+    )
     
     # Cards studied (unique cards answered)
-    cards_studied = db.query(models.QuizAnswer.card_id).join(models.QuizSession).filter(
-        models.QuizSession.user_id == current_user.id
-    ).distinct().count()
+    cards_studied = await db.scalar(
+        select(func.count(func.distinct(models.QuizAnswer.card_id))).join(models.QuizSession).where(
+            models.QuizSession.user_id == current_user.id
+        )
+    )
     
     # Average score
-    avg_score_result = db.query(
-        func.avg(models.QuizSession.score / models.QuizSession.total_questions * 100)
-    ).filter(
-        models.QuizSession.user_id == current_user.id,
-        models.QuizSession.completed_at.isnot(None)
-    ).scalar()
+    avg_score_result = await db.scalar(
+        select(
+            func.avg(models.QuizSession.score / models.QuizSession.total_questions * 100)
+        ).where(
+            models.QuizSession.user_id == current_user.id,
+            models.QuizSession.completed_at.isnot(None)
+        )
+    )
     
     avg_score = avg_score_result or 0.0
     
     # Current streak
-    streak = db.query(models.Streak).filter(models.Streak.user_id == current_user.id).first()
+    streak = await db.get(models.Streak, current_user.id)
     current_streak = streak.current_streak if streak else 0
     
     # Weekly activity (last 7 days)
     weekly_activity = []
     for i in range(7):
         day = datetime.utcnow().date() - timedelta(days=i)
-        day_sessions = db.query(models.QuizSession).filter(
-            models.QuizSession.user_id == current_user.id,
-            func.date(models.QuizSession.completed_at) == day
-        ).count()
+        day_sessions = await db.scalar(
+            select(func.count()).select_from(models.QuizSession).where(
+                models.QuizSession.user_id == current_user.id,
+                func.date(models.QuizSession.completed_at) == day
+            )
+        )
         weekly_activity.append(day_sessions)
     
     weekly_activity.reverse()  # Oldest to newest
@@ -264,14 +341,16 @@ async def get_dashboard_stats(
 @router.get("/sessions/{session_id}", response_model=QuizSessionResponse)
 async def get_quiz_session(
     session_id: int,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get details of a specific quiz session"""
-    session = db.query(models.QuizSession).filter(
-        models.QuizSession.id == session_id,
-        models.QuizSession.user_id == current_user.id
-    ).first()
+    session = await db.scalar(
+        _session_with_deck().where(
+            models.QuizSession.id == session_id,
+            models.QuizSession.user_id == current_user.id
+        )
+    )
     
     if not session:
         raise HTTPException(status_code=404, detail="Quiz session not found")
@@ -280,14 +359,18 @@ async def get_quiz_session(
 
 @router.get("/sessions", response_model=List[QuizSessionResponse])
 async def get_user_quiz_sessions(
+    response: Response,
     skip: int = 0,
     limit: int = 20,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    current_user: CurrentPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user's quiz sessions"""
-    sessions = db.query(models.QuizSession).filter(
-        models.QuizSession.user_id == current_user.id
-    ).order_by(models.QuizSession.started_at.desc()).offset(skip).limit(limit).all()
+    query = SESSION_KEYSET.page(
+        _session_with_deck().where(models.QuizSession.user_id == current_user.id), limit, cursor, skip
+    )
+    rows, next_cursor = SESSION_KEYSET.split((await db.execute(query)).all(), limit)
+    set_next_cursor(response, next_cursor)
     
-    return sessions
\ No newline at end of file
+    return [row[0] for row in rows]
\ No newline at end of file
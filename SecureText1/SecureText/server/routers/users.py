@@ -1,48 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, extract
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func, and_, or_, extract
 from datetime import datetime, timedelta
 from typing import List, Optional
 from database import get_db
 from schemas import UserResponse, DeckResponse, ProgressResponse, StreakResponse
 from auth import get_current_user
+from pagination import Keyset, set_next_cursor
+from conditional import conditional_response, strong_etag
+import search as search_index
+import serialization
 import models
 
 router = APIRouter()
 
+# Newest first
+USER_KEYSET = Keyset(models.User.created_at, models.User.id)
+ACTIVITY_KEYSET = Keyset(models.ActivityLog.created_at, models.ActivityLog.id)
+
 @router.get("/discover", response_model=List[UserResponse])
 async def get_users_for_discovery(
+    response: Response,
     skip: int = 0,
     limit: int = 20,
+    cursor: Optional[str] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get users for discovery page"""
-    query = db.query(models.User).filter(models.User.username_set == True)
+    query = select(models.User).where(models.User.username_set == True)
     
     if search:
-        query = query.filter(
+        query = query.where(
             models.User.username.contains(search) | 
             models.User.name.contains(search)
         )
     
-    users = query.offset(skip).limit(limit).all()
+    rows, next_cursor = USER_KEYSET.split((await db.execute(USER_KEYSET.page(query, limit, cursor, skip))).all(), limit)
+    set_next_cursor(response, next_cursor)
+    users = [row[0] for row in rows]
     
     result = []
     for user in users:
         # Count user's public decks
-        total_decks = db.query(models.Deck).filter(
-            models.Deck.user_id == user.id,
-            models.Deck.is_public == True
-        ).count()
+        total_decks = await db.scalar(
+            select(func.count()).select_from(models.Deck).where(
+                models.Deck.user_id == user.id,
+                models.Deck.is_public == True
+            )
+        )
         
         # Count total stars received on user's decks
-        total_stars = db.query(models.DeckStar).join(models.Deck).filter(
-            models.Deck.user_id == user.id
-        ).count()
+        total_stars = await db.scalar(
+            select(func.count()).select_from(models.DeckStar).join(models.Deck).where(
+                models.Deck.user_id == user.id
+            )
+        )
         
         # Get streak information
-        streak = db.query(models.Streak).filter(models.Streak.user_id == user.id).first()
+        streak = await db.get(models.Streak, user.id)
         current_streak = streak.current_streak if streak else 0
         
         result.append({
@@ -63,35 +80,39 @@ async def get_users_for_discovery(
     return result
 
 @router.get("/profile/{username}", response_model=UserResponse)
-async def get_user_profile(username: str, db: Session = Depends(get_db)):
+async def get_user_profile(username: str, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """Get user profile by username"""
     print(f"DEBUG - Looking for username: {username}")
-    user = db.query(models.User).filter(models.User.username == username).first()
+    user = await db.scalar(select(models.User).where(models.User.username == username))
     print(f"DEBUG - Found user: {user}")
     if user:
         print(f"DEBUG - User details: id={user.id}, username={user.username}, email={user.email}")
     if not user:
         # Debug: Show all users in database
-        all_users = db.query(models.User).all()
+        all_users = (await db.execute(select(models.User))).scalars().all()
         print(f"DEBUG - All users in database: {[(u.id, u.username, u.email) for u in all_users]}")
         raise HTTPException(status_code=404, detail="User not found")
     
     # Count user's public decks
-    total_decks = db.query(models.Deck).filter(
-        models.Deck.user_id == user.id,
-        models.Deck.is_public == True
-    ).count()
+    total_decks = await db.scalar(
+        select(func.count()).select_from(models.Deck).where(
+            models.Deck.user_id == user.id,
+            models.Deck.is_public == True
+        )
+    )
     
     # Count total stars received on user's decks
-    total_stars = db.query(models.DeckStar).join(models.Deck).filter(
-        models.Deck.user_id == user.id
-    ).count()
+    total_stars = await db.scalar(
+        select(func.count()).select_from(models.DeckStar).join(models.Deck).where(
+            models.Deck.user_id == user.id
+        )
+    )
     
     # Get streak information
-    streak = db.query(models.Streak).filter(models.Streak.user_id == user.id).first()
+    streak = await db.get(models.Streak, user.id)
     current_streak = streak.current_streak if streak else 0
     
-    return {
+    profile = {
         "id": user.id,
         "email": user.email,
         "name": user.name,
@@ -105,6 +126,12 @@ async def get_user_profile(username: str, db: Session = Depends(get_db)):
         "total_stars": total_stars,
         "current_streak": current_streak
     }
+    
+    # Stars and streaks change without touching the user row, so the tag covers the whole body
+    not_modified = conditional_response(
+        request, response, strong_etag("profile", profile), user.updated_at or user.created_at
+    )
+    return not_modified or profile
 
 @router.get("/profile/{username}/decks", response_model=List[DeckResponse])
 async def get_user_decks(
@@ -112,125 +139,91 @@ async def get_user_decks(
     skip: int = 0,
     limit: int = 20,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,owner.username"),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user's public decks"""
-    user = db.query(models.User).filter(models.User.username == username).first()
+    serializer = serialization.decks.only(fields)
+    user = await db.scalar(select(models.User).where(models.User.username == username))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    query = db.query(models.Deck).filter(
+    query = select(models.Deck).where(
         models.Deck.user_id == user.id,
         models.Deck.is_public == True
     )
     
-    if search:
-        query = query.filter(models.Deck.title.contains(search))
-    
-    decks = query.offset(skip).limit(limit).all()
-    
-    result = []
-    for deck in decks:
-        card_count = db.query(models.Card).filter(models.Card.deck_id == deck.id).count()
-        star_count = db.query(models.DeckStar).filter(models.DeckStar.deck_id == deck.id).count()
-        
-        result.append({
-            "id": deck.id,
-            "title": deck.title,
-            "description": deck.description,
-            "user_id": deck.user_id,
-            "is_public": deck.is_public,
-            "tags": deck.tags or [],
-            "created_at": deck.created_at,
-            "updated_at": deck.updated_at,
-            "card_count": card_count,
-            "star_count": star_count,
-            "is_starred": False,
-            "owner": {
-                "id": user.id,
-                "email": user.email,
-                "username": user.username,
-                "name": user.name,
-                "username_set": user.username_set,
-                "created_at": user.created_at,
-                "updated_at": user.updated_at,
-                "bio": user.bio,
-                "avatar_url": user.avatar_url
-            }
-        })
+    # Ranked full-text match where available, LIKE otherwise
+    match = search_index.match_expression(search) if search else None
+    ranked = match is not None and search_index.fts_enabled(db)
+    if ranked:
+        query = search_index.deck_index.apply(query, models.Deck.id, match)
+    elif search:
+        query = query.where(models.Deck.title.contains(search))
+    
+    # The owner is already in the session, so loading it reads no further rows
+    query = query.options(
+        *serializer.load_only(models.Deck),
+        *serializer.load_only(models.User, "owner", selectinload(models.Deck.owner))
+    )
+    rows = (await db.execute(query.offset(skip).limit(limit))).all()
     
-    return result
+    result = serializer.many(row[0] for row in rows)
+    if ranked:
+        for deck, row in zip(result, rows):
+            deck.search_snippet = row.search_snippet
+    return serializer.response(result)
 
 @router.get("/profile/{username}/stars", response_model=List[DeckResponse])
 async def get_user_starred_decks(
     username: str,
     skip: int = 0,
     limit: int = 20,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,owner.username"),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user's starred decks"""
-    user = db.query(models.User).filter(models.User.username == username).first()
+    serializer = serialization.decks.only(fields)
+    user = await db.scalar(select(models.User).where(models.User.username == username))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Get starred decks
-    starred_decks = db.query(models.Deck).join(
-        models.DeckStar
-    ).filter(
-        models.DeckStar.user_id == user.id,
-        models.Deck.is_public == True
-    ).offset(skip).limit(limit).all()
-    
-    result = []
-    for deck in starred_decks:
-        card_count = db.query(models.Card).filter(models.Card.deck_id == deck.id).count()
-        star_count = db.query(models.DeckStar).filter(models.DeckStar.deck_id == deck.id).count()
-        
-        result.append({
-            "id": deck.id,
-            "title": deck.title,
-            "description": deck.description,
-            "user_id": deck.user_id,
-            "is_public": deck.is_public,
-            "tags": deck.tags or [],
-            "created_at": deck.created_at,
-            "updated_at": deck.updated_at,
-            "card_count": card_count,
-            "star_count": star_count,
-            "is_starred": False,
-            "owner": {
-                "id": deck.owner.id,
-                "email": deck.owner.email,
-                "username": deck.owner.username,
-                "name": deck.owner.name,
-                "username_set": deck.owner.username_set,
-                "created_at": deck.owner.created_at,
-                "updated_at": deck.owner.updated_at,
-                "bio": deck.owner.bio,
-                "avatar_url": deck.owner.avatar_url
-            }
-        })
+    starred_decks = (await db.execute(
+        select(models.Deck).join(
+            models.DeckStar
+        ).where(
+            models.DeckStar.user_id == user.id,
+            models.Deck.is_public == True
+        ).options(
+            *serializer.load_only(models.Deck),
+            *serializer.load_only(models.User, "owner", selectinload(models.Deck.owner))
+        ).offset(skip).limit(limit)
+    )).scalars().all()
     
-    return result
+    return serializer.response(serializer.many(starred_decks))
 
 @router.get("/{username}/activity")
 async def get_user_activity(
     username: str,
+    response: Response,
     skip: int = 0,
     limit: int = 50,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user's activity feed"""
-    user = db.query(models.User).filter(models.User.username == username).first()
+    user = await db.scalar(select(models.User).where(models.User.username == username))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Get activity feed
-    activities = db.query(models.ActivityLog).filter(
-        models.ActivityLog.user_id == user.id
-    ).order_by(
-        models.ActivityLog.created_at.desc()
-    ).offset(skip).limit(limit).all()
+    # Get activity feed, newest first
+    query = ACTIVITY_KEYSET.page(
+        select(models.ActivityLog).where(models.ActivityLog.user_id == user.id), limit, cursor, skip
+    )
+    rows, next_cursor = ACTIVITY_KEYSET.split((await db.execute(query)).all(), limit)
+    set_next_cursor(response, next_cursor)
+    activities = [row[0] for row in rows]
     
     result = []
     for activity in activities:
@@ -245,11 +238,11 @@ async def get_user_activity(
         
         # Add resource details based on type
         if activity.resource_type == "deck":
-            deck = db.query(models.Deck).filter(models.Deck.id == activity.resource_id).first()
+            deck = await db.get(models.Deck, activity.resource_id)
             if deck:
                 activity_data["resource_title"] = deck.title
         elif activity.resource_type == "card":
-            card = db.query(models.Card).filter(models.Card.id == activity.resource_id).first()
+            card = await db.get(models.Card, activity.resource_id)
             if card:
                 activity_data["resource_title"] = card.question[:50] + "..." if len(card.question) > 50 else card.question
         
@@ -258,16 +251,18 @@ async def get_user_activity(
     return result
 
 @router.get("/{username}/achievements")
-async def get_user_achievements(username: str, db: Session = Depends(get_db)):
+async def get_user_achievements(username: str, db: AsyncSession = Depends(get_db)):
     """Get user's achievements and badges"""
-    user = db.query(models.User).filter(models.User.username == username).first()
+    user = await db.scalar(select(models.User).where(models.User.username == username))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     achievements = []
     
     # Achievement 1: First Deck Created
-    total_decks = db.query(models.Deck).filter(models.Deck.user_id == user.id).count()
+    total_decks = await db.scalar(
+        select(func.count()).select_from(models.Deck).where(models.Deck.user_id == user.id)
+    )
     if total_decks >= 1:
         achievements.append({
             "name": "Deck Creator",
@@ -277,7 +272,9 @@ async def get_user_achievements(username: str, db: Session = Depends(get_db)):
             "progress": 1,
             "max_progress": 1,
             "achieved": True,
-            "achieved_at": db.query(models.Deck).filter(models.Deck.user_id == user.id).first().created_at if total_decks > 0 else None
+            "achieved_at": await db.scalar(
+                select(models.Deck.created_at).where(models.Deck.user_id == user.id).limit(1)
+            )
         })
     
     # Achievement 2: Deck Master (multiple levels)
@@ -300,10 +297,12 @@ async def get_user_achievements(username: str, db: Session = Depends(get_db)):
             })
     
     # Achievement 3: Quiz Champion
-    total_sessions = db.query(models.QuizSession).filter(
-        models.QuizSession.user_id == user.id,
-        models.QuizSession.completed_at.isnot(None)
-    ).count()
+    total_sessions = await db.scalar(
+        select(func.count()).select_from(models.QuizSession).where(
+            models.QuizSession.user_id == user.id,
+            models.QuizSession.completed_at.isnot(None)
+        )
+    )
     
     session_levels = [
         (10, "Quiz Beginner", "Completed 10 quizzes", "📚"),
@@ -324,11 +323,13 @@ async def get_user_achievements(username: str, db: Session = Depends(get_db)):
             })
     
     # Achievement 4: Perfect Score
-    perfect_scores = db.query(models.QuizSession).filter(
-        models.QuizSession.user_id == user.id,
-        models.QuizSession.score == 100.0,
-        models.QuizSession.completed_at.isnot(None)
-    ).count()
+    perfect_scores = await db.scalar(
+        select(func.count()).select_from(models.QuizSession).where(
+            models.QuizSession.user_id == user.id,
+            models.QuizSession.score == 100.0,
+            models.QuizSession.completed_at.isnot(None)
+        )
+    )
     
     if perfect_scores >= 1:
         achievements.append({
@@ -343,7 +344,7 @@ async def get_user_achievements(username: str, db: Session = Depends(get_db)):
         })
     
     # Achievement 5: Streak Master
-    streak = db.query(models.Streak).filter(models.Streak.user_id == user.id).first()
+    streak = await db.get(models.Streak, user.id)
     current_streak = streak.current_streak if streak else 0
     
     streak_levels = [
@@ -367,29 +368,28 @@ async def get_user_achievements(username: str, db: Session = Depends(get_db)):
     return achievements
 
 @router.get("/progress", response_model=List[ProgressResponse])
-async def get_user_progress(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_user_progress(current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Get current user's progress across all decks"""
-    progress_data = db.query(models.UserProgress).filter(
-        models.UserProgress.user_id == current_user.id
-    ).all()
+    progress_data = (await db.execute(
+        select(models.UserProgress).where(
+            models.UserProgress.user_id == current_user.id
+        ).options(selectinload(models.UserProgress.deck).selectinload(models.Deck.owner))
+    )).scalars().all()
     
     result = []
     for progress in progress_data:
         deck = progress.deck
         
-        # Get total cards in deck
-        total_cards = db.query(models.Card).filter(
-            models.Card.deck_id == deck.id
-        ).count()
-        
         # Get last attempt date
-        last_attempt = db.query(models.QuizSession).filter(
-            models.QuizSession.user_id == current_user.id,
-            models.QuizSession.deck_id == deck.id,
-            models.QuizSession.completed_at.isnot(None)
-        ).order_by(
-            models.QuizSession.completed_at.desc()
-        ).first()
+        last_attempt = await db.scalar(
+            select(models.QuizSession).where(
+                models.QuizSession.user_id == current_user.id,
+                models.QuizSession.deck_id == deck.id,
+                models.QuizSession.completed_at.isnot(None)
+            ).order_by(
+                models.QuizSession.completed_at.desc()
+            ).limit(1)
+        )
         
         result.append({
             "deck_id": deck.id,
@@ -397,38 +397,15 @@ async def get_user_progress(current_user: models.User = Depends(get_current_user
             "best_score": progress.best_score,
             "last_attempt_at": last_attempt.completed_at if last_attempt else None,
             "mastery_level": progress.mastery_level,
-            "deck": {
-                "id": deck.id,
-                "title": deck.title,
-                "description": deck.description,
-                "user_id": deck.user_id,
-                "is_public": deck.is_public,
-                "tags": deck.tags or [],
-                "created_at": deck.created_at,
-                "updated_at": deck.updated_at,
-                "card_count": total_cards,
-                "star_count": 0,
-                "is_starred": False,
-                "owner": {
-                    "id": deck.owner.id,
-                    "email": deck.owner.email,
-                    "username": deck.owner.username,
-                    "name": deck.owner.name,
-                    "username_set": deck.owner.username_set,
-                    "created_at": deck.owner.created_at,
-                    "updated_at": deck.owner.updated_at,
-                    "bio": deck.owner.bio,
-                    "avatar_url": deck.owner.avatar_url
-                }
-            }
+            "deck": serialization.decks.one(deck),
         })
     
     return result
 
 @router.get("/streak", response_model=StreakResponse)
-async def get_user_streak(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_user_streak(current_user: models.User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """Get current user's streak information"""
-    streak = db.query(models.Streak).filter(models.Streak.user_id == current_user.id).first()
+    streak = await db.get(models.Streak, current_user.id)
     
     if not streak:
         return {
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -24,6 +24,34 @@ class FeedbackType(str, Enum):
     UNCLEAR = "unclear"
     ERROR = "error"
 
+class TagMatch(str, Enum):
+    ALL = "all"
+    ANY = "any"
+
+class BatchStatus(str, Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    INVALID = "invalid"
+    NOT_FOUND = "not_found"
+
+class CardListFormat(str, Enum):
+    JSON = "json"
+    # Newline-delimited JSON, streamed in chunks
+    NDJSON = "ndjson"
+
+# What a write does with a card whose question and answers the deck already has
+class DuplicatePolicy(str, Enum):
+    SKIP = "skip"
+    # Add its new tags to the existing card and fill in what that card lacks
+    MERGE = "merge"
+    ALLOW = "allow"
+
+class DeckSort(str, Enum):
+    NEWEST = "newest"
+    TRENDING = "trending"
+    POPULAR = "popular"
+
 # User schemas
 class UserBase(BaseModel):
     email: str
@@ -67,7 +95,17 @@ class DeckResponse(DeckBase):
     updated_at: Optional[datetime] = None
     owner: UserResponse
     card_count: Optional[int] = 0
+    star_count: Optional[int] = 0
+    session_count: Optional[int] = 0
     is_starred: Optional[bool] = False
+    # Highlighted excerpt of the best matching field, on search results only
+    search_snippet: Optional[str] = None
+    
+    @field_validator("tags", mode="before")
+    @classmethod
+    def _null_tags(cls, tags):
+        # Older rows may hold NULL rather than an empty list
+        return tags or []
     
     class Config:
         from_attributes = True
@@ -103,10 +141,51 @@ class CardResponse(CardBase):
     class Config:
         from_attributes = True
 
+class CardSearchResult(CardResponse):
+    search_snippet: Optional[str] = None
+
+# Batch card writes; every operation in a batch targets the same deck
+MAX_CARD_BATCH_SIZE = 2000
+
+class CardBatchUpdateItem(CardUpdate):
+    id: int
+
+class CardBatchCreate(BaseModel):
+    deck_id: int
+    # Validated one by one (as CardBase), so a bad item fails alone
+    cards: List[Dict[str, Any]] = Field(..., min_length=1, max_length=MAX_CARD_BATCH_SIZE)
+
+class CardBatchUpdate(BaseModel):
+    deck_id: int
+    # Validated one by one (as CardBatchUpdateItem)
+    cards: List[Dict[str, Any]] = Field(..., min_length=1, max_length=MAX_CARD_BATCH_SIZE)
+
+class CardBatchDelete(BaseModel):
+    deck_id: int
+    card_ids: List[int] = Field(..., min_length=1, max_length=MAX_CARD_BATCH_SIZE)
+
+class CardBatchResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: BatchStatus
+    error: Optional[str] = None
+
+class CardBatchResponse(BaseModel):
+    results: List[CardBatchResult]
+    succeeded: int
+    failed: int
+
+class TagFacet(BaseModel):
+    tag: str
+    count: int
+
 # Quiz schemas
 class QuizSessionCreate(BaseModel):
     deck_id: int
     mode: QuizMode
+    # Only quiz on cards with these tags (all of them, or any with tag_mode=any)
+    tags: List[str] = []
+    tag_mode: TagMatch = TagMatch.ALL
 
 class QuizAnswerSubmit(BaseModel):
     card_id: int
@@ -123,6 +202,8 @@ class QuizSessionResponse(BaseModel):
     score: Optional[float] = None
     total_questions: int
     deck: DeckResponse
+    # Cards picked for the session, only returned when it starts
+    card_ids: Optional[List[int]] = None
     
     class Config:
         from_attributes = True
@@ -0,0 +1,108 @@
+"""
+Full-text search over decks and cards.
+
+On SQLite, decks and cards are mirrored into FTS5 tables (decks_fts, cards_fts)
+whose rowid is the deck/card id. Triggers on the source tables keep them current
+for every write path, including Core bulk inserts. The same DDL runs after
+Base.metadata.create_all() and in migration 0005.
+
+User input is reduced to its words and each word is matched as a prefix, so
+"pyth dict" finds "Python dictionaries". Results are ranked with bm25 and come
+with a highlighted snippet. Other databases fall back to the LIKE filters.
+"""
+import re
+from typing import Optional
+from sqlalchemy import DDL, column, event, func, literal_column, select, table
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+SNIPPET_ELLIPSIS = "…"
+SNIPPET_TOKENS = 12
+# Longer inputs are cut to this many words
+MAX_SEARCH_TERMS = 8
+
+_WORDS = re.compile(r"\w+")
+
+# Tags are JSON arrays; index their values rather than the JSON text
+_DECK_TAGS = "(SELECT group_concat(value, ' ') FROM json_each({row}.tags))"
+
+FTS_SCHEMA = [
+    # prefix='2 3' keeps short prefix queries off the full term scan
+    """CREATE VIRTUAL TABLE IF NOT EXISTS decks_fts USING fts5(
+        title, description, tags, tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS decks_fts_insert AFTER INSERT ON decks BEGIN
+        INSERT INTO decks_fts(rowid, title, description, tags)
+        VALUES (new.id, new.title, new.description, {_DECK_TAGS.format(row='new')});
+    END""",
+    # Only text changes reindex; counter and visibility updates leave the index alone
+    f"""CREATE TRIGGER IF NOT EXISTS decks_fts_update AFTER UPDATE OF title, description, tags ON decks BEGIN
+        DELETE FROM decks_fts WHERE rowid = old.id;
+        INSERT INTO decks_fts(rowid, title, description, tags)
+        VALUES (new.id, new.title, new.description, {_DECK_TAGS.format(row='new')});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS decks_fts_delete AFTER DELETE ON decks BEGIN
+        DELETE FROM decks_fts WHERE rowid = old.id;
+    END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5(
+        question, explanation, tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS cards_fts_insert AFTER INSERT ON cards BEGIN
+        INSERT INTO cards_fts(rowid, question, explanation) VALUES (new.id, new.question, new.explanation);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cards_fts_update AFTER UPDATE OF question, explanation ON cards BEGIN
+        DELETE FROM cards_fts WHERE rowid = old.id;
+        INSERT INTO cards_fts(rowid, question, explanation) VALUES (new.id, new.question, new.explanation);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cards_fts_delete AFTER DELETE ON cards BEGIN
+        DELETE FROM cards_fts WHERE rowid = old.id;
+    END""",
+]
+
+def register_fts_schema(metadata):
+    """Create the FTS tables and triggers whenever create_all() builds the schema on SQLite"""
+    for statement in FTS_SCHEMA:
+        event.listen(metadata, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+def match_expression(search: str) -> Optional[str]:
+    """FTS5 query matching every word of `search` as a prefix, or None if it has no words"""
+    terms = _WORDS.findall(search or "")[:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    # Words are quoted, so FTS5 operators and column filters in the input are just text
+    return " ".join(f'"{term}"*' for term in terms)
+
+def fts_enabled(db) -> bool:
+    """Whether the session's database has the FTS5 indexes (SQLite only)"""
+    return db.get_bind().dialect.name == "sqlite"
+
+class FullTextIndex:
+    """One FTS5 table and the SQL needed to rank, filter and highlight with it"""
+
+    def __init__(self, name: str, columns, weights):
+        self.name = name
+        self.table = table(name, column("rowid"), *[column(column_name) for column_name in columns])
+        self.weights = weights
+
+    def rank(self):
+        # bm25 scores are negative, best match first when sorted ascending
+        return func.bm25(literal_column(self.name), *self.weights)
+
+    def snippet(self):
+        return func.snippet(
+            literal_column(self.name), -1, HIGHLIGHT_START, HIGHLIGHT_END, SNIPPET_ELLIPSIS, SNIPPET_TOKENS
+        )
+
+    def matching_ids(self, expression: str):
+        """Row ids matching the expression, unranked"""
+        return select(self.table.c.rowid).where(literal_column(self.name).op("MATCH")(expression))
+
+    def apply(self, query, id_column, expression: str):
+        """Restrict a select to matching rows, best first, with the snippet as an extra column"""
+        return query.join(self.table, self.table.c.rowid == id_column).where(
+            literal_column(self.name).op("MATCH")(expression)
+        ).add_columns(self.snippet().label("search_snippet")).order_by(self.rank())
+
+# Title hits outrank tag hits, which outrank description hits
+deck_index = FullTextIndex("decks_fts", ["title", "description", "tags"], [10.0, 2.0, 5.0])
+card_index = FullTextIndex("cards_fts", ["question", "explanation"], [5.0, 1.0])
@@ -1,7 +1,16 @@
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from sqlalchemy import insert, select, func
+from database import SessionLocal, engine, init_db
+from services.deck_counters import DeckCounterService
+from services.tags import TagService
+from services.card_hashes import CardHashService
+from services.deck_rankings import DeckRankingService
 import models
-from datetime import datetime
+from datetime import datetime, date, time, timedelta
+import argparse
+import bisect
+import itertools
+import random
 
 def create_sample_data():
     """Create sample data for development and testing"""
@@ -141,6 +150,8 @@ def create_sample_data():
             all_cards = js_cards + python_cards + react_cards
             db.add_all(all_cards)
             db.commit()
+            DeckCounterService.reconcile(db)
+            db.commit()
             print("Created sample cards")
 
             # Create user streak
@@ -181,5 +192,282 @@ def create_sample_data():
     finally:
         db.close()
 
+# Relative share of quiz activity per hour of day (UTC): quiet nights, lunch bump, evening peak
+HOURLY_ACTIVITY = [1, 1, 1, 1, 1, 2, 3, 5, 6, 6, 6, 7, 9, 8, 6, 6, 7, 8, 10, 12, 12, 10, 6, 3]
+# Relative share per weekday, Monday first
+WEEKDAY_ACTIVITY = [10, 10, 10, 9, 8, 6, 7]
+
+BULK_TAGS = ["python", "javascript", "react", "sql", "math", "physics", "history", "biology", "spanish", "music"]
+BULK_TABLES = [
+    models.User, models.Streak, models.Deck, models.Card, models.DeckStar, models.QuizSession,
+    models.QuizAnswer, models.UserProgress, models.StudyPlan, models.ActivityLog,
+]
+
+class ChunkedInserter:
+    """Buffer rows per table and write them with Core executemany in chunks"""
+    
+    def __init__(self, target_engine, chunk_size):
+        self.engine = target_engine
+        self.chunk_size = chunk_size
+        self.buffers = {model.__table__.name: [] for model in BULK_TABLES}
+        self.tables = {model.__table__.name: model.__table__ for model in BULK_TABLES}
+        self.counts = {name: 0 for name in self.buffers}
+    
+    def add(self, table_name, row):
+        buffer = self.buffers[table_name]
+        buffer.append(row)
+        if len(buffer) >= self.chunk_size:
+            self.flush()
+    
+    def flush(self):
+        # Parents first so foreign keys always point at rows that already exist
+        with self.engine.begin() as connection:
+            for name, buffer in self.buffers.items():
+                if buffer:
+                    connection.execute(insert(self.tables[name]), buffer)
+                    self.counts[name] += len(buffer)
+                    buffer.clear()
+
+def power_law_weights(count, alpha):
+    """Cumulative Zipf weights: item k is picked with probability ~ 1 / k^alpha"""
+    return list(itertools.accumulate(1.0 / (rank ** alpha) for rank in range(1, count + 1)))
+
+def weighted_choice(rng, items, cum_weights):
+    return items[bisect.bisect_left(cum_weights, rng.random() * cum_weights[-1])]
+
+def activity_timestamp(rng, end, days):
+    """A moment in the last `days` days following the weekday and hour-of-day curves"""
+    while True:
+        day = end - timedelta(days=rng.randrange(days) + 1)
+        if rng.random() * max(WEEKDAY_ACTIVITY) < WEEKDAY_ACTIVITY[day.weekday()]:
+            break
+    hour = rng.choices(range(24), weights=HOURLY_ACTIVITY)[0]
+    return day + timedelta(hours=hour, seconds=rng.randrange(3600))
+
+def generate_bulk_data(
+    target_engine=None,
+    users=1000,
+    decks_per_user=3,
+    cards_per_deck=25,
+    sessions_per_user=40,
+    days=180,
+    seed=42,
+    chunk_size=10000,
+    end_date=None,
+    popularity_alpha=1.1,
+):
+    """
+    Generate a production-sized synthetic dataset with Core bulk inserts.
+    
+    Output is deterministic for a given seed and end_date. Deck popularity
+    (quiz sessions and stars) follows a power law, per-user activity is
+    heavy-tailed around sessions_per_user, and timestamps follow the weekday
+    and hour-of-day activity curves. IDs continue after the existing rows, so
+    the generator can run on top of create_sample_data().
+    """
+    target_engine = target_engine or engine
+    rng = random.Random(seed)
+    end = datetime.combine(end_date or date.today(), time())
+    inserter = ChunkedInserter(target_engine, chunk_size)
+    
+    with target_engine.connect() as connection:
+        def next_id(model):
+            return (connection.scalar(select(func.max(model.id))) or 0) + 1
+        first_user_id = next_id(models.User)
+        first_deck_id = next_id(models.Deck)
+        first_card_id = next_id(models.Card)
+        first_session_id = next_id(models.QuizSession)
+    
+    # Users, their decks and cards
+    user_ids = list(range(first_user_id, first_user_id + users))
+    question_types = list(models.QuestionType)
+    deck_cards = {}
+    card_id = first_card_id
+    for user_id in user_ids:
+        joined_at = end - timedelta(days=days + rng.randrange(365))
+        inserter.add("users", {
+            "id": user_id,
+            "email": f"user{user_id}@bulk.magizh.app",
+            "google_id": f"bulk-{user_id}",
+            "name": f"Bulk User {user_id}",
+            "username": f"bulk_user_{user_id}",
+            "username_set": True,
+            "created_at": joined_at,
+        })
+        for _ in range(decks_per_user):
+            deck_id = first_deck_id + len(deck_cards)
+            inserter.add("decks", {
+                "id": deck_id,
+                "title": f"Deck {deck_id}",
+                "description": f"Synthetic deck {deck_id}",
+                "user_id": user_id,
+                "is_public": rng.random() < 0.8,
+                "tags": rng.sample(BULK_TAGS, 2),
+                "created_at": joined_at,
+            })
+            inserter.add("activity_logs", {
+                "user_id": user_id,
+                "action_type": models.ActionType.CREATE_DECK,
+                "resource_type": "deck",
+                "resource_id": deck_id,
+                "extra_data": {},
+                "created_at": joined_at,
+            })
+            deck_cards[deck_id] = list(range(card_id, card_id + cards_per_deck))
+            for position in range(cards_per_deck):
+                question_type = question_types[position % len(question_types)]
+                inserter.add("cards", {
+                    "id": card_id,
+                    "deck_id": deck_id,
+                    "question": f"Question {card_id} of deck {deck_id}?",
+                    "question_type": question_type,
+                    "options": [] if question_type == models.QuestionType.FILL_BLANK else ["A", "B", "C", "D"],
+                    "correct_answers": ["A", "C"] if question_type == models.QuestionType.MULTI_SELECT else ["A"],
+                    "explanation": "Synthetic explanation",
+                    "tags": [],
+                    "created_at": joined_at,
+                })
+                card_id += 1
+    
+    # Popular decks are drawn far more often; shuffle so popularity isn't tied to deck age
+    ranked_decks = list(deck_cards)
+    rng.shuffle(ranked_decks)
+    deck_weights = power_law_weights(len(ranked_decks), popularity_alpha)
+    
+    session_id = first_session_id
+    for user_id in user_ids:
+        skill = rng.betavariate(5, 2)
+        starred = {weighted_choice(rng, ranked_decks, deck_weights) for _ in range(rng.randrange(6))}
+        for deck_id in starred:
+            starred_at = activity_timestamp(rng, end, days)
+            inserter.add("deck_stars", {"user_id": user_id, "deck_id": deck_id, "created_at": starred_at})
+            inserter.add("activity_logs", {
+                "user_id": user_id,
+                "action_type": models.ActionType.STAR_DECK,
+                "resource_type": "deck",
+                "resource_id": deck_id,
+                "extra_data": {},
+                "created_at": starred_at,
+            })
+        
+        # Heavy-tailed activity: most users take a few quizzes, a handful take hundreds
+        session_count = min(int(sessions_per_user * rng.paretovariate(2.0) / 2), sessions_per_user * 20)
+        progress = {}
+        study_plans = {}
+        for completed_at in sorted(activity_timestamp(rng, end, days) for _ in range(session_count)):
+            deck_id = weighted_choice(rng, ranked_decks, deck_weights)
+            cards = rng.sample(deck_cards[deck_id], min(10, len(deck_cards[deck_id])))
+            answers = []
+            for answered_card in cards:
+                is_correct = rng.random() < skill
+                answers.append({
+                    "session_id": session_id,
+                    "card_id": answered_card,
+                    "user_answers": ["A"] if is_correct else ["B"],
+                    "is_correct": is_correct,
+                    "difficulty_rating": None,
+                    "time_taken": rng.randint(3, 90),
+                })
+                plan = study_plans.setdefault(answered_card, {
+                    "user_id": user_id,
+                    "card_id": answered_card,
+                    "repetition_count": 0,
+                    "difficulty": models.Difficulty.MEDIUM,
+                })
+                plan["repetition_count"] = plan["repetition_count"] + 1 if is_correct else 0
+                plan["next_review_at"] = completed_at + timedelta(days=min(2 ** plan["repetition_count"], 365))
+            
+            # The session goes in before its answers so a chunk flush never orphans them
+            score = sum(answer["is_correct"] for answer in answers)
+            inserter.add("quiz_sessions", {
+                "id": session_id,
+                "user_id": user_id,
+                "deck_id": deck_id,
+                "mode": models.QuizMode.EXAM,
+                "started_at": completed_at - timedelta(seconds=rng.randint(60, 900)),
+                "completed_at": completed_at,
+                "score": score,
+                "total_questions": len(cards),
+            })
+            for answer in answers:
+                inserter.add("quiz_answers", answer)
+            inserter.add("activity_logs", {
+                "user_id": user_id,
+                "action_type": models.ActionType.COMPLETE_QUIZ,
+                "resource_type": "quiz",
+                "resource_id": session_id,
+                "extra_data": {"score": score, "total": len(cards)},
+                "created_at": completed_at,
+            })
+            # Same 0-1 fraction the app records on completion
+            accuracy = score / len(cards) if cards else 0
+            entry = progress.setdefault(deck_id, {
+                "user_id": user_id,
+                "deck_id": deck_id,
+                "total_attempts": 0,
+                "best_score": 0.0,
+                "mastery_level": 0.0,
+            })
+            entry["total_attempts"] += 1
+            entry["best_score"] = max(entry["best_score"], accuracy)
+            entry["last_attempt_at"] = completed_at
+            entry["mastery_level"] = min(1.0, entry["best_score"] * min(entry["total_attempts"], 5) / 5)
+            session_id += 1
+        
+        for entry in progress.values():
+            inserter.add("user_progress", entry)
+        for plan in study_plans.values():
+            inserter.add("study_plans", plan)
+        inserter.add("streaks", {
+            "user_id": user_id,
+            "current_streak": rng.randrange(15) if session_count else 0,
+            "longest_streak": rng.randrange(15, 60) if session_count else 0,
+            "last_activity_date": end - timedelta(days=rng.randrange(3)),
+        })
+    
+    inserter.flush()
+    
+    # Core inserts bypass the counter, tag index and content hash updates, so fill them in from the generated rows
+    with Session(target_engine) as db:
+        DeckCounterService.reconcile(db)
+        TagService.backfill(db)
+        CardHashService.backfill(db)
+        DeckRankingService.rescore(db)
+        db.commit()
+    return inserter.counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the Magizh Quiz database")
+    parser.add_argument("--bulk", action="store_true", help="generate a large synthetic dataset")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--decks-per-user", type=int, default=3)
+    parser.add_argument("--cards-per-deck", type=int, default=25)
+    parser.add_argument("--sessions-per-user", type=int, default=40)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+    
+    init_db()
+    if not args.bulk:
+        create_sample_data()
+        return
+    
+    started = datetime.utcnow()
+    counts = generate_bulk_data(
+        users=args.users,
+        decks_per_user=args.decks_per_user,
+        cards_per_deck=args.cards_per_deck,
+        sessions_per_user=args.sessions_per_user,
+        days=args.days,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+    )
+    elapsed = (datetime.utcnow() - started).total_seconds()
+    total = sum(counts.values())
+    for table, count in counts.items():
+        print(f"  {table}: {count}")
+    print(f"Generated {total} rows in {elapsed:.1f}s ({total / max(elapsed, 0.001):.0f} rows/s)")
+
 if __name__ == "__main__":
-    create_sample_data()
\ No newline at end of file
+    main()
\ No newline at end of file
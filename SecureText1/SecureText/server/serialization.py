@@ -0,0 +1,184 @@
+"""
+Response serialization for list endpoints.
+
+A Serializer is built once per response model at import time. It holds a
+compiled pydantic TypeAdapter that reads ORM rows directly by attribute, owner
+relationship included, and writes the JSON bytes in one pass. Handlers set
+per-caller fields such as is_starred on the validated items and return
+serializer.response(items). FastAPI passes a Response through untouched, so the
+rows are not validated a second time against response_model or run through
+jsonable_encoder. The route's response_model still documents the shape in
+OpenAPI.
+
+Very large lists can be streamed as NDJSON instead. The handler yields chunks
+of validated items, and each chunk is written as soon as it is ready.
+
+List endpoints also take a sparse fieldset, e.g. ?fields=id,question,options or
+?fields=id,title,owner.username. serializer.only(fields) returns a serializer
+for a model cut down to those fields, and its load_only() options keep the
+query from fetching the other columns at all. Fields a handler fills in itself
+(overlays, such as is_bookmarked) and fields it needs to work (such as id) are
+always validated, but only written out when asked for; id is always written.
+"""
+import copy
+from typing import AsyncIterable, Dict, Generic, Iterable, List, Optional, Type, TypeVar
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model, field_validator
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import load_only
+from schemas import CardResponse, CardSearchResult, DeckResponse, UserResponse
+
+Model = TypeVar("Model", bound=BaseModel)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Most subsets kept per serializer; clients pick from a small, fixed set in practice
+MAX_FIELD_SUBSETS = 64
+SUBSET_SUFFIX = "Fields"
+
+class Serializer(Generic[Model]):
+    """Compiled ORM-to-JSON conversion for one response model"""
+
+    def __init__(self, model: Type[Model], overlays=(), required=("id",), exclude: Optional[dict] = None):
+        self.model = model
+        # Fields the handler sets itself, and fields it reads back from the items
+        self.overlays = frozenset(overlays)
+        self.required = frozenset(required)
+        self._exclude = exclude
+        self._list = TypeAdapter(List[model])
+        self._item = TypeAdapter(model)
+        self._subsets: Dict[tuple, "Serializer"] = {}
+        # Identifies the fieldset in cache keys and ETags; None for the full model
+        self.key = None
+
+    def one(self, row) -> Model:
+        return self.model.model_validate(row, from_attributes=True)
+
+    def many(self, rows: Iterable) -> List[Model]:
+        """Validate a sequence of ORM rows (or dicts) in a single call"""
+        return self._list.validate_python(list(rows), from_attributes=True)
+
+    def dump(self, items: List[Model]) -> bytes:
+        return self._list.dump_json(items, exclude={"__all__": self._exclude} if self._exclude else None)
+
+    def lines(self, items: List[Model]) -> bytes:
+        """Newline-delimited JSON, one item per line"""
+        return b"".join(self._item.dump_json(item, exclude=self._exclude) + b"\n" for item in items)
+
+    def response(self, items: List[Model], response: Optional[Response] = None) -> Response:
+        """JSON response for validated items, keeping headers already set on `response`"""
+        return Response(content=self.dump(items), media_type="application/json", headers=_headers(response))
+
+    def stream(self, chunks: AsyncIterable[List[Model]], response: Optional[Response] = None) -> StreamingResponse:
+        """NDJSON response written chunk by chunk as `chunks` yields them"""
+        async def _body():
+            async for items in chunks:
+                yield self.lines(items)
+        return StreamingResponse(_body(), media_type=NDJSON_MEDIA_TYPE, headers=_headers(response))
+
+    def only(self, fields: Optional[str]) -> "Serializer":
+        """Serializer for a comma-separated sparse fieldset (None or empty: every field); 400 on unknown fields"""
+        requested = _parse_fields(self.model, fields)
+        if requested is None:
+            return self
+        key = tuple(sorted(
+            name if nested is None else f"{name}.{nested_name}"
+            for name, nested in requested.items() for nested_name in (sorted(nested) if nested else [None])
+        ))
+        subset = self._subsets.get(key)
+        if subset is None:
+            internal = self.overlays | self.required
+            hidden = internal - set(requested) - {"id"}
+            subset = Serializer(
+                _subset_model(self.model, {name: requested.get(name) for name in set(requested) | internal}),
+                self.overlays, self.required, {name: True for name in hidden} or None,
+            )
+            subset.key = key
+            if len(self._subsets) < MAX_FIELD_SUBSETS:
+                self._subsets[key] = subset
+        return subset
+
+    def includes(self, name: str) -> bool:
+        return name in self.model.model_fields
+
+    def writes(self, name: str) -> bool:
+        """Whether the field reaches the output (overlays not asked for are validated but dropped)"""
+        return self.includes(name) and not (self._exclude and name in self._exclude)
+
+    def columns(self, entity, field: Optional[str] = None) -> Optional[list]:
+        """Column attributes of `entity` this model reads; None when it reads the whole row.
+
+        With `field`, `entity` is the related entity behind that field.
+        """
+        model = self.model
+        if field is not None:
+            model = model.model_fields[field].annotation
+        if not _is_subset(model):
+            return None
+        return [getattr(entity, column.key) for column in sa_inspect(entity).column_attrs if column.key in model.model_fields]
+
+    def load_only(self, entity, field: Optional[str] = None, loader=None) -> list:
+        """Loader options that fetch only the columns this model reads.
+
+        With `field`, `loader` (e.g. contains_eager(Deck.owner)) loads the
+        related `entity` behind it, or is left out if the field wasn't asked for.
+        """
+        if field is not None and not self.includes(field):
+            return []
+        columns = self.columns(entity, field)
+        if columns is None:
+            return [loader] if loader is not None else []
+        return [loader.load_only(*columns) if loader is not None else load_only(*columns)]
+
+def _is_subset(model: Type[BaseModel]) -> bool:
+    return model.__name__.endswith(SUBSET_SUFFIX)
+
+def _parse_fields(model: Type[BaseModel], fields: Optional[str]) -> Optional[Dict[str, Optional[set]]]:
+    """{field: None for all of it, or the set of nested fields asked for}"""
+    names = [name.strip() for name in (fields or "").split(",") if name.strip()]
+    if not names:
+        return None
+    requested: Dict[str, Optional[set]] = {}
+    for name in names:
+        top, _, nested = name.partition(".")
+        field = model.model_fields.get(top)
+        nested_model = field.annotation if field is not None else None
+        if field is None or (nested and not (isinstance(nested_model, type) and issubclass(nested_model, BaseModel) and nested in nested_model.model_fields)):
+            raise HTTPException(status_code=400, detail=f"Unknown field: {name}")
+        if not nested:
+            requested[top] = None
+        elif top not in requested or requested[top] is not None:
+            requested.setdefault(top, set()).add(nested)
+    return requested
+
+def _subset_model(model: Type[BaseModel], fields: Dict[str, Optional[set]]) -> Type[BaseModel]:
+    """`model` cut down to `fields` (nested models cut down to their listed fields), validators kept"""
+    definitions = {}
+    for name, info in model.model_fields.items():
+        if name not in fields:
+            continue
+        annotation = info.annotation
+        if fields[name]:
+            annotation = _subset_model(annotation, {nested: None for nested in fields[name] | {"id"}})
+        # create_model() takes over the FieldInfo it is given, so hand it a copy
+        definitions[name] = (annotation, copy.copy(info))
+    validators = {}
+    for validator_name, decorator in model.__pydantic_decorators__.field_validators.items():
+        targets = [name for name in decorator.info.fields if name in definitions]
+        if targets:
+            validators[validator_name] = field_validator(*targets, mode=decorator.info.mode)(decorator.func.__func__)
+    return create_model(
+        f"{model.__name__}{SUBSET_SUFFIX}", __config__=ConfigDict(from_attributes=True), __validators__=validators, **definitions
+    )
+
+def _headers(response: Optional[Response]) -> Optional[dict]:
+    """Headers already set on the injected response, minus its (empty body's) length"""
+    headers = dict(response.headers) if response is not None else None
+    if headers:
+        headers.pop("content-length", None)
+    return headers
+
+users = Serializer(UserResponse)
+decks = Serializer(DeckResponse, overlays=("is_starred", "search_snippet"), required=("id", "user_id"))
+cards = Serializer(CardResponse, overlays=("is_bookmarked",))
+card_search_results = Serializer(CardSearchResult, overlays=("is_bookmarked", "search_snippet"))
@@ -0,0 +1,96 @@
+"""
+Cache of compiled answer keys for grading.
+
+A submitted answer only needs the card's question type and correct answers.
+The same cards are graded over and over, by every user taking the deck, so
+each card's answers are compiled once into an AnswerKey and grading becomes a
+dictionary hit instead of a row fetch plus JSON decode.
+
+Grading is the same set comparison as before: the submitted answers must be
+exactly the correct answers. Fill-in-the-blank answers are typed rather than
+picked, so both sides are compared after normalization (case folded,
+whitespace collapsed); the key holds the correct set already normalized.
+
+A commit that changes a card's question type or answers, or deletes the card,
+drops its key, from the same flush bookkeeping as the other caches. The
+generation guard keeps a key compiled from the old row from being stored back.
+"""
+import os
+from typing import FrozenSet, Iterable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, attributes
+from sqlalchemy import event, select
+from cache import TaggedTTLCache
+from models import Card, QuestionType
+from services.card_hashes import CardHashService
+
+answer_key_cache = TaggedTTLCache(
+    "answer_keys",
+    max_size=int(os.getenv("ANSWER_KEY_CACHE_MAX_SIZE", "4096")),
+    ttl_seconds=float(os.getenv("ANSWER_KEY_CACHE_TTL_SECONDS", "3600")),
+)
+
+class AnswerKey:
+    """A card's correct answers, compiled for grading"""
+
+    __slots__ = ("answers", "normalized")
+
+    def __init__(self, question_type: QuestionType, correct_answers: Iterable[str]):
+        self.normalized = question_type == QuestionType.FILL_BLANK
+        self.answers: FrozenSet[str] = self._set(correct_answers or ())
+
+    def _set(self, answers: Iterable[str]) -> FrozenSet[str]:
+        if self.normalized:
+            return frozenset(CardHashService.normalize(answer) for answer in answers)
+        return frozenset(answers)
+
+    def grade(self, user_answers: Iterable[str]) -> bool:
+        """Whether the submitted answers are exactly the correct ones"""
+        return self._set(user_answers) == self.answers
+
+class AnswerKeyCache:
+    """Compiled answer keys per card, and the writes that invalidate them"""
+
+    # Card columns an answer key is compiled from
+    KEY_COLUMNS = ('question_type', 'correct_answers')
+
+    @staticmethod
+    async def get(db: AsyncSession, card_id: int) -> Optional[AnswerKey]:
+        """The card's answer key, or None if there is no such card"""
+        generation = answer_key_cache.generation
+        answer_key = answer_key_cache.get(card_id)
+        if answer_key is None:
+            row = (await db.execute(
+                select(Card.question_type, Card.correct_answers).where(Card.id == card_id)
+            )).first()
+            if row is None:
+                return None
+            answer_key = AnswerKey(*row)
+            answer_key_cache.set_tagged(card_id, answer_key, (card_id,), generation)
+        return answer_key
+
+    @classmethod
+    def collect(cls, session: Session, pending: set):
+        """Record the cards whose answer keys a flush changes"""
+        for obj in session.deleted:
+            if isinstance(obj, Card):
+                pending.add(obj.id)
+        for obj in session.dirty:
+            if isinstance(obj, Card) and any(
+                attributes.get_history(obj, column).has_changes() for column in cls.KEY_COLUMNS
+            ):
+                pending.add(obj.id)
+
+@event.listens_for(Session, "after_flush")
+def _collect_answer_key_changes(session, flush_context):
+    AnswerKeyCache.collect(session, session.info.setdefault("answer_key_changes", set()))
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_answer_keys(session):
+    card_ids = session.info.pop("answer_key_changes", None)
+    if card_ids:
+        answer_key_cache.invalidate_tags(card_ids)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_answer_key_changes(session):
+    session.info.pop("answer_key_changes", None)
@@ -0,0 +1,76 @@
+"""
+Cache of each user's bookmarked card ids.
+
+Card lists, search results and single-card reads mark is_bookmarked by checking
+the page's ids against this set. That replaces a CardBookmark query per card.
+A miss loads the user's whole set in one query.
+
+Bookmark writes patch the cached set in place rather than dropping it. This
+runs after commit, from the same flush bookkeeping as the user cache. Deleted
+cards leave every cached set, so an id SQLite reuses for a new card never
+shows up as bookmarked.
+"""
+import os
+from typing import FrozenSet
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from cache import TaggedTTLCache
+from models import Card, CardBookmark
+
+bookmark_cache = TaggedTTLCache(
+    "card_bookmarks",
+    max_size=int(os.getenv("BOOKMARK_CACHE_MAX_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("BOOKMARK_CACHE_TTL_SECONDS", "300")),
+)
+
+class BookmarkCache:
+    """Bookmarked card ids per user, and the writes that change them"""
+
+    @staticmethod
+    async def card_ids(db: AsyncSession, user_id: int) -> FrozenSet[int]:
+        """Ids of every card the user has bookmarked"""
+        generation = bookmark_cache.generation
+        card_ids = bookmark_cache.get(user_id)
+        if card_ids is None:
+            card_ids = frozenset((await db.scalars(
+                select(CardBookmark.card_id).where(CardBookmark.user_id == user_id)
+            )).all())
+            bookmark_cache.set_tagged(user_id, card_ids, (), generation)
+        return card_ids
+
+    @staticmethod
+    def collect(session: Session, pending: dict):
+        """Record a flush's bookmark writes, (user_id, card_id) -> bookmarked, and deleted cards"""
+        for obj in session.new:
+            if isinstance(obj, CardBookmark):
+                pending["bookmarks"][(obj.user_id, obj.card_id)] = True
+        for obj in session.deleted:
+            if isinstance(obj, CardBookmark):
+                pending["bookmarks"][(obj.user_id, obj.card_id)] = False
+            elif isinstance(obj, Card):
+                pending["deleted_cards"].add(obj.id)
+
+    @staticmethod
+    def apply(pending: dict):
+        """Patch the cached sets after a commit"""
+        for (user_id, card_id), bookmarked in pending["bookmarks"].items():
+            change = frozenset.union if bookmarked else frozenset.difference
+            bookmark_cache.update(lambda card_ids: change(card_ids, {card_id}), keys=[user_id])
+        if pending["deleted_cards"]:
+            deleted = frozenset(pending["deleted_cards"])
+            bookmark_cache.update(lambda card_ids: card_ids - deleted)
+
+@event.listens_for(Session, "after_flush")
+def _collect_bookmark_changes(session, flush_context):
+    BookmarkCache.collect(session, session.info.setdefault("bookmark_changes", {"bookmarks": {}, "deleted_cards": set()}))
+
+@event.listens_for(Session, "after_commit")
+def _apply_bookmark_changes(session):
+    pending = session.info.pop("bookmark_changes", None)
+    if pending:
+        BookmarkCache.apply(pending)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_bookmark_changes(session):
+    session.info.pop("bookmark_changes", None)
@@ -0,0 +1,140 @@
+"""
+Duplicate card detection.
+
+Every card carries a content_hash: a digest of its question type, question,
+options and correct answers after normalization (Unicode NFKC, case folded,
+whitespace collapsed, options and answers in sorted order). Two cards with the
+same hash in the same deck ask the same thing, so a write can look up
+duplicates in the (deck_id, content_hash) index instead of comparing text.
+
+Explanation, image and tags are not part of the hash; merging a duplicate into
+an existing card adds its new tags and fills in the details the card lacks.
+"""
+import hashlib
+import json
+import re
+import unicodedata
+from typing import Iterable, List, Tuple
+from sqlalchemy.orm import Session, attributes, selectinload
+from sqlalchemy import event, select, update, bindparam
+from models import Card
+from services.tags import TagService
+
+_WHITESPACE = re.compile(r"\s+")
+
+class CardHashService:
+    """Normalized content hashes behind duplicate detection"""
+
+    # Card columns the hash is computed from
+    CONTENT_COLUMNS = ('question', 'question_type', 'options', 'correct_answers')
+    # Details a merge fills in when the existing card has none
+    MERGED_DETAILS = ('explanation', 'image_url')
+    DIGEST_SIZE = 16
+
+    @staticmethod
+    def normalize(text) -> str:
+        """Text compared case- and whitespace-insensitively"""
+        return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", str(text))).strip().casefold()
+
+    @classmethod
+    def compute(cls, question, question_type, options, correct_answers) -> str:
+        """Hex digest of the normalized card content"""
+        content = [
+            cls.normalize(getattr(question_type, "value", question_type)),
+            cls.normalize(question),
+            sorted(cls.normalize(option) for option in options or []),
+            sorted(cls.normalize(answer) for answer in correct_answers or []),
+        ]
+        encoded = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+        return hashlib.blake2b(encoded, digest_size=cls.DIGEST_SIZE).hexdigest()
+
+    @classmethod
+    def of(cls, card) -> str:
+        """Hash of a card, given as a Card or a dict of its columns"""
+        if isinstance(card, dict):
+            return cls.compute(*(card.get(column) for column in cls.CONTENT_COLUMNS))
+        return cls.compute(*(getattr(card, column) for column in cls.CONTENT_COLUMNS))
+
+    @staticmethod
+    def duplicates(deck_id: int, hashes: Iterable[str]):
+        """SELECT of the deck's cards with any of `hashes`, oldest first (tag rows loaded for merging)"""
+        return select(Card).options(selectinload(Card.tag_rows)).where(
+            Card.deck_id == deck_id, Card.content_hash.in_(sorted(set(hashes)))
+        ).order_by(Card.id)
+
+    @classmethod
+    def merge(cls, target, incoming: dict) -> bool:
+        """Fold `incoming` into `target` (a Card or a pending row): new tags added, missing details filled in"""
+        is_row = isinstance(target, dict)
+        get = target.get if is_row else lambda name: getattr(target, name)
+        changes = {}
+        tags = list(get('tags') or [])
+        known = set(TagService.normalize(tags))
+        added = [tag for tag in TagService.normalize(incoming.get('tags')) if tag not in known]
+        if added:
+            changes['tags'] = tags + added
+        for name in cls.MERGED_DETAILS:
+            if not get(name) and incoming.get(name):
+                changes[name] = incoming[name]
+        for name, value in changes.items():
+            if is_row:
+                target[name] = value
+            else:
+                setattr(target, name, value)
+        return bool(changes)
+
+    @classmethod
+    def dedupe(cls, db: Session, deck_id: int, card_rows: List[dict], merge: bool = False) -> Tuple[List[dict], dict]:
+        """Rows of `card_rows` that are new to the deck (and to each other), and how many were skipped or merged.
+
+        With `merge`, each duplicate is folded into the card (or earlier row) it repeats.
+        """
+        for card_row in card_rows:
+            card_row['content_hash'] = cls.of(card_row)
+        existing = {}
+        if card_rows:
+            for card in db.scalars(cls.duplicates(deck_id, [card_row['content_hash'] for card_row in card_rows])):
+                existing.setdefault(card.content_hash, card)
+
+        kept = {}
+        counts = {"skipped": 0, "merged": 0}
+        for card_row in card_rows:
+            content_hash = card_row['content_hash']
+            target = existing.get(content_hash, kept.get(content_hash))
+            if target is None:
+                kept[content_hash] = card_row
+            elif merge:
+                cls.merge(target, card_row)
+                counts["merged"] += 1
+            else:
+                counts["skipped"] += 1
+        return list(kept.values()), counts
+
+    @classmethod
+    def backfill(cls, db: Session, batch_size: int = 5000) -> int:
+        """Hash cards written without one (Core bulk inserts); returns the number of cards hashed"""
+        cards = Card.__table__
+        statement = update(cards).where(cards.c.id == bindparam('card_id')).values(
+            content_hash=bindparam('hash')
+        )
+        hashed = 0
+        while True:
+            rows = db.execute(
+                select(Card.id, *(getattr(Card, column) for column in cls.CONTENT_COLUMNS))
+                .where(Card.content_hash.is_(None)).order_by(Card.id).limit(batch_size)
+            ).all()
+            if not rows:
+                return hashed
+            db.execute(statement, [{'card_id': row[0], 'hash': cls.compute(*row[1:])} for row in rows])
+            hashed += len(rows)
+
+@event.listens_for(Session, "before_flush")
+def _hash_card_content(session, flush_context, instances):
+    """Keep content_hash in step with cards whose content is being written"""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Card):
+            continue
+        if obj in session.new or any(
+            attributes.get_history(obj, column).has_changes() for column in CardHashService.CONTENT_COLUMNS
+        ):
+            obj.content_hash = CardHashService.of(obj)
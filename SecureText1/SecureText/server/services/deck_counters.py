@@ -0,0 +1,51 @@
+from typing import Iterable, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import func, or_, select, update
+from models import Deck, Card, DeckStar, QuizSession
+
+class DeckCounterService:
+    """Denormalized per-deck counters: cards, stars and completed quiz sessions"""
+
+    COUNTERS = ('card_count', 'star_count', 'session_count')
+
+    @staticmethod
+    def adjust(deck_id: int, **deltas):
+        """UPDATE adding deltas to a deck's counters.
+
+        Callers execute it in the same transaction as the write it accounts for, so the
+        counter and the rows it counts commit (or roll back) together. The increment
+        happens in SQL, so concurrent writers never lose an update.
+        """
+        values = {name: getattr(Deck, name) + delta for name, delta in deltas.items() if delta}
+        if not values:
+            raise ValueError("adjust() needs at least one non-zero counter delta")
+        return update(Deck).where(Deck.id == deck_id).values(**values)
+
+    @staticmethod
+    def actual_counts():
+        """Correlated subqueries counting each counter's rows for the outer deck"""
+        return {
+            'card_count': select(func.count()).select_from(Card).where(
+                Card.deck_id == Deck.id
+            ).scalar_subquery(),
+            'star_count': select(func.count()).select_from(DeckStar).where(
+                DeckStar.deck_id == Deck.id
+            ).scalar_subquery(),
+            'session_count': select(func.count()).select_from(QuizSession).where(
+                QuizSession.deck_id == Deck.id,
+                QuizSession.completed_at.isnot(None)
+            ).scalar_subquery(),
+        }
+
+    @classmethod
+    def reconcile(cls, db: Session, deck_ids: Optional[Iterable[int]] = None) -> int:
+        """Recompute drifted counters in one UPDATE; returns the number of decks repaired"""
+        actual = cls.actual_counts()
+        statement = update(Deck).where(
+            or_(*[getattr(Deck, name).is_distinct_from(actual[name]) for name in cls.COUNTERS])
+        ).values(**actual).execution_options(synchronize_session=False)
+
+        if deck_ids is not None:
+            statement = statement.where(Deck.id.in_(list(deck_ids)))
+
+        return db.execute(statement).rowcount
@@ -0,0 +1,148 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, event, insert, select
+from models import Deck, DeckRanking, DeckStar, QuizSession
+
+class DeckRankingService:
+    """Trending and popular deck scores, stored in deck_rankings so listings can sort on an index.
+
+    Popular is the weighted all-time count of stars, completed sessions and
+    learners (distinct users who completed a session). Trending weighs the same
+    events by age, halving every HALF_LIFE_DAYS. Every deck's score decays at the
+    same rate, so instead of rewriting all rows as time passes each event is
+    stored pre-scaled by 2^(time since EPOCH / half-life), and the row keeps
+    log2 of the sum. The order matches the decayed scores at any moment, and a
+    new event only changes its own deck's row.
+    """
+
+    STAR_WEIGHT = 3.0
+    SESSION_WEIGHT = 1.0
+    LEARNER_WEIGHT = 2.0
+    HALF_LIFE_DAYS = 7.0
+    EPOCH = datetime(2000, 1, 1)
+
+    @classmethod
+    def event_score(cls, weight: float, at: datetime) -> float:
+        """log2 of an event's pre-scaled trending weight"""
+        if at.tzinfo is not None:
+            at = at.astimezone(timezone.utc).replace(tzinfo=None)
+        return math.log2(weight) + (at - cls.EPOCH).total_seconds() / (cls.HALF_LIFE_DAYS * 86400)
+
+    @staticmethod
+    def combine(score: float, event_score: float) -> float:
+        """log2(2**score + 2**event_score) without overflow; a score of 0 means no activity yet"""
+        if score <= 0:
+            return event_score
+        high, low = max(score, event_score), min(score, event_score)
+        return high + math.log2(1 + 2 ** (low - high))
+
+    @staticmethod
+    def subtract(score: float, event_score: float) -> float:
+        """log2(2**score - 2**event_score), the inverse of combine(); 0 once nothing is left"""
+        if score <= 0 or event_score >= score:
+            return 0.0
+        return score + math.log2(1 - 2 ** (event_score - score))
+
+    @classmethod
+    def record(cls, db: Session, deck_id: int, at: Optional[datetime] = None, stars: int = 0, sessions: int = 0, learners: int = 0):
+        """Add new activity to a deck's scores, in the caller's transaction.
+
+        Concurrent writers outside the write queue can lose an increment; the
+        scheduled rescore() repairs that.
+        """
+        at = at or datetime.utcnow()
+        ranking = db.get(DeckRanking, deck_id)
+        if ranking is None:
+            ranking = DeckRanking(deck_id=deck_id, trending_score=0.0, popular_score=0.0, learner_count=0)
+            db.add(ranking)
+
+        for weight, count in ((cls.STAR_WEIGHT, stars), (cls.SESSION_WEIGHT, sessions), (cls.LEARNER_WEIGHT, learners)):
+            if count:
+                ranking.trending_score = cls.combine(ranking.trending_score, cls.event_score(weight * count, at))
+                ranking.popular_score += weight * count
+        ranking.learner_count += learners
+
+    @classmethod
+    def retract_star(cls, db: Session, deck_id: int, starred_at: Optional[datetime]):
+        """Take a removed star, made at `starred_at`, back out of the deck's scores.
+
+        Float rounding can leave a trace of the star in trending_score; the
+        scheduled rescore() clears it.
+        """
+        ranking = db.get(DeckRanking, deck_id)
+        if ranking is None:
+            return
+        ranking.popular_score = max(0.0, ranking.popular_score - cls.STAR_WEIGHT)
+        if ranking.popular_score <= 0:
+            # Nothing else counted towards the deck, so no rounding trace either
+            ranking.trending_score = 0.0
+        else:
+            ranking.trending_score = cls.subtract(
+                ranking.trending_score, cls.event_score(cls.STAR_WEIGHT, starred_at or datetime.utcnow())
+            )
+
+    @classmethod
+    def deck_batches(cls, db: Session, batch_size: int):
+        """Every deck id, in ascending batches of at most batch_size"""
+        last_id = 0
+        while True:
+            deck_ids = db.scalars(select(Deck.id).where(Deck.id > last_id).order_by(Deck.id).limit(batch_size)).all()
+            if not deck_ids:
+                return
+            yield deck_ids
+            last_id = deck_ids[-1]
+
+    @classmethod
+    def rescore(cls, db: Session, deck_ids: Optional[Iterable[int]] = None) -> int:
+        """Recompute the rankings of every deck (or of deck_ids) from stars and sessions"""
+        deck_query = select(Deck.id)
+        star_query = select(DeckStar.deck_id, DeckStar.created_at)
+        session_query = select(QuizSession.deck_id, QuizSession.user_id, QuizSession.completed_at).where(
+            QuizSession.completed_at.isnot(None)
+        ).order_by(QuizSession.completed_at)
+        if deck_ids is not None:
+            deck_ids = list(deck_ids)
+            deck_query = deck_query.where(Deck.id.in_(deck_ids))
+            star_query = star_query.where(DeckStar.deck_id.in_(deck_ids))
+            session_query = session_query.where(QuizSession.deck_id.in_(deck_ids))
+
+        rows = {
+            deck_id: {"deck_id": deck_id, "trending_score": 0.0, "popular_score": 0.0, "learner_count": 0}
+            for deck_id in db.scalars(deck_query)
+        }
+
+        def add(deck_id, weight, at):
+            row = rows.get(deck_id)
+            if row is not None:
+                row["trending_score"] = cls.combine(row["trending_score"], cls.event_score(weight, at or datetime.utcnow()))
+                row["popular_score"] += weight
+
+        for deck_id, starred_at in db.execute(star_query):
+            add(deck_id, cls.STAR_WEIGHT, starred_at)
+
+        learners = defaultdict(set)
+        # Oldest first, so a learner counts from their first completed session
+        for deck_id, user_id, completed_at in db.execute(session_query):
+            add(deck_id, cls.SESSION_WEIGHT, completed_at)
+            if user_id not in learners[deck_id]:
+                learners[deck_id].add(user_id)
+                add(deck_id, cls.LEARNER_WEIGHT, completed_at)
+        for deck_id, users in learners.items():
+            if deck_id in rows:
+                rows[deck_id]["learner_count"] = len(users)
+
+        statement = delete(DeckRanking)
+        if deck_ids is not None:
+            statement = statement.where(DeckRanking.deck_id.in_(deck_ids))
+        db.execute(statement.execution_options(synchronize_session=False))
+        if rows:
+            db.execute(insert(DeckRanking), list(rows.values()))
+        return len(rows)
+
+@event.listens_for(Deck, "after_insert")
+def _create_ranking(mapper, connection, target):
+    """Every deck gets a ranking row, so new decks show up in ranked listings right away"""
+    connection.execute(insert(DeckRanking.__table__).values(deck_id=target.id))
@@ -0,0 +1,49 @@
+from typing import Iterable
+from sqlalchemy.orm import Session, attributes
+from sqlalchemy import event, update
+from models import Deck, Card
+
+class DeckVersionService:
+    """Per-deck content version, the validator behind the deck ETags"""
+
+    # Deck columns that are part of the deck's content; counters are not
+    CONTENT_COLUMNS = ('title', 'description', 'tags', 'is_public')
+
+    @staticmethod
+    def bump(deck_ids: Iterable[int]):
+        """UPDATE moving each deck to a new content version.
+
+        The increment happens in SQL, so two concurrent edits never end up sharing a
+        version. It also refreshes updated_at (its onupdate), which feeds Last-Modified.
+        """
+        return update(Deck).where(Deck.id.in_(sorted(deck_ids))).values(
+            content_version=Deck.content_version + 1
+        ).execution_options(synchronize_session=False)
+
+    @classmethod
+    def changed_decks(cls, session: Session) -> set:
+        """Ids of existing decks whose content the pending flush changes"""
+        deck_ids = set()
+        for obj in list(session.new) + list(session.deleted):
+            if isinstance(obj, Card):
+                deck_ids.add(obj.deck_id if obj.deck_id is not None else getattr(obj.deck, 'id', None))
+        for obj in session.dirty:
+            if isinstance(obj, Card) and session.is_modified(obj, include_collections=False):
+                # A card moved to another deck changes both decks
+                history = attributes.get_history(obj, 'deck_id')
+                deck_ids.update(history.deleted or ())
+                deck_ids.add(obj.deck_id)
+            elif isinstance(obj, Deck) and any(
+                attributes.get_history(obj, column).has_changes() for column in cls.CONTENT_COLUMNS
+            ):
+                deck_ids.add(obj.id)
+        # Decks created in this flush start at version 1
+        deck_ids.discard(None)
+        return deck_ids
+
+@event.listens_for(Session, "before_flush")
+def _bump_content_versions(session, flush_context, instances):
+    """Give every deck touched by a flush a new content version, in one statement"""
+    deck_ids = DeckVersionService.changed_decks(session)
+    if deck_ids:
+        session.execute(DeckVersionService.bump(deck_ids))
@@ -50,7 +50,7 @@ class GamificationService:
                 streak.current_streak = 0
             
             streak.last_activity_date = datetime.utcnow()
-            db.commit()
+            db.flush()
         
         return {
             'current_streak': streak.current_streak,
@@ -133,7 +133,8 @@ class GamificationService:
         )
         db.add(activity)
         
-        db.commit()
+        # Flush only - the caller owns the transaction (see write_queue.run_write)
+        db.flush()
         
         return {
             'challenge_completed': True,
@@ -0,0 +1,130 @@
+"""
+Cache of the public deck listing.
+
+Anonymous callers, and anyone passing public_only=true, all see the same
+listing page for the same filters. Pages are cached here keyed by the
+filters and the page position. Each page is tagged with the decks and owners
+it shows, so a write drops only the pages it affects:
+
+- a star, a card write or a completed session changes one deck's counts
+  (and its updated_at), so it drops the pages showing that deck;
+- a profile edit drops the pages showing that owner's decks;
+- trending and popular pages are also tagged with their sort, since a star,
+  a completed session or a ranking rescore can move a deck that isn't on the
+  page into it; any change to deck_rankings or stars drops those pages;
+- a deck being deleted, a public deck being created, retitled or retagged,
+  or any change of visibility can change which decks a page holds, so it
+  drops every page.
+
+Invalidation runs after commit, from the same flush bookkeeping as the user
+cache. Writes made outside the ORM, such as counter reconciliation or bulk
+seeding, clear the cache themselves.
+"""
+import os
+from typing import Optional
+from sqlalchemy.orm import Session, attributes
+from sqlalchemy import event
+from cache import TaggedTTLCache
+from services.deck_versions import DeckVersionService
+from models import Deck, Card, DeckRanking, DeckStar, QuizSession, User
+
+public_deck_cache = TaggedTTLCache(
+    "public_decks",
+    max_size=int(os.getenv("PUBLIC_DECK_CACHE_MAX_SIZE", "512")),
+    ttl_seconds=float(os.getenv("PUBLIC_DECK_CACHE_TTL_SECONDS", "30")),
+)
+
+class PublicDeckCache:
+    """Tags of cached listing pages and the writes that invalidate them"""
+
+    # Listing orders read from deck_rankings (DeckSort values)
+    RANKED_SORTS = ("trending", "popular")
+
+    @staticmethod
+    def deck_tag(deck_id: int):
+        return ("deck", deck_id)
+
+    @staticmethod
+    def owner_tag(user_id: int):
+        return ("owner", user_id)
+
+    @staticmethod
+    def sort_tag(sort: str):
+        return ("sort", sort)
+
+    @classmethod
+    def ranked_tags(cls) -> set:
+        """Tags of every page ordered by deck_rankings"""
+        return {cls.sort_tag(sort) for sort in cls.RANKED_SORTS}
+
+    @classmethod
+    def page_tags(cls, decks, sort: Optional[str] = None) -> set:
+        """Tags for a page of deck listing items, listed in `sort` order"""
+        tags = {cls.sort_tag(sort)} if sort in cls.RANKED_SORTS else set()
+        for deck in decks:
+            tags.add(cls.deck_tag(deck.id))
+            tags.add(cls.owner_tag(deck.user_id))
+        return tags
+
+    @classmethod
+    def changes(cls, session: Session):
+        """(whether every page is affected, tags of the affected pages) for a flush"""
+        tags = set()
+        for obj in session.new:
+            if isinstance(obj, Deck) and obj.is_public:
+                return True, tags
+            if isinstance(obj, (Card, DeckStar)):
+                tags.add(cls.deck_tag(obj.deck_id))
+            if isinstance(obj, (DeckStar, DeckRanking)):
+                tags.update(cls.ranked_tags())
+        for obj in session.deleted:
+            if isinstance(obj, Deck):
+                return True, tags
+            if isinstance(obj, (Card, DeckStar)):
+                tags.add(cls.deck_tag(obj.deck_id))
+            if isinstance(obj, (DeckStar, DeckRanking)):
+                tags.update(cls.ranked_tags())
+        for obj in session.dirty:
+            if not session.is_modified(obj, include_collections=False):
+                continue
+            if isinstance(obj, Deck):
+                visibility = attributes.get_history(obj, 'is_public')
+                if visibility.has_changes():
+                    return True, tags
+                if obj.is_public and any(
+                    attributes.get_history(obj, column).has_changes() for column in DeckVersionService.CONTENT_COLUMNS
+                ):
+                    return True, tags
+                tags.add(cls.deck_tag(obj.id))
+            elif isinstance(obj, Card):
+                tags.update(cls.deck_tag(deck_id) for deck_id in attributes.get_history(obj, 'deck_id').deleted or ())
+                tags.add(cls.deck_tag(obj.deck_id))
+            elif isinstance(obj, QuizSession) and attributes.get_history(obj, 'completed_at').has_changes():
+                tags.add(cls.deck_tag(obj.deck_id))
+            elif isinstance(obj, User):
+                tags.add(cls.owner_tag(obj.id))
+            elif isinstance(obj, DeckRanking):
+                tags.update(cls.ranked_tags())
+        return False, tags
+
+@event.listens_for(Session, "after_flush")
+def _collect_public_deck_changes(session, flush_context):
+    """Remember which cached listing pages a flush affects"""
+    everything, tags = PublicDeckCache.changes(session)
+    if everything:
+        session.info["public_decks_reset"] = True
+    elif tags:
+        session.info.setdefault("public_deck_tags", set()).update(tags)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_public_decks(session):
+    tags = session.info.pop("public_deck_tags", ())
+    if session.info.pop("public_decks_reset", False):
+        public_deck_cache.clear()
+    elif tags:
+        public_deck_cache.invalidate_tags(tags)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_public_deck_changes(session):
+    session.info.pop("public_deck_tags", None)
+    session.info.pop("public_decks_reset", None)
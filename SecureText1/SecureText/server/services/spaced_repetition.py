@@ -69,7 +69,8 @@ class SpacedRepetitionService:
             difficulty_rating, study_plan.repetition_count, is_correct
         )
         
-        db.commit()
+        # Flush only - the caller owns the transaction (see write_queue.run_write)
+        db.flush()
         return study_plan
     
     @classmethod
@@ -86,10 +87,13 @@ class SpacedRepetitionService:
         return due_cards
     
     @classmethod
-    def get_adaptive_deck_cards(cls, db: Session, user_id: int, deck_id: int) -> List[Card]:
+    def get_adaptive_deck_cards(cls, db: Session, user_id: int, deck_id: int, card_filter=None) -> List[Card]:
         """Get cards from a deck ordered by spaced repetition priority"""
-        # Get all cards from the deck
-        all_cards = db.query(Card).filter(Card.deck_id == deck_id).all()
+        # Get all cards from the deck (optionally narrowed, e.g. to some tags)
+        query = db.query(Card).filter(Card.deck_id == deck_id)
+        if card_filter is not None:
+            query = query.filter(card_filter)
+        all_cards = query.all()
         
         # Get study plans for this user
         study_plans = db.query(StudyPlan).filter(
@@ -0,0 +1,96 @@
+from typing import List, Optional
+from sqlalchemy.orm import Session, attributes
+from sqlalchemy import delete, event, func, insert, select
+from models import Deck, DeckTag, Card, CardTag
+
+class TagService:
+    """Normalized tag index (deck_tags / card_tags) behind the JSON tag columns"""
+
+    # Largest number of facet values returned for one result set
+    FACET_LIMIT = 50
+
+    @staticmethod
+    def normalize(tags) -> List[str]:
+        """Trimmed, lower-cased tags without blanks or duplicates, in their original order"""
+        normalized = []
+        for tag in tags or []:
+            if not isinstance(tag, str):
+                continue
+            tag = tag.strip().lower()
+            if tag and tag not in normalized:
+                normalized.append(tag)
+        return normalized
+
+    @classmethod
+    def parse(cls, tags: Optional[str]) -> List[str]:
+        """Normalized tags from a comma-separated query parameter"""
+        return cls.normalize((tags or "").split(","))
+
+    @classmethod
+    def sync_rows(cls, obj):
+        """Make a deck's or card's tag rows match its JSON tags, touching only the difference"""
+        row_model = DeckTag if isinstance(obj, Deck) else CardTag
+        wanted = cls.normalize(obj.tags)
+        existing = {row.tag: row for row in obj.tag_rows}
+
+        for tag, row in existing.items():
+            if tag not in wanted:
+                obj.tag_rows.remove(row)
+        for tag in wanted:
+            if tag not in existing:
+                obj.tag_rows.append(row_model(tag=tag))
+
+    @staticmethod
+    def _tagged_ids(id_column, tag_column, tags: List[str], match_all: bool):
+        """Ids tagged with all (or any) of `tags`, straight from the (tag, id) index"""
+        query = select(id_column).where(tag_column.in_(tags))
+        if match_all and len(tags) > 1:
+            # (id, tag) is the primary key, so a full match has one row per tag
+            query = query.group_by(id_column).having(func.count() == len(tags))
+        return query
+
+    @classmethod
+    def deck_filter(cls, tags: List[str], match_all: bool = True):
+        """WHERE clause keeping decks tagged with all (or any) of `tags`"""
+        return Deck.id.in_(cls._tagged_ids(DeckTag.deck_id, DeckTag.tag, tags, match_all))
+
+    @classmethod
+    def card_filter(cls, tags: List[str], match_all: bool = True):
+        """WHERE clause keeping cards tagged with all (or any) of `tags`"""
+        return Card.id.in_(cls._tagged_ids(CardTag.card_id, CardTag.tag, tags, match_all))
+
+    @classmethod
+    def deck_facets(cls, filters, limit: Optional[int] = None):
+        """Tag counts over every deck matching `filters`, most common first"""
+        count = func.count().label("count")
+        return select(DeckTag.tag, count).join(Deck, Deck.id == DeckTag.deck_id).where(
+            *filters
+        ).group_by(DeckTag.tag).order_by(count.desc(), DeckTag.tag).limit(limit or cls.FACET_LIMIT)
+
+    @classmethod
+    def backfill(cls, db: Session, batch_size: int = 5000) -> dict:
+        """Rebuild deck_tags and card_tags from the JSON columns (after Core bulk inserts)"""
+        counts = {}
+        for model, tag_model, id_column in [(Deck, DeckTag, "deck_id"), (Card, CardTag, "card_id")]:
+            db.execute(delete(tag_model))
+            counts[tag_model.__tablename__] = 0
+            batch = []
+            for row_id, tags in db.execute(select(model.id, model.tags)).all():
+                batch.extend({id_column: row_id, "tag": tag} for tag in cls.normalize(tags))
+                if len(batch) >= batch_size:
+                    db.execute(insert(tag_model), batch)
+                    counts[tag_model.__tablename__] += len(batch)
+                    batch = []
+            if batch:
+                db.execute(insert(tag_model), batch)
+                counts[tag_model.__tablename__] += len(batch)
+        return counts
+
+@event.listens_for(Session, "before_flush")
+def _sync_tag_index(session, flush_context, instances):
+    """Keep the tag tables in step with decks and cards whose tags are being written"""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, (Deck, Card)):
+            continue
+        if obj in session.new or attributes.get_history(obj, "tags").has_changes():
+            TagService.sync_rows(obj)
@@ -0,0 +1,82 @@
+"""
+Import-time profile of the API.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and reports
+the total import time and the slowest modules. With --budget-ms the exit code is
+non-zero when importing the app takes longer than the budget, so CI can keep
+cold starts low.
+
+    python startup_profile.py --top 15 --budget-ms 1500
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, NamedTuple
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class ImportTiming(NamedTuple):
+    module: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+def profile_imports(module: str = "main") -> List[ImportTiming]:
+    """Import `module` in a fresh interpreter and parse its -X importtime output"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVER_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        timings.append(ImportTiming(name.strip(), depth, int(self_us), int(cumulative_us)))
+    return timings
+
+def total_import_ms(timings: List[ImportTiming], module: str = "main") -> float:
+    """Cumulative import time of the top-level module"""
+    for timing in reversed(timings):
+        if timing.module == module and timing.depth == 0:
+            return timing.cumulative_us / 1000
+    return sum(timing.self_us for timing in timings) / 1000
+
+def report(timings: List[ImportTiming], module: str = "main", top: int = 15) -> str:
+    """Readable summary: total, slowest direct imports and slowest modules overall"""
+    lines = [f"Importing {module} took {total_import_ms(timings, module):.1f}ms ({len(timings)} modules)"]
+
+    lines.append("Slowest direct imports (cumulative):")
+    direct = [timing for timing in timings if timing.depth == 1]
+    for timing in sorted(direct, key=lambda t: t.cumulative_us, reverse=True)[:top]:
+        lines.append(f"  {timing.cumulative_us / 1000:8.1f}ms  {timing.module}")
+
+    lines.append("Slowest modules (self):")
+    for timing in sorted(timings, key=lambda t: t.self_us, reverse=True)[:top]:
+        lines.append(f"  {timing.self_us / 1000:8.1f}ms  {timing.module}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the import time of the API")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, help="fail when the import takes longer than this")
+    args = parser.parse_args()
+
+    timings = profile_imports(args.module)
+    print(report(timings, args.module, args.top))
+
+    total = total_import_ms(timings, args.module)
+    if args.budget_ms and total > args.budget_ms:
+        print(f"Import time {total:.1f}ms is over the {args.budget_ms:.0f}ms budget")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,14 @@ Pytest configuration and shared fixtures for the Magizh Quiz App backend tests.
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
-from database import Base, get_db
+from sqlalchemy.pool import NullPool
+from contextlib import contextmanager
+from database import Base, get_db, get_async_database_url, apply_sqlite_profile
 from main import app
+from query_stats import instrument_engine, collect_queries
+from cache import clear_caches
 import models
 import os
 import tempfile
@@ -23,7 +28,24 @@ def temp_db():
 @pytest.fixture(scope="session")
 def engine(temp_db):
     """Create database engine for testing"""
-    return create_engine(temp_db, connect_args={"check_same_thread": False})
+    engine = create_engine(temp_db, connect_args={"check_same_thread": False})
+    apply_sqlite_profile(engine)
+    instrument_engine(engine)
+    return engine
+
+@pytest.fixture(scope="session")
+def async_engine(temp_db):
+    """Create async engine for the request handlers"""
+    # TestClient runs each request on a fresh event loop, so connections can't be pooled
+    async_engine = create_async_engine(get_async_database_url(temp_db), poolclass=NullPool)
+    apply_sqlite_profile(async_engine.sync_engine)
+    instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+@pytest.fixture(scope="session")
+def TestingAsyncSessionLocal(async_engine):
+    """Create async session factory for testing"""
+    return async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 @pytest.fixture(scope="session")
 def TestingSessionLocal(engine):
@@ -47,13 +69,11 @@ def db_session(TestingSessionLocal, setup_database):
         session.close()
 
 @pytest.fixture
-def override_get_db(db_session):
+def override_get_db(TestingAsyncSessionLocal, setup_database):
     """Override the get_db dependency"""
-    def _override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
+    async def _override_get_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
     
     app.dependency_overrides[get_db] = _override_get_db
     yield
@@ -213,6 +233,19 @@ def large_dataset(client, auth_headers, test_data_factory):
     
     return {"decks": decks, "cards": cards}
 
+# Query budget fixture
+@pytest.fixture
+def query_budget(async_engine):
+    """Fail the test when a block issues more statements than declared, or looks like N+1"""
+    @contextmanager
+    def _query_budget(max_queries, allow_n_plus_one=False):
+        with collect_queries() as stats:
+            yield stats
+        assert stats.count <= max_queries, f"Query budget of {max_queries} exceeded: {stats.summary()}"
+        if not allow_n_plus_one:
+            assert not stats.suspected_n_plus_one(), f"Suspected N+1: {stats.summary()}"
+    return _query_budget
+
 # Error simulation fixtures
 @pytest.fixture
 def mock_db_error(monkeypatch):
@@ -261,5 +294,7 @@ def invalid_token():
 def cleanup_after_test(db_session):
     """Clean up database after each test"""
     yield
+    # Cached rows may not survive the cleanup below
+    clear_caches()
     # Clean up any test data
     db_session.rollback()
@@ -0,0 +1,97 @@
+import pytest
+import models
+from query_stats import collect_queries
+from services.answer_keys import AnswerKey, answer_key_cache
+
+
+@pytest.fixture
+def quiz_session(client, auth_headers, created_card):
+    """A study session on the created card's deck"""
+    return client.post(
+        "/api/quiz/sessions", json={"deck_id": created_card["deck_id"], "mode": "study"}, headers=auth_headers
+    ).json()
+
+def submit(client, auth_headers, session, card_id, user_answers):
+    """Submit an answer; returns the response and the card queries it took"""
+    with collect_queries() as stats:
+        response = client.post(
+            f"/api/quiz/sessions/{session['id']}/answers",
+            json={"card_id": card_id, "user_answers": user_answers}, headers=auth_headers
+        )
+    return response, sum(count for shape, count in stats.shapes.items() if "FROM cards" in shape)
+
+def graded(db_session, session):
+    """is_correct of the session's answers, in submission order"""
+    db_session.expire_all()
+    return [
+        answer.is_correct for answer in
+        db_session.query(models.QuizAnswer).filter_by(session_id=session["id"]).order_by(models.QuizAnswer.id)
+    ]
+
+class TestAnswerKey:
+    """Test grading against compiled answer keys"""
+
+    def test_choice_questions_compare_sets(self):
+        """Test choice answers must be exactly the correct set, in any order"""
+        key = AnswerKey(models.QuestionType.MULTI_SELECT, ["Python", "JavaScript"])
+        assert key.grade(["JavaScript", "Python"])
+        assert not key.grade(["Python"])
+        assert not key.grade(["python", "javascript"])
+
+    def test_fill_blank_ignores_case_and_spacing(self):
+        """Test fill-in answers are compared after case folding and whitespace collapsing"""
+        key = AnswerKey(models.QuestionType.FILL_BLANK, ["New York"])
+        assert key.grade(["  new   york "])
+        assert not key.grade(["New York City"])
+        assert not key.grade([])
+
+    def test_fill_blank_needs_every_blank(self):
+        """Test a multi-blank card still needs each of its answers, once each"""
+        key = AnswerKey(models.QuestionType.FILL_BLANK, ["Paris", "Rome"])
+        assert key.grade(["rome", "PARIS"])
+        assert not key.grade(["Paris"])
+        assert not key.grade(["Paris", "Paris"])
+        assert not key.grade(["Paris", "Rome", "Berlin"])
+
+class TestAnswerKeyCache:
+    """Test submissions grade from the cache and card writes invalidate it"""
+
+    def test_repeat_grading_skips_card_fetch(self, client, auth_headers, created_card, quiz_session):
+        """Test only the first submission for a card reads the card"""
+        _, queries = submit(client, auth_headers, quiz_session, created_card["id"], ["Paris"])
+        assert queries == 1
+        response, queries = submit(client, auth_headers, quiz_session, created_card["id"], ["London"])
+        assert response.status_code == 200
+        assert queries == 0
+
+    def test_update_card_invalidates_key(self, client, auth_headers, db_session, created_card, quiz_session):
+        """Test changed answers are graded against the new key"""
+        submit(client, auth_headers, quiz_session, created_card["id"], ["Paris"])
+        client.put(f"/api/cards/{created_card['id']}", json={"correct_answers": ["Berlin"]}, headers=auth_headers)
+        assert answer_key_cache.get(created_card["id"]) is None
+        submit(client, auth_headers, quiz_session, created_card["id"], ["Paris"])
+        submit(client, auth_headers, quiz_session, created_card["id"], ["Berlin"])
+        assert graded(db_session, quiz_session) == [True, False, True]
+
+    def test_unrelated_update_keeps_key(self, client, auth_headers, created_card, quiz_session):
+        """Test edits that leave the answers alone keep the cached key"""
+        submit(client, auth_headers, quiz_session, created_card["id"], ["Paris"])
+        client.put(f"/api/cards/{created_card['id']}", json={"explanation": "Changed"}, headers=auth_headers)
+        assert answer_key_cache.get(created_card["id"]) is not None
+
+    def test_deleted_card_not_graded(self, client, auth_headers, created_card, quiz_session):
+        """Test a deleted card's key is dropped, so its id can't be graded"""
+        # Cached without a submission: cards with recorded answers can't be deleted
+        answer_key = AnswerKey(models.QuestionType.MCQ, ["Paris"])
+        answer_key_cache.set_tagged(created_card["id"], answer_key, (created_card["id"],), answer_key_cache.generation)
+        client.delete(f"/api/cards/{created_card['id']}", headers=auth_headers)
+        response, _ = submit(client, auth_headers, quiz_session, created_card["id"], ["Paris"])
+        assert response.status_code == 404
+
+    def test_rolled_back_change_keeps_key(self, client, auth_headers, db_session, created_card, quiz_session):
+        """Test an answer change that never commits leaves the key alone"""
+        submit(client, auth_headers, quiz_session, created_card["id"], ["Paris"])
+        db_session.get(models.Card, created_card["id"]).correct_answers = ["Rome"]
+        db_session.flush()
+        db_session.rollback()
+        assert answer_key_cache.get(created_card["id"]).answers == frozenset({"Paris"})
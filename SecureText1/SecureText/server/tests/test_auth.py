@@ -1,4 +1,8 @@
 import pytest
+import auth
+from auth import create_access_token, decode_token, verified_tokens
+from query_stats import collect_queries
+
 
 def test_health_check(client):
     """Test health check endpoint"""
@@ -37,4 +41,53 @@ def test_logout(client):
     """Test logout functionality"""
     response = client.post("/api/auth/logout")
     assert response.status_code == 200
-    assert response.json()["message"] == "Logged out successfully"
\ No newline at end of file
+    assert response.json()["message"] == "Logged out successfully"
+
+def test_token_carries_user_id_and_version(client):
+    """Test that access tokens carry uid and ver claims"""
+    data = client.post("/api/auth/demo-login").json()
+    claims = decode_token(data["access_token"])
+    assert claims["sub"] == "demo@magizh.app"
+    assert claims["uid"] == data["user"]["id"]
+    assert claims["ver"] >= 1
+
+def test_profile_change_bumps_version(client, auth_headers):
+    """Test that changing the profile increments the user version"""
+    before = decode_token(auth_headers["Authorization"].split(" ")[1])["ver"]
+    client.post("/api/auth/complete-signup", json={"username": "versioned_user"}, headers=auth_headers)
+    token = client.post("/api/auth/demo-login").json()["access_token"]
+    assert decode_token(token)["ver"] == before + 1
+    client.post("/api/auth/complete-signup", json={"username": "demo_user"}, headers=auth_headers)
+
+def test_principal_skips_user_lookup(client, auth_headers, sample_deck_data):
+    """Test that id-only handlers authenticate from the claims alone"""
+    deck = client.post("/api/decks/", json=sample_deck_data, headers=auth_headers).json()
+    with collect_queries() as stats:
+        response = client.post("/api/quiz/sessions", json={"deck_id": deck["id"], "mode": "study"}, headers=auth_headers)
+    assert response.status_code in (200, 400)
+    assert not any("FROM users WHERE" in shape and "users.email" in shape for shape in stats.shapes)
+
+def test_legacy_token_without_claims(client):
+    """Test that tokens minted with only a subject still authenticate"""
+    client.post("/api/auth/demo-login")
+    token = create_access_token({"sub": "demo@magizh.app"})
+    response = client.get("/api/quiz/sessions", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+def test_verified_token_cache(client):
+    """Test that repeat requests reuse the verified claims"""
+    token = client.post("/api/auth/demo-login").json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get("/api/auth/me", headers=headers)
+    hits = verified_tokens.hits
+    client.get("/api/auth/me", headers=headers)
+    assert verified_tokens.hits == hits + 1
+
+def test_expired_token_rejected_even_if_cached(client, monkeypatch):
+    """Test that cached claims are not honoured past the token expiry"""
+    token = client.post("/api/auth/demo-login").json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+    monkeypatch.setattr(auth.time, "time", lambda: 4102444800)  # 2100-01-01
+    monkeypatch.setattr(auth.jwt, "decode", lambda *args, **kwargs: (_ for _ in ()).throw(auth.JWTError("expired")))
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
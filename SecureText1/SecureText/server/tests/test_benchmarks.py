@@ -0,0 +1,269 @@
+"""
+Endpoint latency benchmarks over a seeded dataset.
+
+Skipped unless BENCHMARK=1. Every endpoint is driven through the ASGI app and
+reported as p50/p95/p99 latency, queries per request and rows per second.
+Results are written to BENCHMARK_RESULTS as JSON; when BENCHMARK_BASELINE points
+at an earlier results file, any endpoint whose p95 grows by more than
+BENCHMARK_REGRESSION_THRESHOLD (or that issues more queries) fails the run.
+
+    BENCHMARK=1 python -m pytest tests/test_benchmarks.py -s
+    BENCHMARK=1 BENCHMARK_BASELINE=benchmark_results.json python -m pytest tests/test_benchmarks.py -s
+"""
+import asyncio
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from auth import create_access_token
+from database import Base, get_db, get_async_database_url, apply_sqlite_profile
+from main import app
+from query_stats import instrument_engine
+from seed_data import generate_bulk_data
+
+BENCHMARK_ENABLED = os.getenv("BENCHMARK", "0") == "1"
+BENCHMARK_SCALE = float(os.getenv("BENCHMARK_SCALE", "1"))
+BENCHMARK_ITERATIONS = int(os.getenv("BENCHMARK_ITERATIONS", "50"))
+BENCHMARK_SEED = int(os.getenv("BENCHMARK_SEED", "1234"))
+BENCHMARK_RESULTS = os.getenv("BENCHMARK_RESULTS", "benchmark_results.json")
+BENCHMARK_BASELINE = os.getenv("BENCHMARK_BASELINE")
+# Allowed relative p95 growth before a run counts as a regression
+BENCHMARK_REGRESSION_THRESHOLD = float(os.getenv("BENCHMARK_REGRESSION_THRESHOLD", "0.25"))
+# Differences below this many milliseconds are treated as noise
+BENCHMARK_NOISE_FLOOR_MS = float(os.getenv("BENCHMARK_NOISE_FLOOR_MS", "5"))
+
+# Dataset size at BENCHMARK_SCALE=1 (see seed_data.generate_bulk_data)
+DATASET = {
+    "users": 200,
+    "decks_per_user": 5,
+    "cards_per_deck": 20,
+    "sessions_per_user": 20,
+}
+
+def dataset_sizes(scale: float) -> dict:
+    """Scale the user count; per-user fan-out stays fixed"""
+    sizes = dict(DATASET)
+    sizes["users"] = max(2, int(DATASET["users"] * scale))
+    return sizes
+
+def percentile(samples, pct: int) -> float:
+    """Inclusive percentile of a list of samples"""
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+def count_rows(payload) -> int:
+    """Rows in a response body: list length, list fields of an object, or 1"""
+    if isinstance(payload, list):
+        return len(payload)
+    if isinstance(payload, dict):
+        lists = [value for value in payload.values() if isinstance(value, list)]
+        return sum(len(value) for value in lists) if lists else 1
+    return 1
+
+def summarize(latencies, queries, rows) -> dict:
+    """Aggregate one endpoint's samples"""
+    total_time = sum(latencies)
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "queries_per_request": round(statistics.mean(queries), 2),
+        "rows_per_second": round(sum(rows) / total_time, 1) if total_time else 0.0,
+    }
+
+def compare_results(results: dict, baseline: dict, threshold: float = BENCHMARK_REGRESSION_THRESHOLD) -> list:
+    """Endpoints that got slower (p95) or chattier (queries per request) than the baseline"""
+    regressions = []
+    for name, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        slower = current["p95_ms"] - previous["p95_ms"]
+        if slower > BENCHMARK_NOISE_FLOOR_MS and current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["queries_per_request"] > previous["queries_per_request"]:
+            regressions.append(f"{name}: queries/request {previous['queries_per_request']} -> {current['queries_per_request']}")
+    return regressions
+
+# (name, method, path, json body); paths and bodies are formatted with the run context and iteration
+ENDPOINTS = [
+    ("auth.me", "GET", "/api/auth/me", None),
+    ("decks.list", "GET", "/api/decks/", None),
+    ("decks.list_public", "GET", "/api/decks/?public_only=true&limit=50", None),
+    ("decks.search", "GET", "/api/decks/?search=Deck 1", None),
+    ("decks.create", "POST", "/api/decks/", {"title": "Bench deck {i}", "is_public": True, "tags": ["bench"]}),
+    ("decks.get", "GET", "/api/decks/{deck_id}", None),
+    ("decks.cards", "GET", "/api/decks/{deck_id}/cards", None),
+    ("decks.star", "POST", "/api/decks/{deck_id}/star", None),
+    ("cards.list", "GET", "/api/cards/?deck_id={deck_id}", None),
+    ("cards.deck_cards", "GET", "/api/cards/decks/{deck_id}/cards", None),
+    ("cards.get", "GET", "/api/cards/{card_id}", None),
+    ("cards.search", "GET", "/api/cards/search?q=question", None),
+    ("cards.create", "POST", "/api/cards/", {"deck_id": "{deck_id}", "question": "Bench {i}?", "question_type": "mcq", "options": ["A", "B"], "correct_answers": ["A"]}),
+    ("cards.update", "PUT", "/api/cards/{card_id}", {"explanation": "Updated {i}"}),
+    ("cards.bookmark", "POST", "/api/cards/{card_id}/bookmark", None),
+    ("quiz.start_exam", "POST", "/api/quiz/sessions", {"deck_id": "{deck_id}", "mode": "exam"}),
+    ("quiz.start_study", "POST", "/api/quiz/sessions", {"deck_id": "{deck_id}", "mode": "study"}),
+    ("quiz.answer", "POST", "/api/quiz/sessions/{session_id}/answers", {"card_id": "{card_id}", "user_answers": ["A"], "time_taken": 5}),
+    ("quiz.complete", "POST", "/api/quiz/sessions/{session_id}/complete", None),
+    ("quiz.get_session", "GET", "/api/quiz/sessions/{session_id}", None),
+    ("quiz.sessions", "GET", "/api/quiz/sessions", None),
+    ("quiz.dashboard", "GET", "/api/quiz/dashboard", None),
+    ("users.discover", "GET", "/api/users/discover", None),
+    ("users.profile", "GET", "/api/users/profile/{username}", None),
+    ("users.profile_decks", "GET", "/api/users/profile/{username}/decks", None),
+    ("users.profile_stars", "GET", "/api/users/profile/{username}/stars", None),
+    ("users.activity", "GET", "/api/users/{username}/activity", None),
+    ("users.achievements", "GET", "/api/users/{username}/achievements", None),
+    ("users.progress", "GET", "/api/users/progress", None),
+    ("users.streak", "GET", "/api/users/streak", None),
+    ("import.export_deck", "GET", "/api/import/deck/{deck_id}", None),
+    ("import.csv_template", "GET", "/api/import/template/csv", None),
+]
+
+def _render(value, context: dict):
+    """Format strings in a path/body template; whole-placeholder strings keep their type"""
+    if isinstance(value, dict):
+        return {key: _render(item, context) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_render(item, context) for item in value]
+    if isinstance(value, str):
+        if value.startswith("{") and value.endswith("}") and value[1:-1] in context:
+            return context[value[1:-1]]
+        return value.format(**context)
+    return value
+
+async def run_benchmark(client: httpx.AsyncClient, context: dict, iterations: int) -> dict:
+    """Drive every endpoint `iterations` times and aggregate the samples"""
+    results = {}
+    session_ids = []
+    for name, method, path, body in ENDPOINTS:
+        latencies, queries, rows = [], [], []
+        for i in range(iterations):
+            request_context = {**context, "i": i}
+            if name in ("quiz.answer", "quiz.complete", "quiz.get_session"):
+                request_context["session_id"] = session_ids[i]
+            started = time.perf_counter()
+            response = await client.request(method, _render(path, request_context), json=_render(body, request_context))
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, f"{name}: {response.status_code} {response.text[:200]}"
+            queries.append(int(response.headers.get("X-DB-Query-Count", 0)))
+            payload = response.json() if response.headers.get("content-type", "").startswith("application/json") else None
+            rows.append(count_rows(payload))
+            if name == "quiz.start_exam":
+                session_ids.append(payload["id"])
+        results[name] = summarize(latencies, queries, rows)
+    return results
+
+@pytest.fixture(scope="module")
+def benchmark_app(tmp_path_factory):
+    """Seed a fresh database and point the app's get_db at it"""
+    url = f"sqlite:///{tmp_path_factory.mktemp('benchmark') / 'benchmark.db'}"
+    sync_engine = create_engine(url)
+    apply_sqlite_profile(sync_engine)
+    Base.metadata.create_all(bind=sync_engine)
+
+    sizes = dataset_sizes(BENCHMARK_SCALE)
+    started = time.perf_counter()
+    counts = generate_bulk_data(sync_engine, seed=BENCHMARK_SEED, **sizes)
+    seed_seconds = time.perf_counter() - started
+    sync_engine.dispose()
+
+    async_engine = create_async_engine(get_async_database_url(url))
+    apply_sqlite_profile(async_engine.sync_engine)
+    instrument_engine(async_engine.sync_engine)
+    SessionFactory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def _get_db():
+        async with SessionFactory() as db:
+            yield db
+
+    previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = _get_db
+    yield {"engine": async_engine, "sizes": sizes, "counts": counts, "seed_seconds": seed_seconds}
+    if previous_override:
+        app.dependency_overrides[get_db] = previous_override
+    else:
+        app.dependency_overrides.pop(get_db, None)
+
+
+@pytest.mark.skipif(not BENCHMARK_ENABLED, reason="set BENCHMARK=1 to run endpoint benchmarks")
+class TestEndpointBenchmarks:
+    """Latency benchmarks for every router endpoint"""
+
+    def test_endpoint_latency(self, benchmark_app):
+        """Benchmark all endpoints, store results and compare with the baseline"""
+        # In a fresh database the first generated user owns deck 1, which holds card 1
+        token = create_access_token({"sub": "user1@bulk.magizh.app", "uid": 1, "ver": 1})
+        context = {"deck_id": 1, "card_id": 1, "username": "bulk_user_1"}
+
+        async def _run():
+            transport = httpx.ASGITransport(app=app)
+            headers = {"Authorization": f"Bearer {token}"}
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", headers=headers) as client:
+                # Warm up connections and statement caches before measuring
+                await run_benchmark(client, context, 2)
+                endpoints = await run_benchmark(client, context, BENCHMARK_ITERATIONS)
+            await benchmark_app["engine"].dispose()
+            return endpoints
+
+        endpoints = asyncio.run(_run())
+        seeded_rows = sum(benchmark_app["counts"].values())
+        results = {
+            "meta": {
+                "created_at": datetime.utcnow().isoformat(),
+                "scale": BENCHMARK_SCALE,
+                "iterations": BENCHMARK_ITERATIONS,
+                "seed": BENCHMARK_SEED,
+                "rows": benchmark_app["counts"],
+                "seed_rows_per_second": round(seeded_rows / benchmark_app["seed_seconds"], 1),
+            },
+            "endpoints": endpoints,
+        }
+        with open(BENCHMARK_RESULTS, "w") as results_file:
+            json.dump(results, results_file, indent=2)
+
+        print(f"\n{'endpoint':<24}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}{'rows/s':>11}")
+        for name, stats in endpoints.items():
+            print(f"{name:<24}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['queries_per_request']:>9.1f}{stats['rows_per_second']:>11.1f}")
+        print(f"Seeded {seeded_rows} rows at {results['meta']['seed_rows_per_second']} rows/s; results in {BENCHMARK_RESULTS}")
+
+        if BENCHMARK_BASELINE:
+            with open(BENCHMARK_BASELINE) as baseline_file:
+                regressions = compare_results(results, json.load(baseline_file))
+            assert not regressions, "Benchmark regressions:\n" + "\n".join(regressions)
+
+
+class TestBenchmarkHelpers:
+    """Test the benchmark statistics and regression check"""
+
+    def test_summarize_percentiles(self):
+        """Test latency percentiles and throughput"""
+        stats = summarize([i / 1000 for i in range(1, 101)], [3] * 100, [10] * 100)
+        assert stats["p50_ms"] == pytest.approx(50.5)
+        assert stats["p95_ms"] == pytest.approx(95.05)
+        assert stats["p99_ms"] == pytest.approx(99.01)
+        assert stats["queries_per_request"] == 3
+        assert stats["rows_per_second"] == pytest.approx(1000 / 5.05, rel=0.01)
+
+    def test_compare_results_flags_regressions(self):
+        """Test that slower p95 and extra queries are regressions, noise is not"""
+        baseline = {"endpoints": {
+            "a": {"p95_ms": 10.0, "queries_per_request": 3},
+            "b": {"p95_ms": 1.0, "queries_per_request": 3},
+        }}
+        results = {"endpoints": {
+            "a": {"p95_ms": 20.0, "queries_per_request": 4},
+            "b": {"p95_ms": 1.5, "queries_per_request": 3},  # +50% but under the noise floor
+            "c": {"p95_ms": 99.0, "queries_per_request": 9},  # new endpoint, no baseline
+        }}
+        regressions = compare_results(results, baseline, threshold=0.25)
+        assert regressions == ["a: p95 10.0ms -> 20.0ms", "a: queries/request 3 -> 4"]
@@ -0,0 +1,93 @@
+import pytest
+import models
+from cache import TaggedTTLCache
+from query_stats import collect_queries
+from services.bookmark_cache import bookmark_cache
+
+
+def bookmark_queries(client, url, headers):
+    """The response and the number of card_bookmarks queries it took"""
+    with collect_queries() as stats:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return response, sum(count for shape, count in stats.shapes.items() if "FROM card_bookmarks" in shape)
+
+@pytest.fixture
+def deck_with_cards(client, auth_headers, created_deck, sample_card_data):
+    """The created deck with five cards"""
+    cards = [
+        client.post("/api/cards/", json={**sample_card_data, "deck_id": created_deck["id"], "question": f"Q{i}?"}, headers=auth_headers).json()
+        for i in range(5)
+    ]
+    return {"deck": created_deck, "cards": cards}
+
+class TestTaggedTTLCacheUpdate:
+    """Test in-place updates of cached values"""
+
+    def test_update_changes_value_and_blocks_stale_store(self):
+        """Test update() patches the entry and rejects values loaded before it"""
+        cache = TaggedTTLCache("test_update", max_size=10, ttl_seconds=60)
+        cache.set_tagged("a", frozenset({1}), (), cache.generation)
+        generation = cache.generation
+        cache.update(lambda value: value | {2}, keys=["a", "missing"])
+        assert cache.get("a") == frozenset({1, 2})
+        assert cache.get("missing") is None
+        cache.set_tagged("a", frozenset(), (), generation)
+        assert cache.get("a") == frozenset({1, 2})
+
+class TestBookmarkStatus:
+    """Test bookmark status comes from one cached set per user"""
+
+    def test_card_list_reads_bookmarks_once(self, client, auth_headers, deck_with_cards):
+        """Test a card list costs at most one bookmark query, whatever its length"""
+        url = f"/api/cards/?deck_id={deck_with_cards['deck']['id']}"
+        response, queries = bookmark_queries(client, url, auth_headers)
+        assert queries <= 1
+        assert len(response.json()) == 5
+        _, queries = bookmark_queries(client, url, auth_headers)
+        assert queries == 0
+
+    def test_bookmark_updates_cached_set_in_place(self, client, auth_headers, deck_with_cards):
+        """Test toggling a bookmark shows up without reloading the set"""
+        card_id = deck_with_cards["cards"][0]["id"]
+        url = f"/api/cards/?deck_id={deck_with_cards['deck']['id']}"
+        bookmark_queries(client, url, auth_headers)
+
+        client.post(f"/api/cards/{card_id}/bookmark", headers=auth_headers)
+        response, queries = bookmark_queries(client, url, auth_headers)
+        assert queries == 0
+        assert {card["id"] for card in response.json() if card["is_bookmarked"]} == {card_id}
+
+        client.post(f"/api/cards/{card_id}/bookmark", headers=auth_headers)
+        response, _ = bookmark_queries(client, url, auth_headers)
+        assert not any(card["is_bookmarked"] for card in response.json())
+
+    def test_single_card_and_search_use_cached_set(self, client, auth_headers, deck_with_cards):
+        """Test get_card and search mark bookmarks from the same set"""
+        card_id = deck_with_cards["cards"][1]["id"]
+        client.post(f"/api/cards/{card_id}/bookmark", headers=auth_headers)
+        response, queries = bookmark_queries(client, f"/api/cards/{card_id}", auth_headers)
+        assert response.json()["is_bookmarked"] is True
+        response, queries = bookmark_queries(client, "/api/cards/search?q=Q1", auth_headers)
+        assert queries == 0
+        assert [card["is_bookmarked"] for card in response.json() if card["id"] == card_id] == [True]
+
+    def test_deleted_card_leaves_cached_sets(self, client, auth_headers, deck_with_cards):
+        """Test a deleted card's id is dropped from every cached set"""
+        card_id = deck_with_cards["cards"][2]["id"]
+        client.post(f"/api/cards/{card_id}/bookmark", headers=auth_headers)
+        client.get(f"/api/cards/?deck_id={deck_with_cards['deck']['id']}", headers=auth_headers)
+        user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+        assert card_id in bookmark_cache.get(user_id)
+
+        client.delete(f"/api/cards/{card_id}", headers=auth_headers)
+        assert card_id not in bookmark_cache.get(user_id)
+
+    def test_rolled_back_bookmark_not_applied(self, client, auth_headers, db_session, deck_with_cards):
+        """Test a bookmark that never commits leaves the cached set alone"""
+        user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+        bookmark_cache.set_tagged(user_id, frozenset(), (), bookmark_cache.generation)
+        db_session.add(models.CardBookmark(user_id=user_id, card_id=deck_with_cards["cards"][3]["id"]))
+        db_session.flush()
+        db_session.rollback()
+        assert bookmark_cache.get(user_id) == frozenset()
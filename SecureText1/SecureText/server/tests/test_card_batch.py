@@ -0,0 +1,121 @@
+import pytest
+import models
+from query_stats import collect_queries
+from schemas import MAX_CARD_BATCH_SIZE
+
+
+def card_data(sample_card_data, **overrides):
+    card = {**sample_card_data, **overrides}
+    card.pop("deck_id", None)
+    return card
+
+def deck_card_count(client, auth_headers, deck_id):
+    return next(deck for deck in client.get("/api/decks/", headers=auth_headers).json() if deck["id"] == deck_id)["card_count"]
+
+class TestBatchCreate:
+    """Test POST /api/cards/batch"""
+
+    def test_creates_valid_cards_and_reports_invalid_ones(self, client, auth_headers, created_deck, sample_card_data):
+        """Test each item gets its own result and only valid items are written"""
+        cards = [card_data(sample_card_data, question=f"Batch {i}?") for i in range(3)]
+        cards.insert(1, card_data(sample_card_data, correct_answers=[]))
+        response = client.post("/api/cards/batch", json={"deck_id": created_deck["id"], "cards": cards}, headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["succeeded"], data["failed"]) == (3, 1)
+        assert [result["status"] for result in data["results"]] == ["created", "invalid", "created", "created"]
+        assert "correct_answers" in data["results"][1]["error"]
+
+        listed = client.get(f"/api/cards/?deck_id={created_deck['id']}", headers=auth_headers).json()
+        assert [card["question"] for card in listed] == ["Batch 0?", "Batch 1?", "Batch 2?"]
+        assert {card["id"] for card in listed} == {result["id"] for result in data["results"] if result["id"]}
+        assert deck_card_count(client, auth_headers, created_deck["id"]) == 3
+
+    def test_inserts_are_batched(self, client, auth_headers, created_deck, sample_card_data):
+        """Test a large batch costs a handful of INSERTs, not one per card"""
+        cards = [card_data(sample_card_data, question=f"Bulk {i}?") for i in range(200)]
+        with collect_queries() as stats:
+            response = client.post("/api/cards/batch", json={"deck_id": created_deck["id"], "cards": cards}, headers=auth_headers)
+        assert response.json()["succeeded"] == 200
+        inserts = sum(count for shape, count in stats.shapes.items() if shape.startswith("INSERT INTO cards"))
+        assert 0 < inserts < 10
+
+    def test_new_cards_are_tag_indexed(self, client, auth_headers, created_deck, sample_card_data):
+        """Test batch-created cards are found by tag-filtered quizzes and searches"""
+        cards = [card_data(sample_card_data, question="Tagged?", tags=["batchtag"])]
+        client.post("/api/cards/batch", json={"deck_id": created_deck["id"], "cards": cards}, headers=auth_headers)
+        response = client.post("/api/quiz/sessions", json={"deck_id": created_deck["id"], "mode": "study", "tags": ["batchtag"]}, headers=auth_headers)
+        assert response.status_code == 200
+
+    def test_rejects_oversized_batch(self, client, auth_headers, created_deck, sample_card_data):
+        """Test batches above the limit are refused outright"""
+        cards = [card_data(sample_card_data)] * (MAX_CARD_BATCH_SIZE + 1)
+        response = client.post("/api/cards/batch", json={"deck_id": created_deck["id"], "cards": cards}, headers=auth_headers)
+        assert response.status_code == 422
+
+    def test_requires_deck_ownership(self, client, auth_headers, db_session, sample_card_data):
+        """Test a batch into someone else's deck is refused"""
+        owner = models.User(email="batch-owner@example.com", name="Owner", username="batchowner", google_id="batch_owner_google_id")
+        db_session.add(owner)
+        db_session.flush()
+        deck = models.Deck(title="Not yours", user_id=owner.id, is_public=True)
+        db_session.add(deck)
+        db_session.commit()
+        response = client.post("/api/cards/batch", json={"deck_id": deck.id, "cards": [card_data(sample_card_data)]}, headers=auth_headers)
+        assert response.status_code == 403
+        db_session.delete(deck)
+        db_session.delete(owner)
+        db_session.commit()
+
+@pytest.fixture
+def batch_cards(client, auth_headers, created_deck, sample_card_data):
+    """Ids of four cards created in one batch"""
+    cards = [card_data(sample_card_data, question=f"Card {i}?") for i in range(4)]
+    response = client.post("/api/cards/batch", json={"deck_id": created_deck["id"], "cards": cards}, headers=auth_headers)
+    return [result["id"] for result in response.json()["results"]]
+
+class TestBatchUpdate:
+    """Test PATCH /api/cards/batch"""
+
+    def test_updates_found_cards(self, client, auth_headers, created_deck, batch_cards):
+        """Test updates apply per card, with unknown, repeated and invalid items reported"""
+        items = [
+            {"id": batch_cards[0], "question": "Changed?", "tags": ["edited"]},
+            {"id": batch_cards[1], "question_type": "fill_blank"},
+            {"id": 999999, "question": "Missing?"},
+            {"id": batch_cards[0], "question": "Again?"},
+            {"id": batch_cards[2], "question": None},
+            {"question": "No id?"},
+        ]
+        response = client.patch("/api/cards/batch", json={"deck_id": created_deck["id"], "cards": items}, headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert [result["status"] for result in data["results"]] == ["updated", "updated", "not_found", "invalid", "invalid", "invalid"]
+        assert (data["succeeded"], data["failed"]) == (2, 4)
+
+        first = client.get(f"/api/cards/{batch_cards[0]}", headers=auth_headers).json()
+        assert (first["question"], first["tags"]) == ("Changed?", ["edited"])
+        assert client.get(f"/api/cards/{batch_cards[1]}", headers=auth_headers).json()["question_type"] == "fill_blank"
+        assert client.get(f"/api/cards/{batch_cards[2]}", headers=auth_headers).json()["question"] == "Card 2?"
+
+    def test_update_changes_deck_etag(self, client, auth_headers, created_deck, batch_cards):
+        """Test a batch update moves the deck's content version"""
+        url = f"/api/cards/decks/{created_deck['id']}/cards"
+        etag = client.get(url, headers=auth_headers).headers["etag"]
+        client.patch("/api/cards/batch", json={"deck_id": created_deck["id"], "cards": [{"id": batch_cards[0], "explanation": "New"}]}, headers=auth_headers)
+        assert client.get(url, headers=auth_headers).headers["etag"] != etag
+
+class TestBatchDelete:
+    """Test DELETE /api/cards/batch"""
+
+    def test_deletes_cards_and_counts(self, client, auth_headers, created_deck, batch_cards):
+        """Test deleted cards, bookmarks included, leave the deck and its card count"""
+        client.post(f"/api/cards/{batch_cards[0]}/bookmark", headers=auth_headers)
+        body = {"deck_id": created_deck["id"], "card_ids": [batch_cards[0], batch_cards[1], 999999, batch_cards[1]]}
+        response = client.request("DELETE", "/api/cards/batch", json=body, headers=auth_headers)
+        assert response.status_code == 200
+        assert [result["status"] for result in response.json()["results"]] == ["deleted", "deleted", "not_found", "invalid"]
+
+        listed = client.get(f"/api/cards/?deck_id={created_deck['id']}", headers=auth_headers).json()
+        assert [card["id"] for card in listed] == batch_cards[2:]
+        assert deck_card_count(client, auth_headers, created_deck["id"]) == 2
@@ -0,0 +1,103 @@
+import io
+import json
+import models
+from query_stats import collect_queries
+from services.card_hashes import CardHashService
+
+
+def import_csv(client, auth_headers, deck_id, csv_content, on_duplicate=None):
+    data = {"deck_id": deck_id}
+    if on_duplicate:
+        data["on_duplicate"] = on_duplicate
+    return client.post(
+        "/api/import/csv", data=data,
+        files={"file": ("cards.csv", io.BytesIO(csv_content.encode()), "text/csv")}, headers=auth_headers
+    )
+
+def deck_cards(client, auth_headers, deck_id):
+    return client.get(f"/api/cards/?deck_id={deck_id}", headers=auth_headers).json()
+
+CSV_HEADER = "question,question_type,options,correct_answers,explanation,tags\n"
+
+class TestContentHash:
+    """Test the normalized content hash"""
+
+    def test_normalization(self):
+        """Test case, spacing and option order don't change the hash, answers do"""
+        base = CardHashService.compute("What is 2+2?", models.QuestionType.MCQ, ["3", "4"], ["4"])
+        assert CardHashService.compute("  what IS  2+2? ", "mcq", ["4", "3"], ["4"]) == base
+        assert CardHashService.compute("What is 2+2?", "mcq", ["3", "4"], ["3"]) != base
+        assert CardHashService.compute("What is 2+2?", "fill_blank", ["3", "4"], ["4"]) != base
+
+    def test_set_on_create_and_update(self, client, auth_headers, created_card, db_session):
+        """Test ORM writes keep the stored hash in step with the card"""
+        def stored():
+            db_session.expire_all()
+            return db_session.get(models.Card, created_card["id"]).content_hash
+
+        assert stored() == CardHashService.of(created_card)
+        client.put(f"/api/cards/{created_card['id']}", json={"question": "Changed?"}, headers=auth_headers)
+        assert stored() == CardHashService.of({**created_card, "question": "Changed?"})
+
+    def test_backfill(self, db_session, created_card):
+        """Test cards written without a hash get one"""
+        db_session.query(models.Card).filter_by(id=created_card["id"]).update({"content_hash": None})
+        assert CardHashService.backfill(db_session) == 1
+        assert db_session.get(models.Card, created_card["id"]).content_hash == CardHashService.of(created_card)
+        db_session.commit()
+
+class TestDuplicatePolicies:
+    """Test skip/merge/allow on imports and card creation"""
+
+    def test_csv_reimport_skips_duplicates(self, client, auth_headers, created_deck):
+        """Test re-importing a file, or a file repeating itself, adds nothing twice"""
+        csv_content = CSV_HEADER + "What is 1+1?,mcq,\"1,2\",2,,\nwhat is 1+1? ,mcq,\"2,1\",2,,\nWhat is 2+2?,mcq,\"3,4\",4,,\n"
+        response = import_csv(client, auth_headers, created_deck["id"], csv_content)
+        assert response.json()["message"].startswith("Successfully imported 2 cards. 1 duplicates skipped")
+        with collect_queries() as stats:
+            response = import_csv(client, auth_headers, created_deck["id"], csv_content)
+        assert "imported 0 cards. 3 duplicates skipped" in response.json()["message"]
+        assert any("content_hash IN" in shape for shape in stats.shapes)
+        assert len(deck_cards(client, auth_headers, created_deck["id"])) == 2
+
+    def test_csv_merge_adds_tags_and_details(self, client, auth_headers, created_deck):
+        """Test merged duplicates add their tags and fill in a missing explanation"""
+        import_csv(client, auth_headers, created_deck["id"], CSV_HEADER + "Capital of France?,mcq,\"Paris,Rome\",Paris,,geo\n")
+        response = import_csv(
+            client, auth_headers, created_deck["id"],
+            CSV_HEADER + "Capital of France?,mcq,\"Rome,Paris\",Paris,Paris it is,\"geo,europe\"\n", on_duplicate="merge"
+        )
+        assert "1 duplicates merged" in response.json()["message"]
+        [card] = deck_cards(client, auth_headers, created_deck["id"])
+        assert (card["tags"], card["explanation"]) == (["geo", "europe"], "Paris it is")
+        response = client.post("/api/quiz/sessions", json={"deck_id": created_deck["id"], "mode": "study", "tags": ["europe"]}, headers=auth_headers)
+        assert response.status_code == 200
+
+    def test_csv_allow_keeps_duplicates(self, client, auth_headers, created_deck):
+        """Test allow imports every row as before"""
+        csv_content = CSV_HEADER + "Same?,mcq,\"a,b\",a,,\nSame?,mcq,\"a,b\",a,,\n"
+        import_csv(client, auth_headers, created_deck["id"], csv_content, on_duplicate="allow")
+        assert len(deck_cards(client, auth_headers, created_deck["id"])) == 2
+
+    def test_json_import_skips_repeated_cards(self, client, auth_headers):
+        """Test a deck file repeating a card imports it once"""
+        card = {"question": "Repeated?", "question_type": "mcq", "options": ["a", "b"], "correct_answers": ["a"]}
+        export = {"deck": {"title": "Repeats", "tags": []}, "cards": [card, card, {**card, "question": "Other?"}]}
+        response = client.post(
+            "/api/import/deck", files={"file": ("deck.json", io.BytesIO(json.dumps(export).encode()), "application/json")},
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert response.json()["card_count"] == 2
+
+    def test_create_card_policies(self, client, auth_headers, created_card, sample_card_data):
+        """Test create_card allows duplicates by default and returns the existing card on skip or merge"""
+        duplicate = {**sample_card_data, "deck_id": created_card["deck_id"], "tags": ["extra"]}
+        skipped = client.post("/api/cards/?on_duplicate=skip", json=duplicate, headers=auth_headers).json()
+        assert skipped["id"] == created_card["id"]
+        assert "extra" not in skipped["tags"]
+        merged = client.post("/api/cards/?on_duplicate=merge", json=duplicate, headers=auth_headers).json()
+        assert merged["id"] == created_card["id"]
+        assert merged["tags"][-1] == "extra"
+        allowed = client.post("/api/cards/", json=duplicate, headers=auth_headers).json()
+        assert allowed["id"] != created_card["id"]
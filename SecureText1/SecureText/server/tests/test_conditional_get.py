@@ -0,0 +1,126 @@
+import uuid
+import pytest
+import models
+from conditional import strong_etag
+
+def revalidate(client, url, etag, headers=None):
+    return client.get(url, headers={**(headers or {}), "If-None-Match": etag})
+
+class TestDeckCardsConditionalGet:
+    """Test ETag revalidation of a deck's card list"""
+    
+    def test_validators_present(self, client, auth_headers, created_card):
+        """Test the card list carries an ETag, Last-Modified and a revalidate policy"""
+        response = client.get(f"/api/cards/decks/{created_card['deck_id']}/cards", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["ETag"].startswith('"')
+        assert response.headers["Last-Modified"].endswith("GMT")
+        assert response.headers["Cache-Control"] == "private, no-cache"
+    
+    def test_not_modified_skips_card_rows(self, client, auth_headers, created_card, query_budget):
+        """Test a matching If-None-Match is answered with 304 before cards are loaded"""
+        url = f"/api/cards/decks/{created_card['deck_id']}/cards"
+        etag = client.get(url, headers=auth_headers).headers["ETag"]
+        
+        with query_budget(3) as stats:
+            response = revalidate(client, url, etag, auth_headers)
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+        assert not [shape for shape in stats.shapes if "FROM cards" in shape]
+    
+    @pytest.mark.parametrize("header", ['"other", {etag}', "W/{etag}", "*"])
+    def test_if_none_match_forms(self, client, auth_headers, created_card, header):
+        """Test tag lists, weak tags and * all match"""
+        url = f"/api/cards/decks/{created_card['deck_id']}/cards"
+        etag = client.get(url, headers=auth_headers).headers["ETag"]
+        assert revalidate(client, url, header.format(etag=etag), auth_headers).status_code == 304
+    
+    def test_card_writes_change_etag(self, client, auth_headers, created_card, sample_card_data):
+        """Test creating, updating and deleting cards each invalidate the list"""
+        url = f"/api/cards/decks/{created_card['deck_id']}/cards"
+        seen = [client.get(url, headers=auth_headers).headers["ETag"]]
+        
+        new_card = client.post("/api/cards/", json={**sample_card_data, "deck_id": created_card["deck_id"]}, headers=auth_headers).json()
+        seen.append(client.get(url, headers=auth_headers).headers["ETag"])
+        client.put(f"/api/cards/{new_card['id']}", json={"question": "Changed?"}, headers=auth_headers)
+        seen.append(client.get(url, headers=auth_headers).headers["ETag"])
+        client.delete(f"/api/cards/{new_card['id']}", headers=auth_headers)
+        
+        response = revalidate(client, url, seen[-1], auth_headers)
+        assert response.status_code == 200
+        seen.append(response.headers["ETag"])
+        assert len(set(seen)) == 4
+    
+    def test_bookmark_changes_etag(self, client, auth_headers, created_card):
+        """Test the caller's bookmarks are part of the tag"""
+        url = f"/api/cards/decks/{created_card['deck_id']}/cards"
+        etag = client.get(url, headers=auth_headers).headers["ETag"]
+        client.post(f"/api/cards/{created_card['id']}/bookmark", headers=auth_headers)
+        
+        response = revalidate(client, url, etag, auth_headers)
+        assert response.status_code == 200
+        assert response.json()[0]["is_bookmarked"] is True
+
+class TestExportConditionalGet:
+    """Test ETag revalidation of deck exports"""
+    
+    def test_export_revalidation(self, client, auth_headers, created_card, sample_card_data):
+        """Test an unchanged export is a 304 and a new card makes it a 200"""
+        url = f"/api/import/deck/{created_card['deck_id']}"
+        etag = client.get(url, headers=auth_headers).headers["ETag"]
+        assert revalidate(client, url, etag, auth_headers).status_code == 304
+        
+        client.post("/api/cards/", json={**sample_card_data, "deck_id": created_card["deck_id"]}, headers=auth_headers)
+        response = revalidate(client, url, etag, auth_headers)
+        assert response.status_code == 200
+        assert response.json()["deck"]["card_count"] == 2
+
+class TestProfileConditionalGet:
+    """Test ETag revalidation of public profiles"""
+    
+    def test_profile_revalidation(self, client, auth_headers):
+        """Test the profile is a 304 until its counts change"""
+        url = "/api/users/profile/demo_user"
+        etag = client.get(url).headers["ETag"]
+        assert revalidate(client, url, etag).status_code == 304
+        
+        client.post("/api/decks/", json={"title": f"Profile {uuid.uuid4().hex[:8]}", "is_public": True}, headers=auth_headers)
+        assert revalidate(client, url, etag).status_code == 200
+
+class TestContentVersion:
+    """Test which writes move a deck to a new content version"""
+    
+    def test_deck_text_bumps_version(self, db_session, created_deck):
+        """Test editing deck text bumps the version, counter updates do not"""
+        deck = db_session.get(models.Deck, created_deck["id"])
+        version = deck.content_version
+        
+        deck.star_count += 1
+        db_session.commit()
+        db_session.refresh(deck)
+        assert deck.content_version == version
+        
+        deck.title = "Renamed"
+        db_session.commit()
+        db_session.refresh(deck)
+        assert deck.content_version == version + 1
+    
+    def test_moving_card_bumps_both_decks(self, client, auth_headers, db_session, created_card):
+        """Test a card moved between decks changes both"""
+        other_id = client.post("/api/decks/", json={"title": "Other"}, headers=auth_headers).json()["id"]
+        source = db_session.get(models.Deck, created_card["deck_id"])
+        target = db_session.get(models.Deck, other_id)
+        versions = (source.content_version, target.content_version)
+        
+        card = db_session.get(models.Card, created_card["id"])
+        card.deck_id = other_id
+        db_session.commit()
+        db_session.refresh(source)
+        db_session.refresh(target)
+        assert (source.content_version, target.content_version) == (versions[0] + 1, versions[1] + 1)
+    
+    def test_strong_etag_is_stable(self):
+        """Test equal validators give equal tags and different ones differ"""
+        assert strong_etag("deck-cards", 1, 2, [3]) == strong_etag("deck-cards", 1, 2, [3])
+        assert strong_etag("deck-cards", 1, 2, [3]) != strong_etag("deck-cards", 1, 3, [3])
@@ -0,0 +1,22 @@
+import pytest
+from database import SQLITE_PRAGMAS, get_sqlite_pragmas, get_async_database_url
+
+
+class TestSQLiteProfile:
+    """Test the SQLite connection tuning profile"""
+    
+    def test_pragmas_applied_to_connections(self, engine):
+        """Test that every pooled connection gets the tuning pragmas"""
+        pragmas = get_sqlite_pragmas(engine)
+        assert pragmas["journal_mode"].lower() == "wal"
+        assert pragmas["synchronous"] == 1  # NORMAL
+        assert pragmas["busy_timeout"] == SQLITE_PRAGMAS["busy_timeout"]
+        assert pragmas["cache_size"] == SQLITE_PRAGMAS["cache_size"]
+        assert pragmas["temp_store"] == 2  # MEMORY
+        assert pragmas["foreign_keys"] == 1
+
+    def test_async_database_url(self):
+        """Test async driver selection for database URLs"""
+        assert get_async_database_url("sqlite:///./quiz.db") == "sqlite+aiosqlite:///./quiz.db"
+        assert get_async_database_url("postgresql://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+        assert get_async_database_url("postgres://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
@@ -0,0 +1,133 @@
+import io
+import json
+import pytest
+from sqlalchemy import update
+import models
+from services.deck_counters import DeckCounterService
+
+
+def deck_counters(db_session, deck_id):
+    """Stored (card_count, star_count, session_count) of a deck"""
+    db_session.expire_all()
+    deck = db_session.get(models.Deck, deck_id)
+    return deck.card_count, deck.star_count, deck.session_count
+
+class TestDeckCounters:
+    """Test the denormalized deck counters stay in step with their rows"""
+    
+    def test_new_deck_starts_at_zero(self, client, created_deck, db_session):
+        """Test a new deck has all counters at zero"""
+        assert created_deck["card_count"] == 0
+        assert created_deck["star_count"] == 0
+        assert deck_counters(db_session, created_deck["id"]) == (0, 0, 0)
+    
+    def test_card_create_and_delete(self, client, auth_headers, created_deck, sample_card_data, db_session):
+        """Test creating and deleting cards moves card_count"""
+        card_data = {**sample_card_data, "deck_id": created_deck["id"]}
+        cards = [client.post("/api/cards/", json=card_data, headers=auth_headers).json() for _ in range(3)]
+        assert deck_counters(db_session, created_deck["id"])[0] == 3
+        
+        response = client.delete(f"/api/cards/{cards[0]['id']}", headers=auth_headers)
+        assert response.status_code == 200
+        assert deck_counters(db_session, created_deck["id"])[0] == 2
+    
+    def test_failed_card_create_leaves_counter(self, client, auth_headers, created_deck, db_session):
+        """Test a rejected card doesn't touch card_count"""
+        response = client.post("/api/cards/", json={"deck_id": created_deck["id"], "question": ""}, headers=auth_headers)
+        assert response.status_code == 422
+        assert deck_counters(db_session, created_deck["id"])[0] == 0
+    
+    def test_star_and_unstar(self, client, auth_headers, created_deck, db_session):
+        """Test toggling a star moves star_count both ways"""
+        client.post(f"/api/decks/{created_deck['id']}/star", headers=auth_headers)
+        assert deck_counters(db_session, created_deck["id"])[1] == 1
+        
+        client.post(f"/api/decks/{created_deck['id']}/star", headers=auth_headers)
+        assert deck_counters(db_session, created_deck["id"])[1] == 0
+    
+    def test_csv_import(self, client, auth_headers, created_deck, db_session):
+        """Test a CSV import adds all imported rows to card_count"""
+        csv_content = (
+            "question,question_type,options,correct_answers\n"
+            "What is 1+1?,mcq,\"1,2\",2\n"
+            "What is 2+2?,mcq,\"3,4\",4\n"
+        )
+        response = client.post(
+            "/api/import/csv",
+            data={"deck_id": created_deck["id"]},
+            files={"file": ("cards.csv", io.BytesIO(csv_content.encode()), "text/csv")},
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert deck_counters(db_session, created_deck["id"])[0] == 2
+    
+    def test_json_import(self, client, auth_headers, db_session):
+        """Test an imported deck starts with its imported card count"""
+        export = {
+            "deck": {"title": "Counted Import", "tags": []},
+            "cards": [
+                {"question": f"Q{i}?", "question_type": "mcq", "options": ["a", "b"], "correct_answers": ["a"]}
+                for i in range(4)
+            ]
+        }
+        response = client.post(
+            "/api/import/deck",
+            files={"file": ("deck.json", io.BytesIO(json.dumps(export).encode()), "application/json")},
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert response.json()["card_count"] == 4
+        assert deck_counters(db_session, response.json()["id"])[0] == 4
+    
+    def test_quiz_completion(self, client, auth_headers, created_card, db_session):
+        """Test completing a quiz session bumps session_count, starting one doesn't"""
+        deck_id = created_card["deck_id"]
+        session = client.post("/api/quiz/sessions", json={"deck_id": deck_id, "mode": "exam"}, headers=auth_headers).json()
+        assert deck_counters(db_session, deck_id)[2] == 0
+        
+        client.post(
+            f"/api/quiz/sessions/{session['id']}/answers",
+            json={"card_id": created_card["id"], "user_answers": ["Paris"]},
+            headers=auth_headers
+        )
+        response = client.post(f"/api/quiz/sessions/{session['id']}/complete", headers=auth_headers)
+        assert response.status_code == 200
+        assert deck_counters(db_session, deck_id)[2] == 1
+
+class TestDeckCounterReconciliation:
+    """Test the bulk reconciliation of drifted counters"""
+    
+    def test_reconcile_repairs_drift(self, client, auth_headers, created_card, db_session):
+        """Test reconcile() restores the real counts and reports what it fixed"""
+        deck_id = created_card["deck_id"]
+        client.post(f"/api/decks/{deck_id}/star", headers=auth_headers)
+        DeckCounterService.reconcile(db_session)
+        db_session.commit()
+        
+        db_session.execute(
+            update(models.Deck).where(models.Deck.id == deck_id).values(card_count=42, star_count=0, session_count=7)
+        )
+        db_session.commit()
+        
+        assert DeckCounterService.reconcile(db_session) == 1
+        db_session.commit()
+        assert deck_counters(db_session, deck_id) == (1, 1, 0)
+        
+        # Nothing left to repair
+        assert DeckCounterService.reconcile(db_session) == 0
+    
+    def test_reconcile_limited_to_decks(self, client, auth_headers, created_card, db_session):
+        """Test reconcile() only touches the given decks"""
+        deck_id = created_card["deck_id"]
+        db_session.execute(update(models.Deck).where(models.Deck.id == deck_id).values(card_count=9))
+        db_session.commit()
+        
+        assert DeckCounterService.reconcile(db_session, deck_ids=[deck_id + 1000]) == 0
+        assert DeckCounterService.reconcile(db_session, deck_ids=[deck_id]) == 1
+        db_session.commit()
+        assert deck_counters(db_session, deck_id)[0] == 1
+    
+    def test_adjust_requires_a_delta(self):
+        """Test adjust() refuses an update with nothing to change"""
+        with pytest.raises(ValueError):
+            DeckCounterService.adjust(1, card_count=0)
@@ -0,0 +1,188 @@
+import asyncio
+import math
+import uuid
+from datetime import datetime, timedelta
+import pytest
+import jobs
+import models
+from auth import create_access_token, token_claims
+from query_stats import collect_queries
+from services.deck_rankings import DeckRankingService
+
+
+def ranking(db_session, deck_id):
+    """Stored (trending_score, popular_score, learner_count) of a deck"""
+    db_session.expire_all()
+    row = db_session.get(models.DeckRanking, deck_id)
+    return row.trending_score, row.popular_score, row.learner_count
+
+def other_user_headers(db_session):
+    """Auth headers for a fresh second user"""
+    name = f"other{uuid.uuid4().hex[:8]}"
+    user = models.User(email=f"{name}@example.com", name=name, username=name, username_set=True, google_id=name)
+    db_session.add(user)
+    db_session.commit()
+    return {"Authorization": f"Bearer {create_access_token(token_claims(user))}"}
+
+def complete_session(client, auth_headers, card):
+    session = client.post("/api/quiz/sessions", json={"deck_id": card["deck_id"], "mode": "exam"}, headers=auth_headers).json()
+    client.post(
+        f"/api/quiz/sessions/{session['id']}/answers",
+        json={"card_id": card["id"], "user_answers": ["Paris"]},
+        headers=auth_headers
+    )
+    assert client.post(f"/api/quiz/sessions/{session['id']}/complete", headers=auth_headers).status_code == 200
+
+class TestTrendingScore:
+    """Test the time-decayed score arithmetic"""
+    
+    def test_combine_adds_in_log_space(self):
+        """Test combining two log2 scores gives log2 of their sum"""
+        assert DeckRankingService.combine(math.log2(6), math.log2(2)) == pytest.approx(3.0)
+        assert DeckRankingService.combine(0.0, 5.0) == 5.0
+    
+    def test_subtract_inverts_combine(self):
+        """Test subtracting an event takes back exactly what combining it added"""
+        assert DeckRankingService.subtract(3.0, math.log2(2)) == pytest.approx(math.log2(6))
+        assert DeckRankingService.subtract(DeckRankingService.combine(4.2, 1.7), 1.7) == pytest.approx(4.2)
+        assert DeckRankingService.subtract(5.0, 5.0) == 0.0
+    
+    def test_weight_halves_every_half_life(self):
+        """Test an event one half-life older counts half as much"""
+        now = datetime(2026, 1, 1)
+        older = now - timedelta(days=DeckRankingService.HALF_LIFE_DAYS)
+        assert DeckRankingService.event_score(1.0, now) - DeckRankingService.event_score(1.0, older) == pytest.approx(1.0)
+    
+    def test_recent_activity_outranks_old(self):
+        """Test one recent star beats two old ones"""
+        now = datetime(2026, 1, 1)
+        old = DeckRankingService.event_score(DeckRankingService.STAR_WEIGHT * 2, now - timedelta(days=30))
+        assert DeckRankingService.event_score(DeckRankingService.STAR_WEIGHT, now) > old
+
+class TestRankingMaintenance:
+    """Test stars and quiz completions keep the rankings current"""
+    
+    def test_new_deck_has_ranking_row(self, created_deck, db_session):
+        """Test every deck is created with a zero ranking"""
+        assert ranking(db_session, created_deck["id"]) == (0.0, 0.0, 0)
+    
+    def test_star_and_unstar(self, client, auth_headers, created_deck, db_session):
+        """Test a star adds to both scores and unstarring takes it back"""
+        deck_id = created_deck["id"]
+        client.post(f"/api/decks/{deck_id}/star", headers=auth_headers)
+        trending, popular, _ = ranking(db_session, deck_id)
+        assert trending > 0
+        assert popular == DeckRankingService.STAR_WEIGHT
+        
+        client.post(f"/api/decks/{deck_id}/star", headers=auth_headers)
+        assert ranking(db_session, deck_id) == (0.0, 0.0, 0)
+    
+    def test_unstar_subtracts_without_rescore(self, client, auth_headers, created_deck, db_session):
+        """Test unstarring takes back the star's own weight and leaves other stars in place"""
+        deck_id = created_deck["id"]
+        client.post(f"/api/decks/{deck_id}/star", headers=auth_headers)
+        client.post(f"/api/decks/{deck_id}/star", headers=other_user_headers(db_session))
+        with collect_queries() as stats:
+            client.post(f"/api/decks/{deck_id}/star", headers=auth_headers)
+        # No recompute: the deck's stars and sessions are never read back
+        assert not any("FROM deck_stars" in shape and "deck_stars.user_id" not in shape for shape in stats.shapes)
+        assert not any("FROM quiz_sessions" in shape for shape in stats.shapes)
+        incremental = ranking(db_session, deck_id)
+        assert incremental[1] == DeckRankingService.STAR_WEIGHT
+        
+        DeckRankingService.rescore(db_session, [deck_id])
+        db_session.commit()
+        rescored = ranking(db_session, deck_id)
+        assert rescored[0] == pytest.approx(incremental[0], abs=1e-9)
+        assert rescored[1:] == incremental[1:]
+    
+    def test_quiz_completion_counts_learner_once(self, client, auth_headers, created_card, db_session):
+        """Test each completion counts, but the learner only on their first"""
+        complete_session(client, auth_headers, created_card)
+        complete_session(client, auth_headers, created_card)
+        _, popular, learners = ranking(db_session, created_card["deck_id"])
+        assert learners == 1
+        assert popular == 2 * DeckRankingService.SESSION_WEIGHT + DeckRankingService.LEARNER_WEIGHT
+    
+    def test_incremental_matches_rescore(self, client, auth_headers, created_card, db_session):
+        """Test the incremental updates agree with a full recompute"""
+        deck_id = created_card["deck_id"]
+        client.post(f"/api/decks/{deck_id}/star", headers=auth_headers)
+        complete_session(client, auth_headers, created_card)
+        incremental = ranking(db_session, deck_id)
+        
+        assert DeckRankingService.rescore(db_session, [deck_id]) == 1
+        db_session.commit()
+        rescored = ranking(db_session, deck_id)
+        # Star timestamps are stored to the second, so allow for the rounding
+        assert rescored[0] == pytest.approx(incremental[0], abs=1e-4)
+        assert rescored[1:] == incremental[1:]
+
+class TestRankingRefreshJob:
+    """Test the hourly refresh job"""
+    
+    def test_refresh_in_batches(self, monkeypatch, TestingSessionLocal, client, auth_headers, created_card, db_session):
+        """Test the job rescores every deck across several batches"""
+        deck_id = created_card["deck_id"]
+        client.post(f"/api/decks/{deck_id}/star", headers=auth_headers)
+        complete_session(client, auth_headers, created_card)
+        expected = ranking(db_session, deck_id)
+        db_session.query(models.DeckRanking).update({"trending_score": 0.0, "popular_score": 0.0, "learner_count": 0})
+        db_session.commit()
+        
+        monkeypatch.setattr(jobs, "SessionLocal", TestingSessionLocal)
+        monkeypatch.setattr(jobs, "RANKING_BATCH_SIZE", 1)
+        asyncio.run(jobs.BackgroundJobs().refresh_deck_rankings())
+        refreshed = ranking(db_session, deck_id)
+        assert refreshed[0] == pytest.approx(expected[0], abs=1e-4)
+        assert refreshed[1:] == expected[1:]
+
+@pytest.fixture
+def ranked_decks(client, auth_headers, sample_card_data):
+    """Three public decks under a unique tag: one starred, one studied, one untouched"""
+    tag = f"rank{uuid.uuid4().hex[:8]}"
+    decks = {
+        name: client.post("/api/decks/", json={"title": f"{name} {tag}", "is_public": True, "tags": [tag]}, headers=auth_headers).json()
+        for name in ["quiet", "starred", "studied"]
+    }
+    client.post(f"/api/decks/{decks['starred']['id']}/star", headers=auth_headers)
+    card = client.post("/api/cards/", json={**sample_card_data, "deck_id": decks["studied"]["id"]}, headers=auth_headers).json()
+    complete_session(client, auth_headers, card)
+    return {"tag": tag, "decks": decks}
+
+class TestRankedListing:
+    """Test sort=trending and sort=popular on the deck listing"""
+    
+    @pytest.mark.parametrize("sort", ["trending", "popular"])
+    def test_sorted_by_score(self, client, ranked_decks, sort):
+        """Test active decks come first and untouched ones still appear"""
+        response = client.get(f"/api/decks/?tags={ranked_decks['tag']}&sort={sort}")
+        assert response.status_code == 200
+        titles = [deck["title"].split()[0] for deck in response.json()]
+        # Popular: star 3 vs session 1 + learner 2; trending: the later events weigh slightly more
+        assert titles[-1] == "quiet"
+        assert set(titles) == {"quiet", "starred", "studied"}
+    
+    def test_popular_pages_with_cursor(self, client, ranked_decks):
+        """Test following cursors through a ranked listing"""
+        url = f"/api/decks/?tags={ranked_decks['tag']}&sort=popular&limit=1"
+        ids = []
+        response = client.get(url)
+        while True:
+            ids.extend(deck["id"] for deck in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+            response = client.get(f"{url}&cursor={cursor}")
+        assert ids == [deck["id"] for deck in client.get(f"/api/decks/?tags={ranked_decks['tag']}&sort=popular").json()]
+        assert len(ids) == 3
+    
+    def test_search_with_sort(self, client, ranked_decks):
+        """Test a search can be ordered by popularity instead of relevance"""
+        response = client.get(f"/api/decks/?search={ranked_decks['tag']}&sort=popular")
+        assert response.status_code == 200
+        assert [deck["title"].split()[0] for deck in response.json()][-1] == "quiet"
+    
+    def test_invalid_sort(self, client):
+        """Test an unknown sort is rejected"""
+        assert client.get("/api/decks/?sort=random").status_code == 422
@@ -301,3 +301,29 @@ class TestDeckEdgeCases:
         
         # Should have different IDs
         assert response1.json()["id"] != response2.json()["id"]
+
+class TestDeckListingQueries:
+    """Test that the deck listing does a constant number of queries"""
+    
+    def test_listing_query_count_independent_of_page_size(self, client, auth_headers, sample_card_data, query_budget):
+        """Test counts come from the deck row and stars are batched for the whole page"""
+        deck_ids = []
+        for i in range(12):
+            deck = client.post("/api/decks/", json={"title": f"Batched {i}", "is_public": True}, headers=auth_headers).json()
+            deck_ids.append(deck["id"])
+        for _ in range(3):
+            client.post("/api/cards/", json={**sample_card_data, "deck_id": deck_ids[0]}, headers=auth_headers)
+        client.post(f"/api/decks/{deck_ids[1]}/star", headers=auth_headers)
+        
+        # current user + page + stars
+        with query_budget(3):
+            response = client.get("/api/decks/?search=Batched&limit=50", headers=auth_headers)
+        
+        assert response.status_code == 200
+        decks = {deck["id"]: deck for deck in response.json()}
+        assert len(decks) == 12
+        assert decks[deck_ids[0]]["card_count"] == 3
+        assert decks[deck_ids[2]]["card_count"] == 0
+        assert decks[deck_ids[1]]["star_count"] == 1
+        assert decks[deck_ids[1]]["is_starred"] is True
+        assert decks[deck_ids[0]]["is_starred"] is False
@@ -0,0 +1,70 @@
+import os
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect
+from database import Base, include_schema_name
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def alembic_config(tmp_path):
+    """Alembic config pointed at an empty SQLite file"""
+    config = Config(os.path.join(SERVER_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(SERVER_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{tmp_path / 'migrations.db'}")
+    config.attributes["configure_logger"] = False
+    return config
+
+
+class TestMigrations:
+    """Test the Alembic migration history"""
+    
+    def test_upgrade_matches_models(self, alembic_config):
+        """Test that upgrading to head yields exactly the schema in models.py"""
+        command.upgrade(alembic_config, "head")
+        engine = create_engine(alembic_config.get_main_option("sqlalchemy.url"))
+        try:
+            with engine.connect() as connection:
+                context = MigrationContext.configure(connection, opts={"include_name": include_schema_name})
+                diff = compare_metadata(context, Base.metadata)
+            assert diff == []
+        finally:
+            engine.dispose()
+
+    def test_hot_path_indexes_created(self, alembic_config):
+        """Test that the hot path indexes exist after upgrading"""
+        command.upgrade(alembic_config, "head")
+        engine = create_engine(alembic_config.get_main_option("sqlalchemy.url"))
+        try:
+            inspector = inspect(engine)
+            indexes = {
+                index["name"]
+                for table in ["quiz_sessions", "quiz_answers", "cards", "decks", "activity_logs", "study_plans", "daily_challenges"]
+                for index in inspector.get_indexes(table)
+            }
+        finally:
+            engine.dispose()
+        assert {
+            "ix_quiz_sessions_user_completed",
+            "ix_quiz_sessions_deck_user",
+            "ix_quiz_answers_session_correct",
+            "ix_quiz_answers_card_incorrect",
+            "ix_cards_deck_id",
+            "ix_decks_user_id",
+            "ix_activity_logs_user_created",
+            "ix_study_plans_user_next_review",
+            "ix_daily_challenges_user_date",
+        } <= indexes
+
+    def test_downgrade_to_base(self, alembic_config):
+        """Test that every migration can be reverted"""
+        command.upgrade(alembic_config, "head")
+        command.downgrade(alembic_config, "base")
+        engine = create_engine(alembic_config.get_main_option("sqlalchemy.url"))
+        try:
+            assert inspect(engine).get_table_names() == ["alembic_version"]
+        finally:
+            engine.dispose()
@@ -0,0 +1,141 @@
+import uuid
+from datetime import datetime
+import pytest
+import models
+from pagination import CURSOR_HEADER, encode_cursor, decode_cursor
+
+
+def follow_cursors(client, url, headers=None, limit=2):
+    """Every id across all pages of a cursor-paginated endpoint, in order"""
+    ids = []
+    separator = "&" if "?" in url else "?"
+    response = client.get(f"{url}{separator}limit={limit}", headers=headers)
+    while True:
+        assert response.status_code == 200
+        ids.extend(item["id"] for item in response.json())
+        cursor = response.headers.get(CURSOR_HEADER)
+        if not cursor:
+            return ids
+        assert len(response.json()) == limit
+        response = client.get(f"{url}{separator}limit={limit}&cursor={cursor}", headers=headers)
+
+def all_ids(client, url, headers=None):
+    """Ids of the same listing fetched in one skip/limit page"""
+    separator = "&" if "?" in url else "?"
+    response = client.get(f"{url}{separator}skip=0&limit=1000", headers=headers)
+    assert CURSOR_HEADER not in response.headers
+    return [item["id"] for item in response.json()]
+
+class TestCursorEncoding:
+    """Test the opaque cursor format"""
+    
+    def test_round_trip(self):
+        """Test a cursor decodes to what was encoded"""
+        payload = {"k": "2026-01-01 10:00:00", "id": 7}
+        assert decode_cursor(encode_cursor(payload)) == payload
+    
+    def test_datetime_key(self):
+        """Test datetime keys survive the round trip"""
+        cursor = encode_cursor({"k": datetime(2026, 1, 1, 10), "id": 7})
+        assert decode_cursor(cursor) == {"k": {"dt": "2026-01-01T10:00:00"}, "id": 7}
+    
+    @pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor({"k": 5, "id": "x"}), "bnVsbA"])
+    def test_invalid_cursor_rejected(self, client, auth_headers, cursor):
+        """Test malformed cursors are a 400, not a server error"""
+        response = client.get(f"/api/quiz/sessions?cursor={cursor}", headers=auth_headers)
+        assert response.status_code == 400
+
+class TestKeysetPagination:
+    """Test following next cursors through the list endpoints"""
+    
+    def test_quiz_sessions(self, client, auth_headers, created_card):
+        """Test session history pages match the single page listing"""
+        for _ in range(5):
+            client.post("/api/quiz/sessions", json={"deck_id": created_card["deck_id"], "mode": "exam"}, headers=auth_headers)
+        
+        ids = follow_cursors(client, "/api/quiz/sessions", auth_headers)
+        assert len(ids) >= 5
+        assert ids == all_ids(client, "/api/quiz/sessions", auth_headers)
+    
+    def test_activity_with_tied_and_mixed_timestamps(self, client, db_session):
+        """Test rows sharing a timestamp, and rows stored by server default, are each returned once"""
+        demo_user = db_session.query(models.User).filter(models.User.username == "demo_user").one()
+        tied = datetime(2020, 5, 1, 12, 0, 0)
+        logs = [
+            models.ActivityLog(user_id=demo_user.id, action_type=models.ActionType.CREATE_DECK, resource_type="deck", resource_id=0, created_at=tied)
+            for _ in range(3)
+        ] + [
+            models.ActivityLog(user_id=demo_user.id, action_type=models.ActionType.CREATE_DECK, resource_type="deck", resource_id=0)
+            for _ in range(3)
+        ]
+        db_session.add_all(logs)
+        db_session.commit()
+        
+        ids = follow_cursors(client, "/api/users/demo_user/activity", limit=2)
+        assert len(ids) == len(set(ids))
+        assert {log.id for log in logs} <= set(ids)
+        assert ids == all_ids(client, "/api/users/demo_user/activity")
+    
+    def test_decks_newest_first(self, client, auth_headers):
+        """Test the deck listing pages newest first"""
+        tag = f"page{uuid.uuid4().hex[:8]}"
+        created = [
+            client.post("/api/decks/", json={"title": f"Paged {i}", "is_public": True, "tags": [tag]}, headers=auth_headers).json()["id"]
+            for i in range(5)
+        ]
+        
+        ids = follow_cursors(client, f"/api/decks/?tags={tag}", auth_headers)
+        assert ids == list(reversed(created))
+    
+    def test_deck_search_pages(self, client, auth_headers):
+        """Test ranked search results page through with cursors too"""
+        word = f"zq{uuid.uuid4().hex[:8]}"
+        for i in range(5):
+            client.post("/api/decks/", json={"title": f"{word} {i}", "is_public": True}, headers=auth_headers)
+        
+        ids = follow_cursors(client, f"/api/decks/?search={word}", auth_headers)
+        assert len(ids) == 5
+        assert ids == all_ids(client, f"/api/decks/?search={word}", auth_headers)
+    
+    def test_cards_in_creation_order(self, client, auth_headers, created_deck, sample_card_data):
+        """Test a deck's cards page oldest first"""
+        created = [
+            client.post("/api/cards/", json={**sample_card_data, "deck_id": created_deck["id"]}, headers=auth_headers).json()["id"]
+            for _ in range(5)
+        ]
+        
+        assert follow_cursors(client, f"/api/cards/?deck_id={created_deck['id']}", auth_headers) == created
+    
+    def test_discover_users(self, client, db_session):
+        """Test the discovery page pages through every user"""
+        suffix = uuid.uuid4().hex[:8]
+        users = [
+            models.User(email=f"page{i}{suffix}@example.com", google_id=f"page{i}{suffix}", name="Paged",
+                        username=f"paged{i}{suffix}", username_set=True)
+            for i in range(3)
+        ]
+        db_session.add_all(users)
+        db_session.commit()
+        
+        ids = follow_cursors(client, "/api/users/discover")
+        assert len(ids) == len(set(ids))
+        assert {user.id for user in users} <= set(ids)
+
+class TestSkipLimitCompatibility:
+    """Test old skip/limit clients keep working"""
+    
+    def test_skip_limit(self, client, auth_headers, created_deck, sample_card_data):
+        """Test skip still offsets and the body is still a plain list"""
+        for _ in range(3):
+            client.post("/api/cards/", json={**sample_card_data, "deck_id": created_deck["id"]}, headers=auth_headers)
+        
+        everything = client.get(f"/api/cards/?deck_id={created_deck['id']}", headers=auth_headers).json()
+        response = client.get(f"/api/cards/?deck_id={created_deck['id']}&skip=1&limit=1", headers=auth_headers)
+        assert isinstance(response.json(), list)
+        assert [card["id"] for card in response.json()] == [everything[1]["id"]]
+        
+        # The cursor returned for a skip page continues right after it
+        next_page = client.get(
+            f"/api/cards/?deck_id={created_deck['id']}&limit=1&cursor={response.headers[CURSOR_HEADER]}", headers=auth_headers
+        )
+        assert [card["id"] for card in next_page.json()] == [everything[2]["id"]]
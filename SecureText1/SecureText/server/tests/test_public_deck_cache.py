@@ -0,0 +1,151 @@
+import uuid
+import pytest
+import models
+from cache import TaggedTTLCache
+from query_stats import collect_queries
+from services.public_deck_cache import public_deck_cache
+
+
+class TestTaggedTTLCache:
+    """Test invalidation by tag"""
+    
+    def test_invalidate_tags_drops_only_tagged_entries(self):
+        """Test only entries stored with an invalidated tag are dropped"""
+        cache = TaggedTTLCache("test_tagged", max_size=10, ttl_seconds=60)
+        cache.set_tagged("a", 1, {"x", "y"}, cache.generation)
+        cache.set_tagged("b", 2, {"y"}, cache.generation)
+        cache.set_tagged("c", 3, {"z"}, cache.generation)
+        
+        assert cache.invalidate_tags({"y"}) == 2
+        assert (cache.get("a"), cache.get("b"), cache.get("c")) == (None, None, 3)
+        assert cache.stats()["invalidations"] == 2
+    
+    def test_stale_generation_not_stored(self):
+        """Test a value computed before an invalidation is discarded"""
+        cache = TaggedTTLCache("test_tagged_race", max_size=10, ttl_seconds=60)
+        generation = cache.generation
+        cache.invalidate_tags({"x"})
+        cache.set_tagged("a", 1, {"x"}, generation)
+        assert cache.get("a") is None
+    
+    def test_evicted_entries_leave_the_tag_index(self):
+        """Test the tag index doesn't outgrow the cache"""
+        cache = TaggedTTLCache("test_tagged_evict", max_size=2, ttl_seconds=60)
+        for key in range(5):
+            cache.set_tagged(key, key, {("deck", key)}, cache.generation)
+        assert len(cache._tags_by_key) == 2
+        assert set(cache._keys_by_tag) == {("deck", 3), ("deck", 4)}
+
+@pytest.fixture
+def tagged_decks(client, auth_headers):
+    """Two public decks under a tag unique to the test"""
+    tag = f"cache{uuid.uuid4().hex[:8]}"
+    decks = [
+        client.post("/api/decks/", json={"title": f"Cached {i}", "is_public": True, "tags": [tag]}, headers=auth_headers).json()
+        for i in range(2)
+    ]
+    return {"tag": tag, "url": f"/api/decks/?public_only=true&tags={tag}", "decks": decks}
+
+def decks_queries(client, url, headers=None):
+    """The listing and the number of deck queries it took"""
+    with collect_queries() as stats:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return response.json(), sum(count for shape, count in stats.shapes.items() if "FROM decks" in shape)
+
+class TestPublicDeckListingCache:
+    """Test caching of the anonymous/public deck listing"""
+    
+    def test_repeat_listing_served_from_cache(self, client, tagged_decks):
+        """Test the second identical request does not query decks"""
+        first, _ = decks_queries(client, tagged_decks["url"])
+        hits = public_deck_cache.hits
+        second, queries = decks_queries(client, tagged_decks["url"])
+        assert second == first
+        assert queries == 0
+        assert public_deck_cache.hits == hits + 1
+    
+    def test_anonymous_and_public_only_share_pages(self, client, auth_headers, tagged_decks):
+        """Test signed-in public_only callers reuse the page but get their own stars"""
+        deck_id = tagged_decks["decks"][0]["id"]
+        client.post(f"/api/decks/{deck_id}/star", headers=auth_headers)
+        decks_queries(client, tagged_decks["url"])
+        
+        listing, queries = decks_queries(client, tagged_decks["url"], auth_headers)
+        assert queries == 0
+        assert {deck["id"]: deck["is_starred"] for deck in listing}[deck_id] is True
+        anonymous, _ = decks_queries(client, tagged_decks["url"])
+        assert all(deck["is_starred"] is False for deck in anonymous)
+    
+    def test_star_invalidates_pages_showing_the_deck(self, client, auth_headers, tagged_decks):
+        """Test a star refreshes the deck's count on cached pages"""
+        deck_id = tagged_decks["decks"][0]["id"]
+        decks_queries(client, tagged_decks["url"])
+        client.post(f"/api/decks/{deck_id}/star", headers=auth_headers)
+        
+        listing, _ = decks_queries(client, tagged_decks["url"])
+        assert {deck["id"]: deck["star_count"] for deck in listing}[deck_id] == 1
+    
+    def test_card_write_invalidates_pages_showing_the_deck(self, client, auth_headers, tagged_decks, sample_card_data):
+        """Test a new card refreshes the deck's card count"""
+        deck_id = tagged_decks["decks"][0]["id"]
+        decks_queries(client, tagged_decks["url"])
+        client.post("/api/cards/", json={**sample_card_data, "deck_id": deck_id}, headers=auth_headers)
+        
+        listing, _ = decks_queries(client, tagged_decks["url"])
+        assert {deck["id"]: deck["card_count"] for deck in listing}[deck_id] == 1
+    
+    def test_unrelated_star_keeps_page(self, client, auth_headers, tagged_decks):
+        """Test starring a deck not on a page leaves that page cached"""
+        other = client.post("/api/decks/", json={"title": "Elsewhere", "is_public": True, "tags": ["elsewhere"]}, headers=auth_headers).json()
+        decks_queries(client, tagged_decks["url"])
+        client.post(f"/api/decks/{other['id']}/star", headers=auth_headers)
+        
+        _, queries = decks_queries(client, tagged_decks["url"])
+        assert queries == 0
+    
+    def test_star_reorders_cached_ranked_page(self, client, auth_headers, tagged_decks):
+        """Test a star on a deck off a cached popular page brings it onto that page"""
+        url = f"{tagged_decks['url']}&sort=popular&limit=1"
+        [shown], _ = decks_queries(client, url)
+        other = next(deck for deck in tagged_decks["decks"] if deck["id"] != shown["id"])
+        client.post(f"/api/decks/{other['id']}/star", headers=auth_headers)
+        
+        [shown], queries = decks_queries(client, url)
+        assert queries > 0
+        assert shown["id"] == other["id"]
+    
+    def test_new_public_deck_invalidates_every_page(self, client, auth_headers, tagged_decks):
+        """Test a new public deck shows up, and a new private one costs no invalidation"""
+        decks_queries(client, tagged_decks["url"])
+        client.post("/api/decks/", json={"title": "Hidden", "is_public": False, "tags": [tagged_decks["tag"]]}, headers=auth_headers)
+        _, queries = decks_queries(client, tagged_decks["url"])
+        assert queries == 0
+        
+        client.post("/api/decks/", json={"title": "Shown", "is_public": True, "tags": [tagged_decks["tag"]]}, headers=auth_headers)
+        listing, _ = decks_queries(client, tagged_decks["url"])
+        assert [deck["title"] for deck in listing][0] == "Shown"
+    
+    def test_owner_change_invalidates_their_pages(self, client, db_session, tagged_decks):
+        """Test a profile edit refreshes the owner shown on cached pages"""
+        decks_queries(client, tagged_decks["url"])
+        owner = db_session.get(models.User, tagged_decks["decks"][0]["user_id"])
+        original_name = owner.name
+        owner.name = f"Renamed {uuid.uuid4().hex[:6]}"
+        db_session.commit()
+        
+        try:
+            listing, _ = decks_queries(client, tagged_decks["url"])
+            assert listing[0]["owner"]["name"] == owner.name
+        finally:
+            owner.name = original_name
+            db_session.commit()
+    
+    def test_cache_metrics_reported(self, client, tagged_decks):
+        """Test the cache's hit rate and invalidations are on /health/caches"""
+        decks_queries(client, tagged_decks["url"])
+        decks_queries(client, tagged_decks["url"])
+        stats = client.get("/health/caches").json()["public_decks"]
+        assert stats["hits"] >= 1
+        assert 0 < stats["hit_rate"] <= 1
+        assert "invalidations" in stats
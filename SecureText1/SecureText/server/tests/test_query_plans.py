@@ -0,0 +1,115 @@
+import re
+import pytest
+from sqlalchemy import event
+
+# Tables the request handlers always filter on; none of them may be read with a full scan
+HOT_TABLES = {"quiz_sessions", "quiz_answers", "cards", "decks", "study_plans", "activity_logs", "daily_challenges", "deck_tags", "card_tags"}
+
+@pytest.fixture
+def captured_sql(async_engine):
+    """Record every statement the request handlers send to the database"""
+    statements = []
+    
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+    
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _capture)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", _capture)
+
+def find_full_scans(engine, statements):
+    """Run EXPLAIN QUERY PLAN on each captured read and return hot table scans"""
+    scans = []
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                continue
+            plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            for row in plan:
+                detail = row[-1]
+                match = re.match(r"SCAN (\w+)", detail)
+                if match and match.group(1) in HOT_TABLES:
+                    scans.append((detail, " ".join(statement.split())))
+    return scans
+
+@pytest.fixture
+def quiz_deck(client, auth_headers, sample_card_data):
+    """Deck with one card to run quiz sessions against"""
+    deck = client.post("/api/decks/", json={"title": "Query Plan Deck", "is_public": True}, headers=auth_headers).json()
+    card = client.post("/api/cards/", json={**sample_card_data, "deck_id": deck["id"]}, headers=auth_headers).json()
+    return {"deck": deck, "card": card}
+
+
+class TestQueryPlans:
+    """Test that hot endpoints are served from indexes"""
+    
+    def test_quiz_flow_uses_indexes(self, client, auth_headers, quiz_deck, captured_sql, engine):
+        """Test starting, answering and completing sessions in every mode"""
+        deck_id = quiz_deck["deck"]["id"]
+        response = client.post("/api/quiz/sessions", json={"deck_id": deck_id, "mode": "exam"}, headers=auth_headers)
+        session_id = response.json()["id"]
+        answer = {"card_id": quiz_deck["card"]["id"], "user_answers": ["wrong"]}
+        assert client.post(f"/api/quiz/sessions/{session_id}/answers", json=answer, headers=auth_headers).status_code == 200
+        assert client.post(f"/api/quiz/sessions/{session_id}/complete", headers=auth_headers).status_code == 200
+        # Review mode only has cards once something was answered incorrectly
+        for mode in ["study", "review"]:
+            response = client.post("/api/quiz/sessions", json={"deck_id": deck_id, "mode": mode}, headers=auth_headers)
+            assert response.status_code == 200
+        
+        assert captured_sql
+        assert find_full_scans(engine, captured_sql) == []
+
+    def test_dashboard_and_history_use_indexes(self, client, auth_headers, quiz_deck, captured_sql, engine):
+        """Test the dashboard, progress and activity feeds"""
+        for url in [
+            "/api/quiz/dashboard",
+            "/api/quiz/sessions",
+            "/api/users/progress",
+            "/api/users/demo_user/activity",
+            f"/api/cards/?deck_id={quiz_deck['deck']['id']}",
+        ]:
+            assert client.get(url, headers=auth_headers).status_code == 200
+        
+        assert captured_sql
+        assert find_full_scans(engine, captured_sql) == []
+
+    def test_search_uses_fts_index(self, client, auth_headers, quiz_deck, captured_sql, engine):
+        """Test deck and card search go through the FTS5 tables instead of LIKE scans"""
+        for url in [
+            "/api/decks/?search=query plan",
+            "/api/users/profile/demo_user/decks?search=query",
+            "/api/cards/search?q=capital",
+        ]:
+            assert client.get(url, headers=auth_headers).status_code == 200
+        
+        assert captured_sql
+        assert find_full_scans(engine, captured_sql) == []
+
+    def test_tag_filters_use_indexes(self, client, auth_headers, quiz_deck, captured_sql, engine):
+        """Test tag filters, facets and tag-scoped quizzes read the tag indexes"""
+        for url in [
+            "/api/decks/?tags=geography,capitals",
+            "/api/decks/?tags=geography,capitals&tag_mode=any",
+            "/api/decks/facets?tags=geography",
+        ]:
+            assert client.get(url, headers=auth_headers).status_code == 200
+        response = client.post("/api/quiz/sessions", json={
+            "deck_id": quiz_deck["deck"]["id"], "mode": "exam", "tags": ["geography"]
+        }, headers=auth_headers)
+        assert response.status_code == 200
+        
+        assert captured_sql
+        assert find_full_scans(engine, captured_sql) == []
+
+    @pytest.mark.parametrize("sort", ["trending", "popular"])
+    def test_ranked_sorts_walk_score_index(self, client, quiz_deck, captured_sql, engine, sort):
+        """Test trending/popular listings read the score index in order instead of sorting"""
+        assert client.get(f"/api/decks/?public_only=true&sort={sort}").status_code == 200
+        
+        listing = [(statement, parameters) for statement, parameters in captured_sql if "deck_rankings" in statement]
+        assert listing
+        with engine.connect() as connection:
+            plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {listing[0][0]}", listing[0][1]).all()]
+        assert any(f"ix_deck_rankings_{sort}" in detail for detail in plan), plan
+        assert not any("TEMP B-TREE" in detail for detail in plan), plan
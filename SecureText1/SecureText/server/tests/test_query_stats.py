@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import select
+from query_stats import QueryStats, statement_shape, collect_queries, N_PLUS_ONE_THRESHOLD
+import models
+
+
+class TestQueryStats:
+    """Test statement counting and N+1 detection"""
+    
+    def test_statement_shape_ignores_literals(self):
+        """Test that statements differing only in literals share a shape"""
+        assert statement_shape("SELECT * FROM cards WHERE id = 1") == statement_shape("SELECT *  FROM cards\nWHERE id = 42")
+        assert statement_shape("SELECT * FROM users WHERE name = 'a''b'") == "SELECT * FROM users WHERE name = ?"
+
+    def test_repeated_shapes_flagged(self):
+        """Test that only shapes at or over the threshold are suspected N+1"""
+        stats = QueryStats()
+        for card_id in range(N_PLUS_ONE_THRESHOLD):
+            stats.record(f"SELECT * FROM cards WHERE id = {card_id}", 0.001)
+        stats.record("SELECT * FROM decks", 0.001)
+        
+        assert stats.count == N_PLUS_ONE_THRESHOLD + 1
+        assert list(stats.suspected_n_plus_one()) == ["SELECT * FROM cards WHERE id = ?"]
+
+    def test_collect_queries_counts_session_statements(self, db_session):
+        """Test that statements on an instrumented engine are collected"""
+        with collect_queries() as stats:
+            for user_id in range(N_PLUS_ONE_THRESHOLD):
+                db_session.execute(select(models.User).where(models.User.id == user_id)).all()
+        
+        assert stats.count == N_PLUS_ONE_THRESHOLD
+        assert len(stats.suspected_n_plus_one()) == 1
+
+
+class TestQueryStatsMiddleware:
+    """Test the per-request query headers"""
+    
+    def test_headers_on_response(self, client, auth_headers, created_deck):
+        """Test that each response reports its statement count and DB time"""
+        response = client.get(f"/api/cards/?deck_id={created_deck['id']}", headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert int(response.headers["X-DB-Query-Count"]) >= 2  # current user + cards
+        assert float(response.headers["X-DB-Time-Ms"]) >= 0
+        assert "X-DB-N-Plus-One" not in response.headers
+
+    def test_query_budget_passes(self, client, auth_headers, query_budget):
+        """Test that a request inside its budget passes"""
+        with query_budget(2) as stats:
+            response = client.get("/api/auth/me", headers=auth_headers)
+        assert response.status_code == 200
+        assert stats.count >= 1
+
+    def test_query_budget_exceeded(self, client, auth_headers, query_budget):
+        """Test that going over the budget fails the test"""
+        with pytest.raises(AssertionError, match="Query budget of 0 exceeded"):
+            with query_budget(0):
+                client.get("/api/auth/me", headers=auth_headers)
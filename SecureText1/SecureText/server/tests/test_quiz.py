@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+
+
+@pytest.fixture
+def quiz_deck(client, auth_headers, sample_card_data):
+    """Create a deck with one card to quiz on"""
+    deck_data = {
+        "title": "Test Deck for Quizzes",
+        "description": "A deck for testing quiz sessions",
+        "is_public": True,
+        "tags": ["test", "quiz"]
+    }
+    deck = client.post("/api/decks/", json=deck_data, headers=auth_headers).json()
+    card_data = {**sample_card_data, "deck_id": deck["id"]}
+    card = client.post("/api/cards/", json=card_data, headers=auth_headers).json()
+    return {"deck": deck, "card": card}
+
+class TestQuizSessions:
+    """Test cases for the quiz session flow"""
+    
+    def test_start_exam_session(self, client, auth_headers, quiz_deck):
+        """Test starting an exam session"""
+        response = client.post(
+            "/api/quiz/sessions",
+            json={"deck_id": quiz_deck["deck"]["id"], "mode": "exam"},
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["mode"] == "exam"
+        assert data["total_questions"] == 1
+        assert data["deck"]["id"] == quiz_deck["deck"]["id"]
+        assert data["deck"]["owner"]["username"] == "demo_user"
+
+    def test_start_session_invalid_deck(self, client, auth_headers):
+        """Test starting a session on a deck that doesn't exist"""
+        response = client.post(
+            "/api/quiz/sessions",
+            json={"deck_id": 99999, "mode": "exam"},
+            headers=auth_headers
+        )
+        assert response.status_code == 404
+
+    def test_submit_and_complete_study_session(self, client, auth_headers, quiz_deck):
+        """Test answering a card and completing a study session"""
+        session = client.post(
+            "/api/quiz/sessions",
+            json={"deck_id": quiz_deck["deck"]["id"], "mode": "study"},
+            headers=auth_headers
+        ).json()
+        
+        response = client.post(
+            f"/api/quiz/sessions/{session['id']}/answers",
+            json={
+                "card_id": quiz_deck["card"]["id"],
+                "user_answers": ["Paris"],
+                "difficulty_rating": "easy"
+            },
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        
+        response = client.post(f"/api/quiz/sessions/{session['id']}/complete", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["score"] == 1
+        assert data["completed_at"] is not None
+        
+        # A completed session can't be completed twice
+        response = client.post(f"/api/quiz/sessions/{session['id']}/complete", headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_get_user_quiz_sessions(self, client, auth_headers, quiz_deck):
+        """Test listing the user's quiz sessions"""
+        client.post(
+            "/api/quiz/sessions",
+            json={"deck_id": quiz_deck["deck"]["id"], "mode": "exam"},
+            headers=auth_headers
+        )
+        response = client.get("/api/quiz/sessions", headers=auth_headers)
+        assert response.status_code == 200
+        assert len(response.json()) >= 1
+
+    def test_dashboard_stats(self, client, auth_headers):
+        """Test dashboard statistics"""
+        response = client.get("/api/quiz/dashboard", headers=auth_headers)
+        assert response.status_code == 200
+        assert len(response.json()["weekly_activity"]) == 7
+
+class TestAsyncDatabase:
+    """Test the async session dependency"""
+    
+    @pytest.mark.asyncio
+    async def test_get_db_yields_async_session(self):
+        """Test that get_db hands out AsyncSession instances"""
+        gen = get_db()
+        session = await gen.__anext__()
+        assert isinstance(session, AsyncSession)
+        await gen.aclose()
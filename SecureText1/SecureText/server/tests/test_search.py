@@ -0,0 +1,161 @@
+import uuid
+import pytest
+import models
+from search import match_expression, MAX_SEARCH_TERMS
+
+
+@pytest.fixture
+def searchable_decks(client, auth_headers, sample_card_data):
+    """Decks and cards with distinctive words to search for"""
+    word = f"zq{uuid.uuid4().hex[:8]}"
+    title_deck = client.post("/api/decks/", json={
+        "title": f"Photosynthesis {word}",
+        "description": "Plants and light",
+        "is_public": True,
+        "tags": ["biology"]
+    }, headers=auth_headers).json()
+    description_deck = client.post("/api/decks/", json={
+        "title": f"Botany {word}",
+        "description": "Covers photosynthesis in depth",
+        "is_public": True,
+        "tags": ["plants"]
+    }, headers=auth_headers).json()
+    card = client.post("/api/cards/", json={
+        **sample_card_data,
+        "deck_id": title_deck["id"],
+        "question": f"Which organelle runs photosynthesis {word}?",
+        "correct_answers": ["Chloroplast"],
+        "options": ["Chloroplast", "Nucleus"],
+        "explanation": "Chloroplasts hold chlorophyll"
+    }, headers=auth_headers).json()
+    return {"word": word, "title_deck": title_deck, "description_deck": description_deck, "card": card}
+
+class TestMatchExpression:
+    """Test turning user input into an FTS5 query"""
+    
+    def test_words_become_prefix_terms(self):
+        """Test every word is quoted and matched as a prefix"""
+        assert match_expression("pyth dict") == '"pyth"* "dict"*'
+    
+    def test_operators_are_neutralised(self):
+        """Test FTS5 syntax in the input can't change the query"""
+        assert match_expression('title:"x" OR (y') == '"title"* "x"* "OR"* "y"*'
+    
+    def test_no_words(self):
+        """Test input without words gives no expression"""
+        assert match_expression("  ?!  ") is None
+        assert match_expression("") is None
+    
+    def test_term_limit(self):
+        """Test long inputs are cut to MAX_SEARCH_TERMS words"""
+        assert match_expression(" ".join(["word"] * 20)).count("*") == MAX_SEARCH_TERMS
+
+class TestDeckSearch:
+    """Test full-text deck search"""
+    
+    def test_prefix_match_ranked_with_snippet(self, client, auth_headers, searchable_decks):
+        """Test a word prefix finds both decks, title hit first, with highlighting"""
+        word = searchable_decks["word"]
+        response = client.get(f"/api/decks/?search=photosynth {word[:6]}", headers=auth_headers)
+        assert response.status_code == 200
+        
+        decks = response.json()
+        assert [deck["id"] for deck in decks] == [
+            searchable_decks["title_deck"]["id"], searchable_decks["description_deck"]["id"]
+        ]
+        assert "<mark>" in decks[0]["search_snippet"]
+    
+    def test_tag_match(self, client, auth_headers, searchable_decks):
+        """Test deck tags are searchable"""
+        response = client.get(f"/api/decks/?search=biolog {searchable_decks['word']}", headers=auth_headers)
+        assert [deck["id"] for deck in response.json()] == [searchable_decks["title_deck"]["id"]]
+    
+    def test_no_match(self, client, auth_headers, searchable_decks):
+        """Test words that appear nowhere return nothing"""
+        response = client.get(f"/api/decks/?search={searchable_decks['word']} nonexistentword", headers=auth_headers)
+        assert response.json() == []
+    
+    def test_syntax_in_input_is_safe(self, client, auth_headers):
+        """Test FTS5 operators in the search box don't cause errors"""
+        response = client.get('/api/decks/?search=NOT "AND (', headers=auth_headers)
+        assert response.status_code == 200
+    
+    def test_user_profile_decks(self, client, auth_headers, searchable_decks):
+        """Test the profile deck list searches the same index"""
+        response = client.get(f"/api/users/profile/demo_user/decks?search={searchable_decks['word']} botany")
+        assert response.status_code == 200
+        decks = response.json()
+        assert [deck["id"] for deck in decks] == [searchable_decks["description_deck"]["id"]]
+        assert "<mark>" in decks[0]["search_snippet"]
+    
+    def test_index_follows_deck_updates(self, searchable_decks, db_session, client, auth_headers):
+        """Test renaming and deleting decks updates the index"""
+        deck = db_session.get(models.Deck, searchable_decks["description_deck"]["id"])
+        deck.title = f"Mycology {searchable_decks['word']}"
+        db_session.commit()
+        
+        response = client.get(f"/api/decks/?search=mycolog {searchable_decks['word']}", headers=auth_headers)
+        assert [found["id"] for found in response.json()] == [deck.id]
+        response = client.get(f"/api/decks/?search=botany {searchable_decks['word']}", headers=auth_headers)
+        assert response.json() == []
+        
+        db_session.delete(deck)
+        db_session.commit()
+        response = client.get(f"/api/decks/?search=mycolog {searchable_decks['word']}", headers=auth_headers)
+        assert response.json() == []
+
+class TestCardSearch:
+    """Test the card search endpoint"""
+    
+    def test_question_and_explanation_match(self, client, auth_headers, searchable_decks):
+        """Test cards are found by question or explanation words"""
+        word = searchable_decks["word"]
+        response = client.get(f"/api/cards/search?q=organelle {word}", headers=auth_headers)
+        assert response.status_code == 200
+        cards = response.json()
+        assert [card["id"] for card in cards] == [searchable_decks["card"]["id"]]
+        assert "<mark>organelle</mark>" in cards[0]["search_snippet"]
+        assert cards[0]["is_bookmarked"] is False
+        
+        response = client.get(f"/api/cards/search?q=chlorophyl&deck_id={searchable_decks['title_deck']['id']}", headers=auth_headers)
+        assert [card["id"] for card in response.json()] == [searchable_decks["card"]["id"]]
+    
+    def test_index_follows_card_updates(self, client, auth_headers, searchable_decks):
+        """Test editing and deleting a card updates the index"""
+        card_id = searchable_decks["card"]["id"]
+        word = searchable_decks["word"]
+        client.put(f"/api/cards/{card_id}", json={"question": f"Where is mitochondria {word}?"}, headers=auth_headers)
+        
+        response = client.get(f"/api/cards/search?q=mitochond {word}", headers=auth_headers)
+        assert [card["id"] for card in response.json()] == [card_id]
+        assert client.get(f"/api/cards/search?q=organelle {word}", headers=auth_headers).json() == []
+        
+        client.delete(f"/api/cards/{card_id}", headers=auth_headers)
+        assert client.get(f"/api/cards/search?q=mitochond {word}", headers=auth_headers).json() == []
+    
+    def test_private_decks_of_others_hidden(self, client, auth_headers, db_session):
+        """Test cards in someone else's private deck never show up"""
+        word = f"zq{uuid.uuid4().hex[:8]}"
+        owner = models.User(email=f"{word}@example.com", google_id=word, name="Private Owner")
+        db_session.add(owner)
+        db_session.flush()
+        deck = models.Deck(title="Private", user_id=owner.id, is_public=False)
+        db_session.add(deck)
+        db_session.flush()
+        db_session.add(models.Card(
+            deck_id=deck.id, question=f"Secret {word}?", question_type=models.QuestionType.MCQ,
+            options=["a"], correct_answers=["a"]
+        ))
+        db_session.commit()
+        
+        response = client.get(f"/api/cards/search?q={word}", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json() == []
+    
+    def test_requires_auth(self, client):
+        """Test card search needs a logged in user"""
+        assert client.get("/api/cards/search?q=anything").status_code in (401, 403)
+    
+    def test_requires_query(self, client, auth_headers):
+        """Test an empty query is rejected"""
+        assert client.get("/api/cards/search?q=", headers=auth_headers).status_code == 422
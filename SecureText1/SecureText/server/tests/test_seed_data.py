@@ -0,0 +1,47 @@
+import pytest
+from collections import Counter
+from datetime import date
+from sqlalchemy import create_engine, select
+from database import Base, apply_sqlite_profile
+from seed_data import generate_bulk_data
+import models
+
+
+def _generate(path, seed):
+    engine = create_engine(f"sqlite:///{path}")
+    apply_sqlite_profile(engine)
+    Base.metadata.create_all(bind=engine)
+    counts = generate_bulk_data(engine, users=40, decks_per_user=2, cards_per_deck=10, sessions_per_user=10,
+                                seed=seed, chunk_size=500, end_date=date(2025, 1, 1))
+    return engine, counts
+
+class TestBulkDataGenerator:
+    """Test the synthetic bulk data generator"""
+    
+    def test_deterministic_for_seed(self, tmp_path):
+        """Test that the same seed produces the same dataset"""
+        first, first_counts = _generate(tmp_path / "first.db", seed=7)
+        second, second_counts = _generate(tmp_path / "second.db", seed=7)
+        query = select(models.QuizSession.deck_id, models.QuizSession.completed_at, models.QuizSession.score).order_by(models.QuizSession.id)
+        with first.connect() as a, second.connect() as b:
+            assert a.execute(query).all() == b.execute(query).all()
+        assert first_counts == second_counts
+        assert first_counts["quiz_answers"] > 0 and first_counts["study_plans"] > 0
+
+    def test_referential_integrity_and_popularity(self, tmp_path):
+        """Test that chunked inserts keep foreign keys valid and popularity is skewed"""
+        engine, counts = _generate(tmp_path / "bulk.db", seed=1)
+        with engine.connect() as connection:
+            assert connection.exec_driver_sql("PRAGMA foreign_key_check").all() == []
+            sessions_per_deck = Counter(connection.execute(select(models.QuizSession.deck_id)).scalars())
+        
+        popularity = sorted(sessions_per_deck.values(), reverse=True)
+        assert sum(popularity) == counts["quiz_sessions"]
+        assert popularity[0] > 5 * popularity[len(popularity) // 2]
+
+    def test_progress_on_app_scale(self, tmp_path):
+        """Test seeded best scores are 0-1 fractions like the ones quiz completion records"""
+        engine, _ = _generate(tmp_path / "progress.db", seed=3)
+        with engine.connect() as connection:
+            rows = connection.execute(select(models.UserProgress.best_score, models.UserProgress.mastery_level)).all()
+        assert rows and all(0 <= best <= 1 and 0 <= mastery <= best for best, mastery in rows)
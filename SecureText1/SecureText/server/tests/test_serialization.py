@@ -0,0 +1,229 @@
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime
+import pytest
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import models
+import serialization
+from schemas import DeckResponse
+from pagination import CURSOR_HEADER
+
+BENCHMARK_ENABLED = os.getenv("BENCHMARK", "0") == "1"
+
+def make_decks(count):
+    """Transient decks with owners, as a listing query would load them"""
+    owner = models.User(
+        id=1, email="owner@example.com", name="Owner", username="owner", username_set=True,
+        bio="Bio", avatar_url=None, created_at=datetime(2024, 1, 1), updated_at=None
+    )
+    return [
+        models.Deck(
+            id=i, title=f"Deck {i}", description="About", user_id=1, is_public=True, tags=["python", "basics"],
+            created_at=datetime(2024, 1, 2), updated_at=datetime(2024, 1, 3), owner=owner,
+            card_count=10, star_count=2, session_count=5
+        )
+        for i in range(1, count + 1)
+    ]
+
+def legacy_deck_json(decks):
+    """The hand-built dict path the list endpoints used before the serializer"""
+    result = []
+    for deck in decks:
+        owner = deck.owner
+        result.append({
+            "id": deck.id, "title": deck.title, "description": deck.description, "user_id": deck.user_id,
+            "is_public": deck.is_public, "tags": deck.tags or [], "created_at": deck.created_at,
+            "updated_at": deck.updated_at,
+            "owner": {
+                "id": owner.id, "email": owner.email, "name": owner.name, "username": owner.username,
+                "username_set": owner.username_set, "created_at": owner.created_at, "bio": owner.bio,
+                "avatar_url": owner.avatar_url, "updated_at": owner.updated_at
+            },
+            "card_count": deck.card_count, "star_count": deck.star_count, "session_count": deck.session_count,
+            "is_starred": False, "search_snippet": None
+        })
+    # FastAPI validated the dicts against response_model, then encoded them
+    validated = [DeckResponse(**deck) for deck in result]
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+class TestSerializer:
+    """Test the compiled ORM-to-JSON serializers"""
+
+    def test_deck_json_matches_legacy_output(self):
+        """Test the serializer writes the same document as the hand-built dicts did"""
+        decks = make_decks(3)
+        body = serialization.decks.dump(serialization.decks.many(decks))
+        assert json.loads(body) == json.loads(legacy_deck_json(decks))
+
+    def test_null_tags_become_empty_list(self):
+        """Test decks stored without tags serialize an empty list"""
+        deck = make_decks(1)[0]
+        deck.tags = None
+        assert serialization.decks.one(deck).tags == []
+
+    def test_response_keeps_headers(self):
+        """Test headers set on the injected response carry over"""
+        from fastapi import Response
+        injected = Response()
+        injected.headers[CURSOR_HEADER] = "abc"
+        response = serialization.decks.response(serialization.decks.many(make_decks(1)), injected)
+        assert response.headers[CURSOR_HEADER] == "abc"
+        assert response.headers["content-type"] == "application/json"
+        assert int(response.headers["content-length"]) == len(response.body)
+
+
+class TestSerializedEndpoints:
+    """Test list endpoints that return serializer output"""
+
+    def test_deck_listing_fields_and_cursor(self, client, auth_headers):
+        """Test the deck listing keeps its fields and the next-page cursor"""
+        for i in range(2):
+            client.post("/api/decks/", json={"title": f"Serialized {i}", "is_public": True}, headers=auth_headers)
+        response = client.get("/api/decks/?limit=1", headers=auth_headers)
+        assert response.status_code == 200
+        assert CURSOR_HEADER in response.headers
+        deck = response.json()[0]
+        assert set(deck) == set(DeckResponse.model_fields)
+        assert deck["owner"]["username"]
+
+    def test_starred_overlay_does_not_leak_into_cache(self, client, auth_headers):
+        """Test the caller's is_starred is not stored in the shared public listing"""
+        deck = client.post("/api/decks/", json={"title": "Overlay", "is_public": True, "tags": ["overlaytag"]}, headers=auth_headers).json()
+        url = "/api/decks/?public_only=true&tags=overlaytag"
+        client.post(f"/api/decks/{deck['id']}/star", headers=auth_headers)
+        assert client.get(url, headers=auth_headers).json()[0]["is_starred"] is True
+        assert client.get(url).json()[0]["is_starred"] is False
+
+    def test_deck_cards_keeps_validators(self, client, auth_headers, created_card):
+        """Test the deck card list still carries its ETag"""
+        response = client.get(f"/api/cards/decks/{created_card['deck_id']}/cards", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["etag"]
+        assert response.json()[0]["id"] == created_card["id"]
+        assert response.json()[0]["is_bookmarked"] is False
+
+    def test_profile_decks_include_owner(self, client, auth_headers, created_deck):
+        """Test a profile's deck list reads the owner without a hand-built copy"""
+        username = client.get("/api/auth/me", headers=auth_headers).json()["username"]
+        response = client.get(f"/api/users/profile/{username}/decks")
+        assert response.status_code == 200
+        assert all(deck["owner"]["username"] == username for deck in response.json())
+
+
+@pytest.mark.skipif(not BENCHMARK_ENABLED, reason="set BENCHMARK=1 to run serialization benchmarks")
+class TestSerializationBenchmark:
+    """Per-item cost of serializing a deck listing"""
+
+    def test_serializer_per_item_cost(self):
+        """Compare the hand-built dict path with the compiled serializer"""
+        decks = make_decks(200)
+        rounds = 50
+
+        def per_item_us(render):
+            render()
+            started = time.perf_counter()
+            for _ in range(rounds):
+                render()
+            return (time.perf_counter() - started) / (rounds * len(decks)) * 1e6
+
+        before = per_item_us(lambda: legacy_deck_json(decks))
+        after = per_item_us(lambda: serialization.decks.dump(serialization.decks.many(decks)))
+        print(f"\ndeck serialization: {before:.1f} us/item before, {after:.1f} us/item after")
+        assert after < before
+
+    def test_streamed_deck_memory(self, client, auth_headers, created_deck, sample_card_data):
+        """Compare peak memory of a large deck as one JSON list and as an NDJSON stream"""
+        url = f"/api/cards/decks/{created_deck['id']}/cards"
+        for _ in range(5):
+            cards = [{**sample_card_data, "question": f"Large deck card {i}?"} for i in range(2000)]
+            client.post("/api/cards/batch", json={"deck_id": created_deck["id"], "cards": cards}, headers=auth_headers)
+
+        def peak_kb(path):
+            client.get(path, headers=auth_headers)
+            tracemalloc.start()
+            response = client.get(path, headers=auth_headers)
+            peak = tracemalloc.get_traced_memory()[1] - len(response.content)
+            tracemalloc.stop()
+            return peak / 1024
+
+        listed, streamed = peak_kb(url), peak_kb(f"{url}?format=ndjson")
+        print(f"\n10000-card deck: {listed:.0f} KiB peak as a JSON list, {streamed:.0f} KiB streamed (body excluded)")
+        assert streamed < listed
+
+    def test_sparse_fieldset_cost(self, client, auth_headers, created_deck, sample_card_data):
+        """Compare payload size and latency of a full card list with a question+options fieldset"""
+        cards = [{**sample_card_data, "question": f"Fieldset card {i}?"} for i in range(2000)]
+        client.post("/api/cards/batch", json={"deck_id": created_deck["id"], "cards": cards}, headers=auth_headers)
+        url = f"/api/cards/decks/{created_deck['id']}/cards"
+
+        def measure(path, rounds=10):
+            client.get(path, headers=auth_headers)
+            started = time.perf_counter()
+            for _ in range(rounds):
+                response = client.get(path, headers=auth_headers)
+            return len(response.content), (time.perf_counter() - started) / rounds * 1000
+
+        full_bytes, full_ms = measure(url)
+        sparse_bytes, sparse_ms = measure(f"{url}?fields=question,options")
+        print(f"\n2000 cards: {full_bytes} B in {full_ms:.1f} ms full, {sparse_bytes} B in {sparse_ms:.1f} ms with fields=question,options")
+        assert sparse_bytes < full_bytes
+
+class TestDeckCardStream:
+    """Test the NDJSON mode of the deck card list"""
+
+    @pytest.fixture
+    def deck_cards(self, client, auth_headers, created_deck, sample_card_data):
+        cards = [{**sample_card_data, "question": f"Streamed {i}?"} for i in range(5)]
+        client.post("/api/cards/batch", json={"deck_id": created_deck["id"], "cards": cards}, headers=auth_headers)
+        return f"/api/cards/decks/{created_deck['id']}/cards"
+
+    def test_lines_match_json_list(self, client, auth_headers, deck_cards, monkeypatch):
+        """Test each line is one card, as the JSON list has it, across several chunks"""
+        monkeypatch.setattr("routers.cards.CARD_STREAM_BATCH_SIZE", 2)
+        listed = client.get(deck_cards, headers=auth_headers).json()
+        client.post(f"/api/cards/{listed[3]['id']}/bookmark", headers=auth_headers)
+        listed = client.get(deck_cards, headers=auth_headers).json()
+
+        response = client.get(f"{deck_cards}?format=ndjson", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == serialization.NDJSON_MEDIA_TYPE
+        assert response.text.endswith("\n")
+        assert [json.loads(line) for line in response.text.splitlines()] == listed
+
+    def test_stream_revalidates(self, client, auth_headers, deck_cards):
+        """Test the stream has its own ETag and honours If-None-Match"""
+        etag = client.get(f"{deck_cards}?format=ndjson", headers=auth_headers).headers["etag"]
+        assert etag != client.get(deck_cards, headers=auth_headers).headers["etag"]
+        response = client.get(f"{deck_cards}?format=ndjson", headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 304
+
+    def test_stream_has_own_session(self, client, auth_headers, deck_cards, monkeypatch):
+        """Test the cards are read on a session of the stream's own, not the request's, which is gone by then"""
+        monkeypatch.setattr("routers.cards.CARD_STREAM_BATCH_SIZE", 2)
+        statements = []
+
+        def record(state):
+            statements.append((str(state.statement), state.session))
+
+        event.listen(Session, "do_orm_execute", record)
+        try:
+            response = client.get(f"{deck_cards}?format=ndjson", headers=auth_headers)
+        finally:
+            event.remove(Session, "do_orm_execute", record)
+        assert len(response.text.splitlines()) == 5
+        # The handler's own lookups come first, on the request's session
+        request_session = statements[0][1]
+        [stream_session] = {session for statement, session in statements if "\nFROM cards" in statement}
+        assert stream_session is not request_session
+        assert not stream_session.in_transaction()
+
+    def test_empty_deck_streams_nothing(self, client, auth_headers, created_deck):
+        """Test a deck without cards gives an empty body"""
+        response = client.get(f"/api/cards/decks/{created_deck['id']}/cards?format=ndjson", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.text == ""
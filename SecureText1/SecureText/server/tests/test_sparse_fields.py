@@ -0,0 +1,93 @@
+import json
+import pytest
+from query_stats import collect_queries
+
+
+def fetch(client, url, headers=None):
+    """Response and the statements it ran"""
+    with collect_queries() as stats:
+        response = client.get(url, headers=headers)
+    return response, list(stats.shapes)
+
+@pytest.fixture
+def deck_cards(client, auth_headers, created_deck, sample_card_data):
+    """The created deck with three cards"""
+    cards = [{**sample_card_data, "question": f"Sparse {i}?"} for i in range(3)]
+    client.post("/api/cards/batch", json={"deck_id": created_deck["id"], "cards": cards}, headers=auth_headers)
+    return created_deck
+
+class TestCardFieldsets:
+    """Test fields= on card lists"""
+
+    def test_only_requested_fields_fetched_and_written(self, client, auth_headers, deck_cards):
+        """Test unrequested columns are neither selected nor serialized"""
+        response, statements = fetch(client, f"/api/cards/?deck_id={deck_cards['id']}&fields=question,options", auth_headers)
+        assert response.status_code == 200
+        assert [set(card) for card in response.json()] == [{"id", "question", "options"}] * 3
+        card_selects = [statement for statement in statements if "FROM cards" in statement]
+        assert card_selects and not any("cards.explanation" in statement for statement in card_selects)
+
+    def test_bookmarks_only_looked_up_when_requested(self, client, auth_headers, deck_cards):
+        """Test is_bookmarked costs nothing unless asked for"""
+        url = f"/api/cards/?deck_id={deck_cards['id']}"
+        _, statements = fetch(client, f"{url}&fields=question", auth_headers)
+        assert not any("FROM card_bookmarks" in statement for statement in statements)
+        response, _ = fetch(client, f"{url}&fields=question,is_bookmarked", auth_headers)
+        assert all(card["is_bookmarked"] is False for card in response.json())
+
+    def test_unknown_field_rejected(self, client, auth_headers, deck_cards):
+        """Test a misspelt field is a 400, not a silently smaller body"""
+        response = client.get(f"/api/cards/?deck_id={deck_cards['id']}&fields=question,answer", headers=auth_headers)
+        assert response.status_code == 400
+        assert "answer" in response.json()["detail"]
+
+    def test_deck_cards_etag_and_stream_follow_fields(self, client, auth_headers, deck_cards):
+        """Test the deck card list varies its ETag by fieldset and streams the subset"""
+        url = f"/api/cards/decks/{deck_cards['id']}/cards"
+        full = client.get(url, headers=auth_headers)
+        sparse = client.get(f"{url}?fields=question", headers=auth_headers)
+        assert full.headers["etag"] != sparse.headers["etag"]
+        assert len(sparse.content) < len(full.content)
+
+        streamed = client.get(f"{url}?fields=question&format=ndjson", headers=auth_headers)
+        assert [json.loads(line) for line in streamed.text.splitlines()] == sparse.json()
+
+    def test_search_fields(self, client, auth_headers, deck_cards):
+        """Test search results honour fields= and still carry snippets when asked"""
+        response = client.get("/api/cards/search?q=Sparse&fields=question,search_snippet", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json() and all(set(card) == {"id", "question", "search_snippet"} for card in response.json())
+
+class TestDeckFieldsets:
+    """Test fields= on deck lists"""
+
+    def test_nested_owner_fields(self, client, auth_headers, deck_cards):
+        """Test owner.<field> trims the embedded profile and its columns"""
+        response, statements = fetch(client, "/api/decks/?fields=title,owner.username", auth_headers)
+        assert response.status_code == 200
+        deck = response.json()[0]
+        assert set(deck) == {"id", "title", "owner"}
+        assert set(deck["owner"]) == {"id", "username"}
+        assert not any("users.bio" in statement for statement in statements if "FROM decks" in statement)
+
+    def test_starred_only_when_requested(self, client, auth_headers, deck_cards):
+        """Test is_starred is filled in when part of the fieldset"""
+        client.post(f"/api/decks/{deck_cards['id']}/star", headers=auth_headers)
+        decks = client.get("/api/decks/?fields=title,is_starred", headers=auth_headers).json()
+        assert next(deck for deck in decks if deck["id"] == deck_cards["id"])["is_starred"] is True
+        _, statements = fetch(client, "/api/decks/?fields=title", auth_headers)
+        assert not any("FROM deck_stars" in statement for statement in statements)
+
+    def test_public_cache_keeps_fieldsets_apart(self, client, deck_cards):
+        """Test a cached full page is not served for a sparse request, or the other way round"""
+        url = "/api/decks/?public_only=true"
+        full = client.get(url).json()
+        sparse = client.get(f"{url}&fields=title").json()
+        assert set(sparse[0]) == {"id", "title"}
+        assert client.get(url).json() == full
+
+    def test_profile_decks_fields(self, client, auth_headers, deck_cards):
+        """Test the profile deck lists take fields= too"""
+        username = client.get("/api/auth/me", headers=auth_headers).json()["username"]
+        decks = client.get(f"/api/users/profile/{username}/decks?fields=title,card_count").json()
+        assert decks and all(set(deck) == {"id", "title", "card_count"} for deck in decks)
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import pytest
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect
+from database import Base, init_db
+from startup_profile import profile_imports, total_import_ms, report
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed on first use: OAuth login, background jobs, password hashing
+LAZY_MODULES = ["authlib", "httpx", "apscheduler", "passlib"]
+
+class TestStartup:
+    """Test that importing the app stays cheap"""
+    
+    def test_import_is_lazy_and_creates_no_schema(self, tmp_path):
+        """Test that importing main neither touches the database nor loads lazy modules"""
+        db_path = tmp_path / "untouched.db"
+        script = "import sys, main; print(','.join(m for m in %r if m in sys.modules))" % LAZY_MODULES
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=SERVER_DIR,
+            env={**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"},
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == ""
+        assert not db_path.exists()
+
+    def test_import_profile_report(self):
+        """Test the import-time profile of the app"""
+        timings = profile_imports("main")
+        assert total_import_ms(timings) > 0
+        assert "Importing main took" in report(timings, top=5)
+
+def _alembic_config(url=None):
+    config = Config(os.path.join(SERVER_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(SERVER_DIR, "migrations"))
+    if url:
+        config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    return config
+
+HEAD = ScriptDirectory.from_config(_alembic_config()).get_current_head()
+
+class TestInitDb:
+    """Test the explicit schema creation step"""
+    
+    def test_fresh_database(self, tmp_path):
+        """Test that init_db migrates an empty database to head"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+        init_db(engine)
+        with engine.connect() as connection:
+            assert connection.exec_driver_sql("SELECT version_num FROM alembic_version").scalar() == HEAD
+        assert "ix_decks_user_id" in {index["name"] for index in inspect(engine).get_indexes("decks")}
+
+    def test_database_created_by_create_all(self, tmp_path):
+        """Test that a create_all database matching the models is stamped at head"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'current.db'}")
+        Base.metadata.create_all(bind=engine)
+        init_db(engine)
+        init_db(engine)  # Idempotent
+        with engine.connect() as connection:
+            assert connection.exec_driver_sql("SELECT version_num FROM alembic_version").scalar() == HEAD
+
+    def test_database_predating_migrations(self, tmp_path):
+        """Test that a database from before migrations is upgraded from the baseline"""
+        url = f"sqlite:///{tmp_path / 'legacy.db'}"
+        command.upgrade(_alembic_config(url), "0001")
+        engine = create_engine(url)
+        with engine.begin() as connection:
+            connection.exec_driver_sql("DROP TABLE alembic_version")
+        
+        init_db(engine)
+        indexes = {index["name"] for index in inspect(engine).get_indexes("quiz_sessions")}
+        assert "ix_quiz_sessions_user_completed" in indexes
@@ -0,0 +1,154 @@
+import uuid
+import pytest
+from sqlalchemy import delete, select
+import models
+from services.tags import TagService
+
+
+@pytest.fixture
+def tag_prefix():
+    """Tag namespace unique to one test, since the test database is shared"""
+    return f"t{uuid.uuid4().hex[:8]}"
+
+@pytest.fixture
+def tagged_decks(client, auth_headers, tag_prefix):
+    """Three public decks with overlapping tags"""
+    def create(title, tags):
+        return client.post("/api/decks/", json={"title": title, "is_public": True, "tags": tags}, headers=auth_headers).json()
+    return {
+        "both": create("Both", [f"{tag_prefix}-a", f"{tag_prefix}-b"]),
+        "a_only": create("A only", [f" {tag_prefix}-A ", f"{tag_prefix}-c"]),
+        "b_only": create("B only", [f"{tag_prefix}-b"]),
+    }
+
+def listed_ids(response):
+    return {deck["id"] for deck in response.json()}
+
+class TestTagNormalization:
+    """Test how tags are normalized for the index"""
+    
+    def test_normalize(self):
+        """Test trimming, lower-casing and dropping blanks and duplicates"""
+        assert TagService.normalize([" Python ", "python", "", "SQL", None, 3]) == ["python", "sql"]
+        assert TagService.normalize(None) == []
+    
+    def test_parse(self):
+        """Test parsing a comma-separated query parameter"""
+        assert TagService.parse("a, B,,a") == ["a", "b"]
+        assert TagService.parse(None) == []
+
+class TestTagIndexMaintenance:
+    """Test deck_tags and card_tags follow the JSON tags"""
+    
+    def test_deck_tags_written_on_create(self, tagged_decks, tag_prefix, db_session):
+        """Test a new deck's tags are indexed normalized"""
+        tags = db_session.scalars(
+            select(models.DeckTag.tag).where(models.DeckTag.deck_id == tagged_decks["a_only"]["id"])
+        ).all()
+        assert sorted(tags) == [f"{tag_prefix}-a", f"{tag_prefix}-c"]
+    
+    def test_card_tags_follow_updates(self, client, auth_headers, created_deck, sample_card_data, db_session):
+        """Test card tag rows are added and removed as the card's tags change"""
+        card = client.post("/api/cards/", json={**sample_card_data, "deck_id": created_deck["id"], "tags": ["One", "two"]}, headers=auth_headers).json()
+        
+        def card_tags():
+            return sorted(db_session.scalars(select(models.CardTag.tag).where(models.CardTag.card_id == card["id"])).all())
+        assert card_tags() == ["one", "two"]
+        
+        client.put(f"/api/cards/{card['id']}", json={"tags": ["two", "three"]}, headers=auth_headers)
+        assert card_tags() == ["three", "two"]
+        
+        client.delete(f"/api/cards/{card['id']}", headers=auth_headers)
+        assert card_tags() == []
+    
+    def test_backfill_rebuilds_index(self, tagged_decks, tag_prefix, db_session):
+        """Test backfill() restores rows missing from the index"""
+        deck_id = tagged_decks["both"]["id"]
+        db_session.execute(delete(models.DeckTag).where(models.DeckTag.deck_id == deck_id))
+        db_session.commit()
+        
+        counts = TagService.backfill(db_session)
+        db_session.commit()
+        assert counts["deck_tags"] > 0
+        tags = db_session.scalars(select(models.DeckTag.tag).where(models.DeckTag.deck_id == deck_id)).all()
+        assert sorted(tags) == [f"{tag_prefix}-a", f"{tag_prefix}-b"]
+
+class TestTagFilters:
+    """Test AND/OR tag filters on the deck listing"""
+    
+    def test_all_tags(self, client, tagged_decks, tag_prefix):
+        """Test the default mode needs every tag"""
+        response = client.get(f"/api/decks/?tags={tag_prefix}-a,{tag_prefix}-b")
+        assert response.status_code == 200
+        assert listed_ids(response) == {tagged_decks["both"]["id"]}
+    
+    def test_any_tag(self, client, tagged_decks, tag_prefix):
+        """Test tag_mode=any needs one of the tags"""
+        response = client.get(f"/api/decks/?tags={tag_prefix}-a,{tag_prefix}-b&tag_mode=any&limit=50")
+        assert listed_ids(response) == {deck["id"] for deck in tagged_decks.values()}
+    
+    def test_case_insensitive(self, client, tagged_decks, tag_prefix):
+        """Test filter tags are normalized like stored tags"""
+        response = client.get(f"/api/decks/?tags={tag_prefix.upper()}-C")
+        assert listed_ids(response) == {tagged_decks["a_only"]["id"]}
+    
+    def test_invalid_mode(self, client):
+        """Test an unknown tag_mode is rejected"""
+        assert client.get("/api/decks/?tags=x&tag_mode=some").status_code == 422
+
+class TestTagFacets:
+    """Test tag facet counts for a result set"""
+    
+    def test_facets_for_filtered_set(self, client, tagged_decks, tag_prefix):
+        """Test counts cover the decks matching the filters, most common first"""
+        response = client.get(f"/api/decks/facets?tags={tag_prefix}-b")
+        assert response.status_code == 200
+        assert response.json() == [
+            {"tag": f"{tag_prefix}-b", "count": 2},
+            {"tag": f"{tag_prefix}-a", "count": 1},
+        ]
+    
+    def test_facets_with_search(self, client, tagged_decks, tag_prefix):
+        """Test the search filter narrows the facets too"""
+        response = client.get(f"/api/decks/facets?tags={tag_prefix}-a,{tag_prefix}-b&tag_mode=any&search=only")
+        facets = {facet["tag"]: facet["count"] for facet in response.json()}
+        assert facets == {f"{tag_prefix}-a": 1, f"{tag_prefix}-b": 1, f"{tag_prefix}-c": 1}
+
+class TestTagScopedQuiz:
+    """Test quiz sessions limited to tagged cards"""
+    
+    @pytest.fixture
+    def mixed_deck(self, client, auth_headers, sample_card_data):
+        """Deck with cards on two topics"""
+        deck = client.post("/api/decks/", json={"title": "Mixed topics", "is_public": True}, headers=auth_headers).json()
+        cards = {}
+        for tags in (["geography"], ["history"], ["geography", "history"]):
+            card = client.post("/api/cards/", json={**sample_card_data, "deck_id": deck["id"], "tags": tags}, headers=auth_headers).json()
+            cards["+".join(tags)] = card["id"]
+        return {"deck": deck, "cards": cards}
+    
+    def test_exam_scoped_to_tag(self, client, auth_headers, mixed_deck):
+        """Test only cards with every requested tag are picked"""
+        response = client.post("/api/quiz/sessions", json={
+            "deck_id": mixed_deck["deck"]["id"], "mode": "exam", "tags": ["Geography", "history"]
+        }, headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_questions"] == 1
+        assert data["card_ids"] == [mixed_deck["cards"]["geography+history"]]
+    
+    def test_study_scoped_to_any_tag(self, client, auth_headers, mixed_deck):
+        """Test tag_mode=any in study mode"""
+        response = client.post("/api/quiz/sessions", json={
+            "deck_id": mixed_deck["deck"]["id"], "mode": "study", "tags": ["history"], "tag_mode": "any"
+        }, headers=auth_headers)
+        assert sorted(response.json()["card_ids"]) == sorted([
+            mixed_deck["cards"]["history"], mixed_deck["cards"]["geography+history"]
+        ])
+    
+    def test_no_tagged_cards(self, client, auth_headers, mixed_deck):
+        """Test a tag no card has leaves nothing to quiz on"""
+        response = client.post("/api/quiz/sessions", json={
+            "deck_id": mixed_deck["deck"]["id"], "mode": "exam", "tags": ["chemistry"]
+        }, headers=auth_headers)
+        assert response.status_code == 400
@@ -0,0 +1,109 @@
+import pytest
+import cache as cache_module
+import models
+from auth import user_cache
+from cache import TTLCache
+from query_stats import collect_queries
+
+
+class TestTTLCache:
+    """Test the bounded TTL/LRU cache"""
+    
+    def test_lru_eviction_and_counters(self):
+        """Test that the least recently used entry is evicted first"""
+        cache = TTLCache("test_lru", max_size=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        cache.set("c", 3)
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (3, 1, 1, 2)
+
+    def test_entries_expire(self, monkeypatch):
+        """Test that entries older than the TTL are misses"""
+        now = [1000.0]
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+        cache = TTLCache("test_ttl", max_size=10, ttl_seconds=5)
+        cache.set("a", 1)
+        now[0] += 4
+        assert cache.get("a") == 1
+        now[0] += 2
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+@pytest.fixture
+def quiz_session(client, auth_headers, sample_card_data):
+    """An exam session on a one-card deck"""
+    deck = client.post("/api/decks/", json={"title": "Cache Deck", "is_public": True}, headers=auth_headers).json()
+    card = client.post("/api/cards/", json={**sample_card_data, "deck_id": deck["id"]}, headers=auth_headers).json()
+    session = client.post("/api/quiz/sessions", json={"deck_id": deck["id"], "mode": "exam"}, headers=auth_headers).json()
+    return {"session_id": session["id"], "card_id": card["id"]}
+
+class TestUserCache:
+    """Test the authenticated-user cache"""
+    
+    def test_warm_cache_skips_users_table(self, client, auth_headers):
+        """Test that a warm cache serves the current user without a users query"""
+        assert client.get("/api/auth/me", headers=auth_headers).status_code == 200
+        
+        with collect_queries() as stats:
+            response = client.get("/api/auth/me", headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert not any("FROM users" in shape for shape in stats.shapes)
+        assert user_cache.stats()["hits"] > 0
+
+    def test_answer_submission_skips_users_table(self, client, auth_headers, quiz_session):
+        """Test that the answer path never loads the user row"""
+        answer = {"card_id": quiz_session["card_id"], "user_answers": ["4"]}
+        url = f"/api/quiz/sessions/{quiz_session['session_id']}/answers"
+        
+        with collect_queries() as stats:
+            response = client.post(url, json=answer, headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert not any("FROM users" in shape for shape in stats.shapes)
+
+    def test_complete_signup_invalidates(self, client, auth_headers):
+        """Test that changing the profile evicts the cached user"""
+        assert client.get("/api/auth/me", headers=auth_headers).status_code == 200
+        assert "demo@magizh.app" in user_cache._entries
+        
+        response = client.post("/api/auth/complete-signup", json={"username": "cache_renamed"}, headers=auth_headers)
+        assert response.status_code == 200
+        assert "demo@magizh.app" not in user_cache._entries
+        
+        assert client.get("/api/auth/me", headers=auth_headers).json()["username"] == "cache_renamed"
+        client.post("/api/auth/complete-signup", json={"username": "demo_user"}, headers=auth_headers)
+
+    def test_load_overlapping_commit_not_cached(self, client, auth_headers, db_session, monkeypatch):
+        """Test a snapshot loaded while a profile change commits is not stored"""
+        lookup = user_cache.get
+        
+        def get_then_commit(email):
+            # Another request commits a change between the cache miss and the store
+            user = db_session.query(models.User).filter_by(email=email).one()
+            user.bio = "Changed elsewhere"
+            db_session.commit()
+            return lookup(email)
+        
+        monkeypatch.setattr(user_cache, "get", get_then_commit)
+        assert client.get("/api/auth/me", headers=auth_headers).status_code == 200
+        assert "demo@magizh.app" not in user_cache._entries
+        
+        monkeypatch.setattr(user_cache, "get", lookup)
+        client.get("/api/auth/me", headers=auth_headers)
+        assert user_cache.get("demo@magizh.app")["bio"] == "Changed elsewhere"
+
+    def test_cache_stats_endpoint(self, client, auth_headers):
+        """Test that cache counters are exposed"""
+        client.get("/api/auth/me", headers=auth_headers)
+        client.get("/api/auth/me", headers=auth_headers)
+        
+        stats = client.get("/health/caches").json()["users"]
+        assert stats["hits"] >= 1
+        assert stats["size"] >= 1
@@ -0,0 +1,97 @@
+import pytest
+from concurrent.futures import wait
+from sqlalchemy import select, func
+import models
+import write_queue as write_queue_module
+from write_queue import WriteQueue
+
+
+@pytest.fixture
+def writer(TestingSessionLocal, setup_database):
+    """A running write queue bound to the test database"""
+    queue = WriteQueue(TestingSessionLocal, max_batch=16, max_wait_ms=20)
+    queue.start()
+    yield queue
+    queue.shutdown()
+
+@pytest.fixture
+def writer_user(db_session):
+    """A user to attach written rows to"""
+    user = models.User(email="writer@example.com", google_id="writer_google_id", name="Writer")
+    db_session.add(user)
+    db_session.commit()
+    yield user
+    db_session.query(models.ActivityLog).filter(models.ActivityLog.user_id == user.id).delete()
+    db_session.delete(user)
+    db_session.commit()
+
+def _log_activity(db, user_id, resource_id):
+    db.add(models.ActivityLog(
+        user_id=user_id,
+        action_type=models.ActionType.CREATE_CARD,
+        resource_type="card",
+        resource_id=resource_id
+    ))
+    return resource_id
+
+def _fail(db):
+    raise ValueError("bad unit")
+
+class TestWriteQueue:
+    """Test cases for the single-writer queue"""
+    
+    def test_units_are_group_committed(self, writer, writer_user, db_session):
+        """Test that queued units commit together and resolve their futures"""
+        futures = [writer.submit(_log_activity, writer_user.id, i) for i in range(40)]
+        wait(futures, timeout=10)
+        
+        assert sorted(f.result() for f in futures) == list(range(40))
+        assert writer.stats()["batches"] < 40
+        
+        count = db_session.scalar(
+            select(func.count()).select_from(models.ActivityLog).where(
+                models.ActivityLog.user_id == writer_user.id
+            )
+        )
+        assert count == 40
+
+    def test_failing_unit_only_fails_its_own_future(self, writer, writer_user, db_session):
+        """Test that one bad unit doesn't roll back the rest of its batch"""
+        futures = [writer.submit(_log_activity, writer_user.id, i) for i in range(5)]
+        bad = writer.submit(_fail)
+        futures += [writer.submit(_log_activity, writer_user.id, i) for i in range(5, 10)]
+        wait(futures + [bad], timeout=10)
+        
+        with pytest.raises(ValueError):
+            bad.result()
+        assert [f.result() for f in futures] == list(range(10))
+        
+        count = db_session.scalar(
+            select(func.count()).select_from(models.ActivityLog).where(
+                models.ActivityLog.user_id == writer_user.id
+            )
+        )
+        assert count == 10
+
+    def test_shutdown_drains_pending_writes(self, TestingSessionLocal, writer_user):
+        """Test that shutdown finishes queued units before stopping"""
+        queue = WriteQueue(TestingSessionLocal)
+        queue.start()
+        futures = [queue.submit(_log_activity, writer_user.id, i) for i in range(10)]
+        queue.shutdown()
+        
+        assert all(f.done() for f in futures)
+        assert not queue.running
+
+    def test_endpoint_writes_go_through_writer(self, client, auth_headers, sample_deck_data, writer, monkeypatch):
+        """Test that write endpoints use the writer thread when it is running"""
+        monkeypatch.setattr(write_queue_module, "write_queue", writer)
+        deck = client.post("/api/decks/", json=sample_deck_data, headers=auth_headers).json()
+        
+        response = client.post(f"/api/decks/{deck['id']}/star", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["is_starred"] == True
+        assert writer.stats()["units"] == 1
+        
+        response = client.post(f"/api/decks/{deck['id']}/star", headers=auth_headers)
+        assert response.json()["is_starred"] == False
@@ -0,0 +1,152 @@
+from concurrent.futures import Future
+from typing import Any, Callable
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import SessionLocal
+import asyncio
+import logging
+import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: route write endpoints through a single writer thread (useful for SQLite,
+# where concurrent writers otherwise queue up on the database lock)
+WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE_ENABLED", "0") == "1"
+WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "64"))
+WRITE_QUEUE_MAX_WAIT_MS = float(os.getenv("WRITE_QUEUE_MAX_WAIT_MS", "2"))
+
+# A write unit is a plain function that takes a sync Session (plus arguments),
+# performs its writes and returns plain data. It must not commit.
+WriteUnit = Callable[..., Any]
+
+class WriteQueue:
+    """
+    Serializes database writes through one dedicated writer thread.
+    
+    Units are executed in arrival order and group-committed: everything that
+    queued up while the previous batch was committing goes into a single
+    transaction. If a unit raises, the batch is rolled back and replayed one
+    unit per transaction so a bad request only fails its own future.
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, session_factory=SessionLocal, max_batch: int = WRITE_QUEUE_MAX_BATCH,
+                 max_wait_ms: float = WRITE_QUEUE_MAX_WAIT_MS):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self.batches = 0
+        self.units = 0
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """Start the writer thread"""
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+        logger.info("Database write queue started")
+    
+    def shutdown(self):
+        """Drain pending writes and stop the writer thread"""
+        if not self.running:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._thread = None
+        logger.info("Database write queue stopped")
+    
+    def submit(self, unit: WriteUnit, *args) -> Future:
+        """Queue a write unit; the future resolves once its batch has committed"""
+        future = Future()
+        self._queue.put((unit, args, future))
+        return future
+    
+    async def run(self, unit: WriteUnit, *args) -> Any:
+        """Queue a write unit and await its result"""
+        return await asyncio.wrap_future(self.submit(unit, *args))
+    
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "units": self.units,
+            "avg_batch_size": round(self.units / self.batches, 2) if self.batches else 0.0,
+            "pending": self._queue.qsize()
+        }
+    
+    def _next_batch(self):
+        """Block for one unit, then collect whatever else arrives within max_wait"""
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch and batch[-1] is not self._STOP:
+            try:
+                batch.append(self._queue.get(timeout=self.max_wait))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        # The writer owns one connection for its whole lifetime
+        engine = self.session_factory.kw["bind"]
+        with engine.connect() as connection:
+            session = self.session_factory(bind=connection)
+            try:
+                while True:
+                    batch = self._next_batch()
+                    stop = batch[-1] is self._STOP
+                    if stop:
+                        batch.pop()
+                    if batch:
+                        self._execute_batch(session, batch)
+                    if stop:
+                        break
+            finally:
+                session.close()
+    
+    def _execute_batch(self, session: Session, batch):
+        self.batches += 1
+        self.units += len(batch)
+        try:
+            results = [unit(session, *args) for unit, args, _ in batch]
+            session.commit()
+        except Exception:
+            session.rollback()
+            self._execute_one_by_one(session, batch)
+            return
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+    
+    def _execute_one_by_one(self, session: Session, batch):
+        for unit, args, future in batch:
+            try:
+                result = unit(session, *args)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+# Global write queue instance
+write_queue = WriteQueue()
+
+async def run_write(db: AsyncSession, unit: WriteUnit, *args) -> Any:
+    """
+    Execute a write unit and commit it.
+    
+    Goes through the writer thread when it is running, otherwise runs in the
+    request's own session. Objects the request loaded before the write may be
+    stale afterwards when the writer is used, so reload anything you return.
+    """
+    if write_queue.running:
+        return await write_queue.run(unit, *args)
+    result = await db.run_sync(unit, *args)
+    await db.commit()
+    return result